@@ -171,11 +171,14 @@ def ml_pipeline():
         system_site_packages=False,
         trigger_rule=TriggerRule.ALL_DONE,
     )
-    def train_from_best_config(feature_view_metadata: dict) -> dict:
+    def train_from_best_config(
+        feature_view_metadata: dict, refresh_mode: str = "full"
+    ) -> dict:
         """Trains model from the best config found in hyperparameter tuning.
 
         Args:
             feature_view_metadata (dict): Contains feature store feature view and training dataset version.
+            refresh_mode (str, optional): "full" retrains the model from scratch, "incremental" refreshes the previous production model. Defaults to "full".
 
         Returns:
             metadata from the training run
@@ -192,6 +195,7 @@ def ml_pipeline():
         return train.from_best_config(
             feature_view_version=feature_view_metadata["feature_view_version"],
             training_dataset_version=feature_view_metadata["training_dataset_version"],
+            refresh_mode=refresh_mode,
         )
 
     @task.virtualenv(
@@ -263,6 +267,33 @@ def ml_pipeline():
             end_datetime=end_datetime,
         )
 
+    @task.virtualenv(
+        task_id="compact_monitoring",
+        requirements=[
+            "--trusted-host 172.17.0.1",
+            "--extra-index-url http://172.17.0.1",
+            "batch_prediction_pipeline",
+        ],
+        python_version="3.9",
+        system_site_packages=False,
+    )
+    def compact_monitoring(feature_pipeline_metadata: dict):
+        """Merge the predictions appended for monitoring and drop the ones out of the export window.
+
+        Args:
+            feature_pipeline_metadata (dict): the metadata from the feature pipeline task
+        """
+
+        from datetime import datetime
+        from batch_prediction_pipeline import monitoring_store
+
+        retention_start = datetime.strptime(
+            feature_pipeline_metadata["export_datetime_utc_start"],
+            feature_pipeline_metadata["datetime_format"],
+        )
+
+        monitoring_store.compact(retention_start=retention_start)
+
     @task.branch(task_id="if_run_hyperparameter_tuning_branching")
     def if_run_hyperparameter_tuning_branching(run_hyperparameter_tuning: bool) -> bool:
         """Task used to branch between hyperparameter tuning and skipping it."""
@@ -295,6 +326,7 @@ def ml_pipeline():
         )
         == "True"
     )
+    refresh_mode = Variable.get("ml_pipeline_refresh_mode", default_var="full")
 
     # Feature pipeline
     feature_pipeline_metadata = run_feature_pipeline(
@@ -312,13 +344,14 @@ def ml_pipeline():
     )
     last_sweep_metadata = run_hyperparameter_tuning(feature_view_metadata)
     upload_best_model_step = upload_best_config(last_sweep_metadata)
-    train_metadata = train_from_best_config(feature_view_metadata)
+    train_metadata = train_from_best_config(feature_view_metadata, refresh_mode)
 
     # Batch prediction pipeline
     compute_monitoring_step = compute_monitoring(feature_view_metadata)
     batch_predict_step = batch_predict(
         feature_view_metadata, train_metadata, feature_pipeline_metadata
     )
+    compact_monitoring_step = compact_monitoring(feature_pipeline_metadata)
 
     # Define DAG structure.
     (
@@ -337,6 +370,7 @@ def ml_pipeline():
         >> train_metadata
         >> compute_monitoring_step
         >> batch_predict_step
+        >> compact_monitoring_step
     )
 
 
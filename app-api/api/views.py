@@ -1,9 +1,12 @@
 import pandas as pd
-from typing import Any, List
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, List, Optional
 
 import boto3
 from io import BytesIO
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 
 from api import schemas
 from api.config import get_settings
@@ -11,11 +14,18 @@ from api.config import get_settings
 # Create an S3 client using AWS credentials
 aws_access_key_id = str(get_settings().AWS_ACCESS_KEY_ID)
 aws_secret_access_key = str(get_settings().AWS_SECRET_ACCESS_KEY)
-aws_region = str(get_settings().AWS_DEFAULT_REGION
-)
+aws_region = str(get_settings().AWS_DEFAULT_REGION)
+
 
+s3_client = boto3.client(
+    "s3",
+    aws_access_key_id=aws_access_key_id,
+    aws_secret_access_key=aws_secret_access_key,
+    region_name=aws_region,
+)
 
-s3_client = boto3.client('s3', aws_access_key_id=aws_access_key_id, aws_secret_access_key=aws_secret_access_key, region_name=aws_region)
+# Single file that held all the monitoring predictions before they were partitioned by date.
+LEGACY_PREDICTIONS_BLOB_NAME = "predictions_monitoring.parquet"
 
 api_router = APIRouter()
 
@@ -41,10 +51,10 @@ def consumer_type_values() -> List:
     """
 
     # Download the data from S3
-    bucket_name = get_settings().AWS_BUCKET 
+    bucket_name = get_settings().AWS_BUCKET
     blob_name = "X.parquet"
     response = s3_client.get_object(Bucket=bucket_name, Key=blob_name)
-    data = response['Body'].read()
+    data = response["Body"].read()
     X = pd.read_parquet(BytesIO(data))
 
     unique_consumer_type = list(X.index.unique(level="consumer_type"))
@@ -59,10 +69,10 @@ def area_values() -> List:
     """
 
     # Download the data from AWS.
-    bucket_name = get_settings().AWS_BUCKET 
+    bucket_name = get_settings().AWS_BUCKET
     blob_name = "X.parquet"
     response = s3_client.get_object(Bucket=bucket_name, Key=blob_name)
-    data = response['Body'].read()
+    data = response["Body"].read()
     X = pd.read_parquet(BytesIO(data))
 
     unique_area = list(X.index.unique(level="area"))
@@ -90,8 +100,8 @@ async def get_predictions(area: int, consumer_type: int) -> Any:
     preds_response = s3_client.get_object(Bucket=bucket_name, Key=preds_blob_name)
 
     # Convert the S3 object contents to DataFrames
-    train_data = train_response['Body'].read()
-    preds_data = preds_response['Body'].read()
+    train_data = train_response["Body"].read()
+    preds_data = preds_response["Body"].read()
     train_df = pd.read_parquet(BytesIO(train_data))
     preds_df = pd.read_parquet(BytesIO(preds_data))
 
@@ -147,7 +157,7 @@ async def get_metrics() -> Any:
     metrics_response = s3_client.get_object(Bucket=bucket_name, Key=metrics_blob_name)
 
     # Convert the S3 object contents to a DataFrame
-    metrics_data = metrics_response['Body'].read()
+    metrics_data = metrics_response["Body"].read()
     metrics_df = pd.read_parquet(BytesIO(metrics_data))
 
     datetime_utc = metrics_df.index.to_list()
@@ -169,24 +179,33 @@ async def get_predictions(area: int, consumer_type: int) -> Any:
     Get forecasted predictions based on the given area and consumer type.
     """
 
-    # Download the data from S3
-    bucket_name = get_settings().AWS_BUCKET
-    y_monitoring_blob_name = "y_monitoring.parquet"
-    predictions_monitoring_blob_name = "predictions_monitoring.parquet"
-    y_monitoring_response = s3_client.get_object(Bucket=bucket_name, Key=y_monitoring_blob_name)
-    predictions_monitoring_response = s3_client.get_object(Bucket=bucket_name, Key=predictions_monitoring_blob_name)
-
-    # Convert the S3 object contents to DataFrames
-    y_monitoring_data = y_monitoring_response['Body'].read()
-    predictions_monitoring_data = predictions_monitoring_response['Body'].read()
-    y_monitoring = pd.read_parquet(BytesIO(y_monitoring_data))
-    predictions_monitoring = pd.read_parquet(BytesIO(predictions_monitoring_data))
+    # Download the data from S3. The client is blocking, thus it runs in the threadpool.
+    y_monitoring = await run_in_threadpool(read_y_monitoring)
 
     # Query the data for the given area and consumer type.
     try:
         y_monitoring = y_monitoring.xs(
             (area, consumer_type), level=["area", "consumer_type"]
         )
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No data found for the given area and consumer typefrontend: {area}, {consumer_type}",
+        )
+    if len(y_monitoring) == 0:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No data found for the given area and consumer type: {area}, {consumer_type}",
+        )
+
+    # Only the predictions from the first monitored day onwards are read.
+    predictions_monitoring = await run_in_threadpool(
+        read_predictions_monitoring,
+        area,
+        consumer_type,
+        start_datetime=get_first_datetime(y_monitoring),
+    )
+    try:
         predictions_monitoring = predictions_monitoring.xs(
             (area, consumer_type), level=["area", "consumer_type"]
         )
@@ -196,7 +215,7 @@ async def get_predictions(area: int, consumer_type: int) -> Any:
             detail=f"No data found for the given area and consumer typefrontend: {area}, {consumer_type}",
         )
 
-    if len(y_monitoring) == 0 or len(predictions_monitoring) == 0:
+    if len(predictions_monitoring) == 0:
         raise HTTPException(
             status_code=404,
             detail=f"No data found for the given area and consumer type: {area}, {consumer_type}",
@@ -222,4 +241,96 @@ async def get_predictions(area: int, consumer_type: int) -> Any:
         "predictions_monitoring_energy_consumptionc": predictions_monitoring_energy_consumptionc,
     }
 
-    return results
\ No newline at end of file
+    return results
+
+
+def read_y_monitoring() -> pd.DataFrame:
+    """Read the observations used for monitoring."""
+
+    bucket_name = get_settings().AWS_BUCKET
+    y_monitoring_response = s3_client.get_object(
+        Bucket=bucket_name, Key="y_monitoring.parquet"
+    )
+
+    return pd.read_parquet(BytesIO(y_monitoring_response["Body"].read()))
+
+
+def read_predictions_monitoring(
+    area: int, consumer_type: int, start_datetime: datetime
+) -> pd.DataFrame:
+    """
+    Read the monitoring predictions of the given area and consumer type, from the day of start_datetime onwards.
+
+    The batch prediction pipeline appends them to a dataset partitioned by date:
+    predictions_monitoring/date=<YYYY-MM-DD>/part-<write id>.parquet
+    The partitions before the day of start_datetime aren't listed nor read. The parts are downloaded concurrently,
+    then merged in write order, and the first prediction of every hour is kept.
+    Until the batch prediction pipeline migrates it, the legacy predictions_monitoring.parquet blob is read first.
+    """
+
+    bucket_name = get_settings().AWS_BUCKET
+    start_date = pd.Timestamp(start_datetime).floor("D")
+    blob_names = []
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=bucket_name,
+        Prefix="predictions_monitoring/date=",
+        # The keys are listed in lexicographic order, which is the order of the dates.
+        StartAfter=f"predictions_monitoring/date={start_date:%Y-%m-%d}",
+    ):
+        blob_names.extend(
+            blob["Key"]
+            for blob in page.get("Contents", [])
+            if blob["Key"].endswith(".parquet")
+        )
+    blob_names = [LEGACY_PREDICTIONS_BLOB_NAME] + sorted(blob_names)
+
+    def read_part(blob_name: str) -> Optional[pd.DataFrame]:
+        try:
+            response = s3_client.get_object(Bucket=bucket_name, Key=blob_name)
+        except s3_client.exceptions.NoSuchKey:
+            # The legacy blob is deleted once migrated and a part might be deleted by a concurrent compaction.
+            return None
+
+        part = pd.read_parquet(BytesIO(response["Body"].read()))
+        is_selected = (
+            (part.index.get_level_values("area") == area)
+            & (part.index.get_level_values("consumer_type") == consumer_type)
+            & (get_datetimes(part) >= start_date)
+        )
+
+        return part[is_selected]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        parts = [
+            part for part in executor.map(read_part, blob_names) if part is not None
+        ]
+
+    if len(parts) == 0:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No data found for the given area and consumer type: {area}, {consumer_type}",
+        )
+
+    predictions = pd.concat(parts)
+    predictions = predictions[~predictions.index.duplicated(keep="first")]
+
+    return predictions.sort_index()
+
+
+def get_first_datetime(data: pd.DataFrame) -> datetime:
+    """Get the first hour of data."""
+
+    return get_datetimes(data).min()
+
+
+def get_datetimes(data: pd.DataFrame) -> pd.DatetimeIndex:
+    """Get the hours of data. Depending on the parquet engine, they are read as periods or as hours since the epoch."""
+
+    datetimes = data.index.get_level_values("datetime_utc")
+    if isinstance(datetimes, pd.PeriodIndex):
+        return datetimes.to_timestamp()
+    if pd.api.types.is_integer_dtype(datetimes):
+        return pd.to_datetime(datetimes, unit="h")
+
+    return pd.DatetimeIndex(datetimes)
@@ -1,8 +1,11 @@
 import gcsfs
-from typing import Any, List
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, List, Optional
 
 import pandas as pd
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 
 from api import schemas
 from api.config import get_settings
@@ -13,6 +16,9 @@ fs = gcsfs.GCSFileSystem(
     token=get_settings().GCP_SERVICE_ACCOUNT_JSON_PATH,
 )
 
+# Single file that held all the monitoring predictions before they were partitioned by date.
+LEGACY_PREDICTIONS_BLOB_NAME = "predictions_monitoring.parquet"
+
 api_router = APIRouter()
 
 
@@ -145,12 +151,11 @@ async def get_predictions(area: int, consumer_type: int) -> Any:
     Get forecasted predictions based on the given area and consumer type.
     """
 
-    # Download the data from GCS.
-    y_monitoring = pd.read_parquet(
-        f"{get_settings().GCP_BUCKET}/y_monitoring.parquet", filesystem=fs
-    )
-    predictions_monitoring = pd.read_parquet(
-        f"{get_settings().GCP_BUCKET}/predictions_monitoring.parquet", filesystem=fs
+    # Download the data from GCS. The file system is blocking, thus it runs in the threadpool.
+    y_monitoring = await run_in_threadpool(
+        pd.read_parquet,
+        f"{get_settings().GCP_BUCKET}/y_monitoring.parquet",
+        filesystem=fs,
     )
 
     # Query the data for the given area and consumer type.
@@ -158,6 +163,25 @@ async def get_predictions(area: int, consumer_type: int) -> Any:
         y_monitoring = y_monitoring.xs(
             (area, consumer_type), level=["area", "consumer_type"]
         )
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No data found for the given area and consumer typefrontend: {area}, {consumer_type}",
+        )
+    if len(y_monitoring) == 0:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No data found for the given area and consumer type: {area}, {consumer_type}",
+        )
+
+    # Only the predictions from the first monitored day onwards are read.
+    predictions_monitoring = await run_in_threadpool(
+        read_predictions_monitoring,
+        area,
+        consumer_type,
+        start_datetime=get_first_datetime(y_monitoring),
+    )
+    try:
         predictions_monitoring = predictions_monitoring.xs(
             (area, consumer_type), level=["area", "consumer_type"]
         )
@@ -167,7 +191,7 @@ async def get_predictions(area: int, consumer_type: int) -> Any:
             detail=f"No data found for the given area and consumer typefrontend: {area}, {consumer_type}",
         )
 
-    if len(y_monitoring) == 0 or len(predictions_monitoring) == 0:
+    if len(predictions_monitoring) == 0:
         raise HTTPException(
             status_code=404,
             detail=f"No data found for the given area and consumer type: {area}, {consumer_type}",
@@ -194,3 +218,79 @@ async def get_predictions(area: int, consumer_type: int) -> Any:
     }
 
     return results
+
+
+def read_predictions_monitoring(
+    area: int, consumer_type: int, start_datetime: datetime
+) -> pd.DataFrame:
+    """
+    Read the monitoring predictions of the given area and consumer type, from the day of start_datetime onwards.
+
+    The batch prediction pipeline appends them to a dataset partitioned by date:
+    predictions_monitoring/date=<YYYY-MM-DD>/part-<write id>.parquet
+    The partitions before the day of start_datetime aren't read. The parts are downloaded concurrently,
+    then merged in write order, and the first prediction of every hour is kept.
+    Until the batch prediction pipeline migrates it, the legacy predictions_monitoring.parquet blob is read first.
+    """
+
+    start_date = pd.Timestamp(start_datetime).floor("D")
+    start_partition = f"date={start_date:%Y-%m-%d}"
+    try:
+        partition_paths = fs.ls(f"{get_settings().GCP_BUCKET}/predictions_monitoring")
+    except FileNotFoundError:
+        partition_paths = []
+    paths = []
+    for partition_path in partition_paths:
+        partition_path = partition_path.rstrip("/")
+        if partition_path.split("/")[-1] >= start_partition:
+            paths.extend(fs.glob(f"{partition_path}/*.parquet"))
+    paths = [f"{get_settings().GCP_BUCKET}/{LEGACY_PREDICTIONS_BLOB_NAME}"] + sorted(
+        paths
+    )
+
+    def read_part(path: str) -> Optional[pd.DataFrame]:
+        try:
+            part = pd.read_parquet(path, filesystem=fs)
+        except FileNotFoundError:
+            # The legacy blob is deleted once migrated and a part might be deleted by a concurrent compaction.
+            return None
+
+        is_selected = (
+            (part.index.get_level_values("area") == area)
+            & (part.index.get_level_values("consumer_type") == consumer_type)
+            & (get_datetimes(part) >= start_date)
+        )
+
+        return part[is_selected]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        parts = [part for part in executor.map(read_part, paths) if part is not None]
+
+    if len(parts) == 0:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No data found for the given area and consumer type: {area}, {consumer_type}",
+        )
+
+    predictions = pd.concat(parts)
+    predictions = predictions[~predictions.index.duplicated(keep="first")]
+
+    return predictions.sort_index()
+
+
+def get_first_datetime(data: pd.DataFrame) -> datetime:
+    """Get the first hour of data."""
+
+    return get_datetimes(data).min()
+
+
+def get_datetimes(data: pd.DataFrame) -> pd.DatetimeIndex:
+    """Get the hours of data. Depending on the parquet engine, they are read as periods or as hours since the epoch."""
+
+    datetimes = data.index.get_level_values("datetime_utc")
+    if isinstance(datetimes, pd.PeriodIndex):
+        return datetimes.to_timestamp()
+    if pd.api.types.is_integer_dtype(datetimes):
+        return pd.to_datetime(datetimes, unit="h")
+
+    return pd.DatetimeIndex(datetimes)
@@ -0,0 +1,7 @@
+import os
+
+# The S3 client is created from the settings when api.views is imported.
+os.environ.setdefault("APP_API_AWS_BUCKET", "test-bucket")
+os.environ.setdefault("APP_API_AWS_ACCESS_KEY_ID", "test-access-key-id")
+os.environ.setdefault("APP_API_AWS_SECRET_ACCESS_KEY", "test-secret-access-key")
+os.environ.setdefault("APP_API_AWS_DEFAULT_REGION", "us-east-1")
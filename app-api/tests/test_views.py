@@ -0,0 +1,184 @@
+from io import BytesIO
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+
+from api import views
+
+
+class NoSuchKey(Exception):
+    pass
+
+
+class S3Client:
+    """Fake S3 client that serves the objects of a single bucket from memory."""
+
+    exceptions = SimpleNamespace(NoSuchKey=NoSuchKey)
+
+    def __init__(self, page_size: int = 2):
+        self.page_size = page_size
+        self.objects = {}
+        self.read_keys = []
+
+    def put(self, key: str, data: pd.DataFrame):
+        buffer = BytesIO()
+        data.to_parquet(buffer, index=True)
+        self.objects[key] = buffer.getvalue()
+
+    def get_object(self, Bucket: str, Key: str) -> dict:
+        if Key not in self.objects:
+            raise NoSuchKey(Key)
+        self.read_keys.append(Key)
+
+        return {"Body": BytesIO(self.objects[Key])}
+
+    def get_paginator(self, operation_name: str):
+        return SimpleNamespace(paginate=self.paginate)
+
+    def paginate(self, Bucket: str, Prefix: str, StartAfter: str = ""):
+        keys = sorted(
+            key for key in self.objects if key.startswith(Prefix) and key > StartAfter
+        )
+        for start in range(0, len(keys), self.page_size):
+            yield {
+                "Contents": [
+                    {"Key": key} for key in keys[start : start + self.page_size]
+                ]
+            }
+
+
+def make_predictions(start: str, n_hours: int, value: float) -> pd.DataFrame:
+    index = pd.MultiIndex.from_product(
+        [
+            [1, 2],
+            [111, 112],
+            pd.period_range(start, periods=n_hours, freq="H"),
+        ],
+        names=["area", "consumer_type", "datetime_utc"],
+    )
+
+    return pd.DataFrame({"energy_consumption": value}, index=index)
+
+
+def select(predictions: pd.DataFrame, area: int, consumer_type: int) -> pd.DataFrame:
+    is_selected = (predictions.index.get_level_values("area") == area) & (
+        predictions.index.get_level_values("consumer_type") == consumer_type
+    )
+
+    return predictions[is_selected]
+
+
+def part_name(date: str, write_id: str) -> str:
+    return f"predictions_monitoring/date={date}/part-{write_id}.parquet"
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    client = S3Client()
+    monkeypatch.setattr(views, "s3_client", client)
+
+    return client
+
+
+def test_first_write_wins_from_the_day_of_start_datetime(s3_client):
+    for date in ["2023-04-01", "2023-04-02", "2023-04-03"]:
+        s3_client.put(
+            part_name(date, "20230401T000000000000-a"),
+            make_predictions(f"{date} 00:00", 24, value=1.0),
+        )
+    s3_client.put(
+        part_name("2023-04-03", "20230402T000000000000-b"),
+        make_predictions("2023-04-03 00:00", 48, value=2.0),
+    )
+
+    predictions = views.read_predictions_monitoring(
+        1, 112, start_datetime=pd.Timestamp("2023-04-02 06:00")
+    )
+
+    pd.testing.assert_frame_equal(
+        predictions,
+        select(
+            pd.concat(
+                [
+                    make_predictions("2023-04-02 00:00", 48, value=1.0),
+                    make_predictions("2023-04-04 00:00", 24, value=2.0),
+                ]
+            ),
+            1,
+            112,
+        ).sort_index(),
+    )
+    # The partitions before the day of start_datetime aren't read.
+    assert part_name("2023-04-01", "20230401T000000000000-a") not in s3_client.read_keys
+
+
+def test_legacy_blob_is_read_first(s3_client):
+    s3_client.put(
+        views.LEGACY_PREDICTIONS_BLOB_NAME,
+        make_predictions("2023-04-01 00:00", 72, value=0.0),
+    )
+    s3_client.put(
+        part_name("2023-04-03", "20230403T000000000000-a"),
+        make_predictions("2023-04-03 00:00", 48, value=1.0),
+    )
+
+    predictions = views.read_predictions_monitoring(
+        2, 111, start_datetime=pd.Timestamp("2023-04-02 00:00")
+    )
+
+    pd.testing.assert_frame_equal(
+        predictions,
+        select(
+            pd.concat(
+                [
+                    make_predictions("2023-04-02 00:00", 48, value=0.0),
+                    make_predictions("2023-04-04 00:00", 24, value=1.0),
+                ]
+            ),
+            2,
+            111,
+        ).sort_index(),
+    )
+
+
+def test_legacy_blob_alone_is_read(s3_client):
+    legacy_predictions = make_predictions("2023-04-01 00:00", 24, value=0.0)
+    s3_client.put(views.LEGACY_PREDICTIONS_BLOB_NAME, legacy_predictions)
+
+    predictions = views.read_predictions_monitoring(
+        1, 111, start_datetime=pd.Timestamp("2023-04-01 00:00")
+    )
+
+    pd.testing.assert_frame_equal(predictions, select(legacy_predictions, 1, 111))
+
+
+def test_missing_predictions_raise_not_found(s3_client):
+    with pytest.raises(HTTPException) as error:
+        views.read_predictions_monitoring(
+            1, 111, start_datetime=pd.Timestamp("2023-04-01 00:00")
+        )
+
+    assert error.value.status_code == 404
+
+
+@pytest.mark.parametrize(
+    "datetimes",
+    [
+        pd.period_range("2023-04-01 05:00", periods=3, freq="H"),
+        pd.date_range("2023-04-01 05:00", periods=3, freq="H"),
+        pd.Index(
+            pd.date_range("2023-04-01 05:00", periods=3, freq="H").asi8
+            // (3600 * 10**9)
+        ),
+    ],
+    ids=["periods", "datetimes", "hours"],
+)
+def test_get_first_datetime(datetimes):
+    data = pd.DataFrame(
+        {"energy_consumption": [1.0, 2.0, 3.0]},
+        index=pd.Index(datetimes[::-1], name="datetime_utc"),
+    )
+
+    assert views.get_first_datetime(data) == pd.Timestamp("2023-04-01 05:00")
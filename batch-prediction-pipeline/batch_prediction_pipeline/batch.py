@@ -1,13 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 
 import hopsworks
 import pandas as pd
+from joblib import effective_n_jobs
 
 from batch_prediction_pipeline import data
+from batch_prediction_pipeline import model_cache
+from batch_prediction_pipeline import monitoring_store
 from batch_prediction_pipeline import settings
+from batch_prediction_pipeline import storage
 from batch_prediction_pipeline import utils
+from training_pipeline import compiled
 
 
 logger = utils.get_logger(__name__)
@@ -19,15 +25,24 @@ def predict(
     model_version: Optional[int] = None,
     start_datetime: Optional[datetime] = None,
     end_datetime: Optional[datetime] = None,
+    n_jobs: Optional[int] = None,
+    shadow_model_versions: Optional[List[int]] = None,
 ) -> None:
     """Main function used to do batch predictions.
 
+    Besides the production model, shadow models, e.g. challengers of the production model, can be scored in the same
+    run. The production model is scored exactly as without shadow models and the shadow models are scored on its
+    lookback window. The predictions of every shadow model are saved under its version, next to the ones of the
+    production model.
+
     Args:
         fh (int, optional): forecast horizon. Defaults to 24.
         feature_view_version (Optional[int], optional): feature store feature view version. If None is provided, it will try to load it from the cached feature_view_metadata.json file.
         model_version (Optional[int], optional): model version to load from the model registry. If None is provided, it will try to load it from the cached train_metadata.json file.
         start_datetime (Optional[datetime], optional): start datetime used for extracting features for predictions. If None is provided, it will try to load it from the cached feature_pipeline_metadata.json file.
         end_datetime (Optional[datetime], optional): end datetime used for extracting features for predictions. If None is provided, it will try to load it from the cached feature_pipeline_metadata.json file.
+        n_jobs (Optional[int], optional): number of worker processes the series are sharded across. If None is provided, it is read from the BATCH_N_JOBS setting, which defaults to 1.
+        shadow_model_versions (Optional[List[int]], optional): versions of the models scored in shadow mode. If None is provided, they are read from the comma-separated SHADOW_MODEL_VERSIONS setting, which defaults to none.
     """
 
     if feature_view_version is None:
@@ -46,10 +61,14 @@ def predict(
             feature_pipeline_metadata["export_datetime_utc_end"],
             feature_pipeline_metadata["datetime_format"],
         )
+    shadow_model_versions = get_shadow_model_versions(
+        shadow_model_versions, model_version
+    )
 
     logger.info("Connecting to the feature store...")
     project = hopsworks.login(
-        api_key_value=settings.SETTINGS["FS_API_KEY"], project=settings.SETTINGS["FS_PROJECT_NAME"]
+        api_key_value=settings.SETTINGS["FS_API_KEY"],
+        project=settings.SETTINGS["FS_PROJECT_NAME"],
     )
     fs = project.get_feature_store()
     logger.info("Successfully connected to the feature store.")
@@ -66,10 +85,24 @@ def predict(
 
     logger.info("Loading model from model registry...")
     model = load_model_from_model_registry(project, model_version)
+    shadow_models = {
+        shadow_model_version: load_model_from_model_registry(
+            project, shadow_model_version
+        )
+        for shadow_model_version in shadow_model_versions
+    }
     logger.info("Successfully loaded model from model registry.")
 
     logger.info("Making predictions...")
-    predictions = forecast(model, X, fh=fh)
+    if len(shadow_models) == 0:
+        predictions = forecast(model, X, fh=fh, n_jobs=n_jobs)
+        shadow_predictions = {}
+    else:
+        logger.info(f"Scoring the shadow model versions {shadow_model_versions}.")
+        shadow_predictions = forecast_many(
+            {model_version: model, **shadow_models}, X, fh=fh, n_jobs=n_jobs
+        )
+        predictions = shadow_predictions.pop(model_version)
     predictions_start_datetime = predictions.index.get_level_values(
         level="datetime_utc"
     ).min()
@@ -82,24 +115,56 @@ def predict(
     logger.info("Successfully made predictions.")
 
     logger.info("Saving predictions...")
-    save(X, y, predictions)
+    save(X, y, predictions, shadow_predictions=shadow_predictions)
     logger.info("Successfully saved predictions.")
 
     # Save the predictions to the bucket for monitoring.
-    logger.info("Merging predictions with cached predictions...")
+    logger.info("Appending predictions to the monitoring predictions...")
     save_for_monitoring(predictions, start_datetime)
-    logger.info("Successfully merged predictions with cached predictions...")
+    for shadow_model_version, shadow_model_predictions in shadow_predictions.items():
+        save_for_monitoring(
+            shadow_model_predictions,
+            start_datetime,
+            shadow_model_version=shadow_model_version,
+        )
+    logger.info("Successfully appended predictions to the monitoring predictions.")
+
+    logger.info(f"Storage latency metrics: {storage.get_storage().metrics.summary()}")
 
 
 def load_model_from_model_registry(project, model_version: int):
     """
     This function loads a model from the Model Registry.
     The model is downloaded, saved locally, and loaded into memory.
+    The downloaded model is kept in the local model cache, therefore the model registry is reached
+    only the first time a model version is used. Within a process, the loaded model is reused.
+    """
+
+    def download():
+        mr = project.get_model_registry()
+        model_registry_reference = mr.get_model(
+            name="best_model", version=model_version
+        )
+
+        return model_registry_reference.download()
+
+    return model_cache.get_model_cache().load(
+        "best_model", model_version, download=download, loader=load_model_dir
+    )
+
+
+def load_model_dir(model_dir: Path):
     """
+    Load the model from its downloaded directory.
+    If the model version ships a model bundle, it is memory-mapped instead of unpickling the sktime pipeline.
+    """
+
+    bundle_dir = Path(model_dir) / "best_model_bundle"
+    if (bundle_dir / "manifest.json").exists():
+        logger.info(f"Loading the model bundle from {bundle_dir}.")
+
+        return compiled.CompiledForecaster.load(bundle_dir)
 
-    mr = project.get_model_registry()
-    model_registry_reference = mr.get_model(name="best_model", version=model_version)
-    model_dir = model_registry_reference.download()
     model_path = Path(model_dir) / "best_model.pkl"
 
     model = utils.load_model(model_path)
@@ -107,19 +172,151 @@ def load_model_from_model_registry(project, model_version: int):
     return model
 
 
-def forecast(model, X: pd.DataFrame, fh: int = 24):
+def forecast(model, X: pd.DataFrame, fh: int = 24, n_jobs: Optional[int] = None):
     """
     Get a forecast of the total load for the given areas and consumer types.
 
+    The sktime pipeline is run by the batched inference engine of training_pipeline.compiled: the lookback window of every
+    series is extracted once, and every step of the recursive forecast calls the LightGBM regressor once for all
+    the series. The predictions are the same as the ones of model.predict(). Set BATCHED_INFERENCE_ENABLED=false
+    to run the sktime pipeline instead. The engine forecasts from the cutoff stored in the model, thus it raises
+    a ValueError if it isn't the latest hour of X.
+
     Args:
-        model (sklearn.base.BaseEstimator): Fitted model that implements the predict method.
+        model (sklearn.base.BaseEstimator): Fitted model that implements the predict method or a compiled model bundle.
         X (pd.DataFrame): Exogenous data with area, consumer_type, and datetime_utc as index.
         fh (int): Forecast horizon.
+        n_jobs (Optional[int]): Number of worker processes the series are sharded across.
+            If None, it is read from the BATCH_N_JOBS setting, which defaults to 1.
 
     Returns:
         pd.DataFrame: Forecast of total load for each area, consumer_type, and datetime_utc.
     """
 
+    if isinstance(model, compiled.CompiledForecaster):
+        check_cutoff(model, X)
+        # The compiled model computes the exogenous variables of the forecast horizon from its feature recipe.
+        predictions = compiled.predict_sharded(
+            model, fh=fh, n_jobs=get_n_jobs(n_jobs), tmp_dir=settings.OUTPUT_DIR
+        )
+
+        return predictions.astype(settings.PRECISION)
+
+    index = get_forecast_index(X, fh)
+
+    n_jobs = get_n_jobs(n_jobs)
+    # The trees are compiled only when the engine is sharded, because the workers load them from a model bundle.
+    inference_engine = get_inference_engine(model, compile_trees=n_jobs > 1)
+    if inference_engine is not None:
+        check_cutoff(inference_engine, X)
+        predictions = compiled.predict_sharded(
+            inference_engine, fh=fh, n_jobs=n_jobs, tmp_dir=settings.OUTPUT_DIR
+        )
+        predictions = predictions.reindex(index)
+        predictions = predictions.astype(settings.PRECISION)
+
+        return predictions
+
+    X_forecast = pd.DataFrame(index=index)
+    X_forecast["area_exog"] = X_forecast.index.get_level_values(0)
+    X_forecast["consumer_type_exog"] = X_forecast.index.get_level_values(1)
+    predictions = model.predict(X=X_forecast)
+    predictions = predictions.astype(settings.PRECISION)
+
+    return predictions
+
+
+def forecast_many(
+    models: Dict[int, object],
+    X: pd.DataFrame,
+    fh: int = 24,
+    n_jobs: Optional[int] = None,
+) -> Dict[int, pd.DataFrame]:
+    """
+    Get the forecasts of several models in a single pass: the production model, which is the first one, and its
+    shadow models.
+
+    The production model is scored on the history stored in it, as by forecast(), thus its predictions don't depend
+    on the shadow models. The shadow models are scored on the same lookback window and the recursive forecasts of all
+    the models run in lockstep on it, thus every extra model adds only the cost of its regressor and of its lag &
+    window features. A shadow model that the batched inference engine doesn't support or that needs a longer history
+    than the production model stores is scored alone with forecast(), and skipped with a warning if that fails.
+
+    Args:
+        models (Dict[int, object]): Fitted models or compiled model bundles keyed by their version, production model first.
+        X (pd.DataFrame): Exogenous data with area, consumer_type, and datetime_utc as index.
+        fh (int): Forecast horizon.
+        n_jobs (Optional[int]): Number of worker processes the series are sharded across.
+            If None, it is read from the BATCH_N_JOBS setting, which defaults to 1.
+
+    Returns:
+        Dict[int, pd.DataFrame]: Forecast of total load of every model, keyed by its version.
+    """
+
+    n_jobs = get_n_jobs(n_jobs)
+    production_model_version, production_model = next(iter(models.items()))
+    if isinstance(production_model, compiled.CompiledForecaster):
+        production_engine = production_model
+    else:
+        # The trees are compiled only when the engine is sharded, as in forecast().
+        production_engine = get_inference_engine(
+            production_model, compile_trees=n_jobs > 1
+        )
+
+    inference_engines = {}
+    if production_engine is not None:
+        check_cutoff(production_engine, X)
+        inference_engines[production_model_version] = production_engine
+
+        stored_history_length = production_engine.history.shape[1]
+        for model_version, model in list(models.items())[1:]:
+            if isinstance(model, compiled.CompiledForecaster):
+                inference_engine = model
+            else:
+                inference_engine = get_inference_engine(model, compile_trees=n_jobs > 1)
+            if (
+                inference_engine is not None
+                and inference_engine.history_length <= stored_history_length
+            ):
+                inference_engines[model_version] = inference_engine
+
+    predictions = compiled.predict_many(inference_engines, fh=fh, n_jobs=n_jobs)
+    if not isinstance(production_model, compiled.CompiledForecaster):
+        index = get_forecast_index(X, fh)
+        predictions = {
+            model_version: model_predictions.reindex(index)
+            for model_version, model_predictions in predictions.items()
+        }
+    predictions = {
+        model_version: model_predictions.astype(settings.PRECISION)
+        for model_version, model_predictions in predictions.items()
+    }
+
+    for model_version, model in models.items():
+        if model_version in predictions:
+            continue
+
+        if model_version == production_model_version:
+            predictions[model_version] = forecast(model, X, fh=fh, n_jobs=n_jobs)
+        else:
+            # A shadow model must never fail the production predictions.
+            try:
+                predictions[model_version] = forecast(model, X, fh=fh, n_jobs=n_jobs)
+            except ValueError as e:
+                logger.warning(
+                    f"Skipping the shadow model version {model_version}: {e}"
+                )
+
+    return {
+        model_version: predictions[model_version]
+        for model_version in models
+        if model_version in predictions
+    }
+
+
+def get_forecast_index(X: pd.DataFrame, fh: int) -> pd.MultiIndex:
+    """Get the index of the forecast: every area & consumer_type of X over the fh hours after the latest one of X."""
+
     all_areas = X.index.get_level_values(level=0).unique()
     all_consumer_types = X.index.get_level_values(level=1).unique()
     latest_datetime = X.index.get_level_values(level=2).max()
@@ -131,95 +328,151 @@ def forecast(model, X: pd.DataFrame, fh: int = 24):
     )
     fh_range = pd.PeriodIndex(fh_range, freq="H")
 
-    index = pd.MultiIndex.from_product(
+    return pd.MultiIndex.from_product(
         [all_areas, all_consumer_types, fh_range],
         names=["area", "consumer_type", "datetime_utc"],
     )
 
-    X_forecast = pd.DataFrame(index=index)
-    X_forecast["area_exog"] = X_forecast.index.get_level_values(0)
-    X_forecast["consumer_type_exog"] = X_forecast.index.get_level_values(1)
-    predictions = model.predict(X=X_forecast)
 
-    return predictions
+def check_cutoff(inference_engine: compiled.CompiledForecaster, X: pd.DataFrame):
+    """Check that the engine forecasts the hours right after the latest one of X, as its output is aligned on X."""
+
+    latest_datetime = X.index.get_level_values(level=2).max()
+    cutoff = pd.Period(
+        ordinal=inference_engine.cutoff, freq=inference_engine.recipe["freq"]
+    )
+    if cutoff != latest_datetime:
+        raise ValueError(
+            f"The model was fitted up to {cutoff}, but the features end at {latest_datetime}. "
+            "Its forecasts wouldn't be aligned with the features."
+        )
 
 
-def save(X: pd.DataFrame, y: pd.DataFrame, predictions: pd.DataFrame):
-    """Save the input data, target data, and predictions to GCS."""
+def get_inference_engine(
+    model, compile_trees: bool = False
+) -> Optional[compiled.CompiledForecaster]:
+    """
+    Build the batched inference engine of a fitted sktime pipeline.
 
-    # Get the bucket object from the GCS client.
-    bucket_name = utils.get_bucket()
+    Returns: The engine or None if it is disabled or the model isn't supported, e.g. a sharded model.
+    """
 
-    # Save the input data and target data to the bucket.
-    for df, blob_name in zip(
-        [X, y, predictions], ["X.parquet", "y.parquet", "predictions.parquet"]
+    if (
+        str(settings.SETTINGS.get("BATCHED_INFERENCE_ENABLED", "true")).lower()
+        != "true"
     ):
-        logger.info(f"Saving {blob_name} to bucket...")
-        utils.write_blob_to(
-            bucket_name=bucket_name,
-            blob_name=str(blob_name),
-            data=df,
+        return None
+
+    try:
+        return compiled.compile_model(model, compile_trees=compile_trees)
+    except (AttributeError, ValueError) as e:
+        logger.warning(
+            f"Can't run {type(model).__name__} with the batched inference engine: {e}. Using model.predict() instead."
         )
-        logger.info(f"Successfully saved {blob_name} to bucket.")
 
+        return None
 
-def save_for_monitoring(predictions: pd.DataFrame, start_datetime: datetime):
-    """Save predictions to GCS for monitoring.
 
-    The predictions are saved as a parquet file in GCS.
-    The predictions are saved in a bucket with the following structure:
-    gs://<BUCKET_NAME>/predictions_monitoring.parquet
+def get_n_jobs(n_jobs: Optional[int] = None) -> int:
+    """Resolve the number of worker processes. Negative values follow the joblib convention, e.g. -1 for all the cores."""
 
-    The predictions are stored in a multiindex dataframe with the following indexes:
-    - area: The area of the predictions, e.g. "DK1".
-    - consumer_type: The consumer type of the predictions, e.g. "residential".
-    - datetime_utc: The timestamp of the predictions, e.g. "2020-01-01 00:00:00" with a frequency of 1 hour.
-    """
+    if n_jobs is None:
+        n_jobs = int(settings.SETTINGS.get("BATCH_N_JOBS", 1))
 
-    bucket_name = utils.get_bucket()
+    return effective_n_jobs(n_jobs)
 
-    cached_predictions = utils.read_blob_from(
-        bucket_name=bucket_name, blob_name=f"predictions_monitoring.parquet"
-    )
-    has_cached_predictions = cached_predictions is not None
 
-    if has_cached_predictions is True:
-        # Merge predictions with cached predictions.
-        cached_predictions.index = cached_predictions.index.set_levels(
-            pd.to_datetime(cached_predictions.index.levels[2], unit="h").to_period("H"),
-            level=2,
-        )
+def get_shadow_model_versions(
+    shadow_model_versions: Optional[List[int]] = None,
+    model_version: Optional[int] = None,
+) -> List[int]:
+    """Resolve the versions of the shadow models, without duplicates and without the production model version."""
+
+    if shadow_model_versions is None:
+        shadow_model_versions = [
+            int(shadow_model_version)
+            for shadow_model_version in str(
+                settings.SETTINGS.get("SHADOW_MODEL_VERSIONS", "")
+            ).split(",")
+            if shadow_model_version.strip() != ""
+        ]
+
+    return [
+        shadow_model_version
+        for shadow_model_version in dict.fromkeys(shadow_model_versions)
+        if shadow_model_version != model_version
+    ]
 
-        merged_predictions = predictions.merge(
-            cached_predictions,
-            left_index=True,
-            right_index=True,
-            how="outer",
-            suffixes=("_new", "_cached"),
-        )
-        new_predictions = merged_predictions.filter(regex=".*?_new")
-        new_predictions.columns = new_predictions.columns.str.replace("_new", "")
-        cached_predictions = merged_predictions.filter(regex=".*?_cached")
-        cached_predictions.columns = cached_predictions.columns.str.replace(
-            "_cached", ""
-        )
 
-        # NOTE: fillna() not working properly on multindex DataFrames. Got nasty bugs because of it.
-        new_predictions.update(cached_predictions)
-        predictions = new_predictions
+def save(
+    X: pd.DataFrame,
+    y: pd.DataFrame,
+    predictions: pd.DataFrame,
+    shadow_predictions: Optional[Dict[int, pd.DataFrame]] = None,
+):
+    """Save the input data, target data, and predictions to the bucket.
+
+    The predictions of every shadow model are saved to shadow/model_version=<version>/predictions.parquet.
+
+    The blobs are independent, thus they are uploaded concurrently. Every blob is streamed while it is serialized,
+    with a multipart upload for the large ones.
+    """
+
+    # Get the name of the bucket of the configured storage backend.
+    bucket_name = utils.get_bucket()
+
+    # Save the input data and target data to the bucket.
+    blobs = {"X.parquet": X, "y.parquet": y, "predictions.parquet": predictions}
+    for shadow_model_version, df in (shadow_predictions or {}).items():
+        blobs[f"shadow/model_version={shadow_model_version}/predictions.parquet"] = df
+    with ThreadPoolExecutor(max_workers=len(blobs)) as executor:
+        futures = {}
+        for blob_name, df in blobs.items():
+            logger.info(f"Saving {blob_name} to bucket...")
+            futures[blob_name] = executor.submit(
+                utils.write_blob_to,
+                bucket_name=bucket_name,
+                blob_name=blob_name,
+                data=df,
+            )
+
+        for blob_name, future in futures.items():
+            future.result()
+            logger.info(f"Successfully saved {blob_name} to bucket.")
+
+
+def save_for_monitoring(
+    predictions: pd.DataFrame,
+    start_datetime: datetime,
+    shadow_model_version: Optional[int] = None,
+):
+    """Save predictions to S3 for monitoring.
+
+    The predictions are appended to a dataset partitioned by the date of the forecasted hour:
+    s3://<BUCKET_NAME>/predictions_monitoring/date=<YYYY-MM-DD>/part-<write id>.parquet
+    The predictions of a shadow model are appended to their own dataset:
+    s3://<BUCKET_NAME>/predictions_monitoring_shadow/model_version=<version>/date=<YYYY-MM-DD>/part-<write id>.parquet
+
+    Only the new predictions are written, thus the cost doesn't grow with the history. The partitions are merged
+    and the predictions forecasted for an hour before start_datetime are dropped by monitoring_store.compact(),
+    which runs after the batch predictions.
+
+    The predictions are stored in a multiindex dataframe with the following indexes:
+    - area: The area of the predictions, e.g. "DK1".
+    - consumer_type: The consumer type of the predictions, e.g. "residential".
+    - datetime_utc: The timestamp of the predictions, e.g. "2020-01-01 00:00:00" with a frequency of 1 hour.
+    """
 
     predictions = predictions.loc[
         predictions.index.get_level_values("datetime_utc")
         >= pd.Period(start_datetime, freq="H")
     ]
-    predictions = predictions.dropna(subset=["energy_consumption"])
 
-    utils.write_blob_to(
-        bucket_name=bucket_name,
-        blob_name=f"predictions_monitoring.parquet",
-        data=predictions,
+    blob_names = monitoring_store.get_predictions_store(shadow_model_version).append(
+        predictions
     )
-    logger.info(f"Successfully cached predictions forecasted before {start_datetime}.")
+    logger.info(f"Successfully appended predictions to {len(blob_names)} partitions.")
+
 
 if __name__ == "__main__":
     predict()
@@ -5,6 +5,8 @@ import pandas as pd
 
 from hsfs.feature_store import FeatureStore
 
+from batch_prediction_pipeline.settings import PRECISION
+
 
 def load_data_from_feature_store(
     fs: FeatureStore,
@@ -12,6 +14,7 @@ def load_data_from_feature_store(
     start_datetime: datetime,
     end_datetime: datetime,
     target: str = "energy_consumption",
+    precision: str = PRECISION,
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """Loads data for a given time range from the feature store.
 
@@ -21,6 +24,7 @@ def load_data_from_feature_store(
         start_datetime: Start datetime.
         end_datetime: End datetime.
         target: Name of the target feature.
+        precision: Floating point precision of the time series to be forecasted.
 
     Returns:
         Tuple of exogenous variables and the time series to be forecasted.
@@ -38,6 +42,6 @@ def load_data_from_feature_store(
     # Prepare exogenous variables.
     X = data.drop(columns=[target])
     # Prepare the time series to be forecasted.
-    y = data[[target]]
+    y = data[[target]].astype(precision)
 
     return X, y
@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable, Optional, Union
+
+from batch_prediction_pipeline import settings
+from batch_prediction_pipeline import utils
+
+
+logger = utils.get_logger(__name__)
+
+CHECKSUMS_FILE_NAME = "checksums.json"
+
+
+class ModelCache:
+    """
+    On-disk cache of the model directories downloaded from the model registry, keyed by (name, version),
+    with an in-process memo of the loaded models.
+
+    Every cached directory ships the sha256, the size and the modification time of its files, which are computed
+    when the model is downloaded. Before a cached directory is used, only the files whose size or modification time
+    changed are hashed again. A corrupted entry is dropped and downloaded again. When the cache grows over
+    max_size_mb, the least recently used entries are evicted.
+
+    Args:
+        cache_dir: Directory of the cached model directories.
+        max_size_mb: Maximum size of the cached model directories on disk.
+        max_memo_items: Maximum number of loaded models kept in memory.
+        verify_checksums: Whether to hash every file of an entry before using it, which also detects the corruptions
+            that keep the size and the modification time of the files.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path],
+        max_size_mb: float = 2048,
+        max_memo_items: int = 2,
+        verify_checksums: bool = False,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size_mb = max_size_mb
+        self.max_memo_items = max_memo_items
+        self.verify_checksums = verify_checksums
+
+        self._memo = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def load(
+        self,
+        name: str,
+        version: Hashable,
+        download: Callable[[], Union[str, Path]],
+        loader: Callable[[Path], Any],
+    ):
+        """
+        Load a model, from memory, from the disk cache or, if it is not cached yet, from the model registry.
+
+        Args:
+            name: Name of the model.
+            version: Version of the model.
+            download: Function that downloads the model directory and returns its path.
+            loader: Function that loads the model from its directory.
+
+        Returns: The loaded model.
+        """
+
+        key = (name, str(version))
+        model = self._memo.get(key)
+        if model is not None:
+            self._memo.move_to_end(key)
+            logger.info(f"Reusing the in-memory model {name}:{version}.")
+
+            return model
+
+        model_dir = self.get_dir(name, version, download)
+        model = loader(model_dir)
+
+        self._memo[key] = model
+        while len(self._memo) > self.max_memo_items:
+            self._memo.popitem(last=False)
+
+        return model
+
+    def get_dir(
+        self, name: str, version: Hashable, download: Callable[[], Union[str, Path]]
+    ) -> Path:
+        """Get the cached directory of the model, downloading it first if it is missing or corrupted."""
+
+        entry_dir = self._get_entry_dir(name, version)
+        if entry_dir.exists():
+            if verify_dir(entry_dir, full=self.verify_checksums):
+                self.hits += 1
+                # The modification time of the checksums file tracks when the entry was last used.
+                os.utime(entry_dir / CHECKSUMS_FILE_NAME)
+                logger.info(f"Model {name}:{version} found in the model cache.")
+
+                return entry_dir
+
+            logger.warning(
+                f"The cached model {name}:{version} is corrupted. Downloading it again."
+            )
+            shutil.rmtree(entry_dir, ignore_errors=True)
+
+        self.misses += 1
+        logger.info(f"Downloading model {name}:{version} into the model cache.")
+        downloaded_dir = Path(download())
+
+        # Copy into a temporary directory first, so a crash never leaves a partial entry behind.
+        tmp_dir = entry_dir.parent / f".{entry_dir.name}.{uuid.uuid4().hex}"
+        shutil.copytree(downloaded_dir, tmp_dir)
+        write_checksums(tmp_dir)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another process cached the same entry in the meantime.
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self.evict(keep=entry_dir)
+
+        return entry_dir
+
+    def evict(self, keep: Optional[Path] = None):
+        """Remove the least recently used entries until the cache fits in max_size_mb."""
+
+        entries = []
+        for checksums_path in self.cache_dir.glob(f"*/*/{CHECKSUMS_FILE_NAME}"):
+            entry_dir = checksums_path.parent
+            entries.append(
+                (checksums_path.stat().st_mtime, entry_dir, get_dir_size(entry_dir))
+            )
+        entries.sort(key=lambda entry: entry[0])
+
+        total_size = sum(size for _, _, size in entries)
+        for _, entry_dir, size in entries:
+            if total_size <= self.max_size_mb * 1024**2:
+                break
+            if entry_dir == keep:
+                continue
+
+            logger.info(f"Evicting {entry_dir} from the model cache.")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_size -= size
+
+    def clear_memo(self):
+        self._memo.clear()
+
+    def _get_entry_dir(self, name: str, version: Hashable) -> Path:
+        entry_dir = self.cache_dir / name / str(version)
+        entry_dir.parent.mkdir(parents=True, exist_ok=True)
+
+        return entry_dir
+
+
+def write_checksums(model_dir: Path):
+    checksums = {}
+    for path in sorted(model_dir.rglob("*")):
+        if path.is_file():
+            stat = path.stat()
+            checksums[str(path.relative_to(model_dir))] = {
+                "sha256": _hash_file(path),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+            }
+    with open(model_dir / CHECKSUMS_FILE_NAME, "w") as f:
+        json.dump(checksums, f, indent=4)
+
+
+def verify_dir(model_dir: Path, full: bool = False) -> bool:
+    """
+    Check that the files of the directory match their checksums.
+
+    The files whose size and modification time didn't change since the checksums were written are trusted,
+    unless full is True. The other files are hashed.
+    """
+
+    try:
+        with open(model_dir / CHECKSUMS_FILE_NAME) as f:
+            checksums = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return False
+
+    for relative_path, checksum in checksums.items():
+        if not isinstance(checksum, dict):
+            # Entry written by an older version, which stored only the sha256.
+            return False
+
+        path = model_dir / relative_path
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        if stat.st_size != checksum["size"]:
+            return False
+        if not full and stat.st_mtime_ns == checksum["mtime_ns"]:
+            continue
+        if _hash_file(path) != checksum["sha256"]:
+            return False
+
+    return True
+
+
+def get_dir_size(directory: Path) -> int:
+    return sum(path.stat().st_size for path in directory.rglob("*") if path.is_file())
+
+
+def _hash_file(path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+
+_MODEL_CACHE = None
+
+
+def get_model_cache() -> ModelCache:
+    """Get the model cache shared by the whole process. It is configured through the settings."""
+
+    global _MODEL_CACHE
+
+    if _MODEL_CACHE is None:
+        _MODEL_CACHE = ModelCache(
+            cache_dir=settings.SETTINGS.get("MODEL_CACHE_DIR")
+            or settings.OUTPUT_DIR / "model_cache",
+            max_size_mb=float(settings.SETTINGS.get("MODEL_CACHE_MAX_SIZE_MB", 2048)),
+            max_memo_items=int(settings.SETTINGS.get("MODEL_CACHE_MEMO_ITEMS", 2)),
+            verify_checksums=str(
+                settings.SETTINGS.get("MODEL_CACHE_VERIFY_CHECKSUMS", "false")
+            ).lower()
+            == "true",
+        )
+
+    return _MODEL_CACHE
@@ -4,11 +4,11 @@ import hopsworks
 import numpy as np
 import pandas as pd
 
-from sktime.performance_metrics.forecasting import mean_absolute_percentage_error
-
 from batch_prediction_pipeline import data
+from batch_prediction_pipeline import monitoring_store
 from batch_prediction_pipeline import settings
 from batch_prediction_pipeline import utils
+from training_pipeline.metrics import compute_slice_metrics
 
 
 logger = utils.get_logger(__name__)
@@ -27,24 +27,20 @@ def compute(feature_view_version: Optional[int] = None) -> None:
 
     logger.info("Loading old predictions...")
     bucket_name = utils.get_bucket()
-    predictions = utils.read_blob_from(
-        bucket_name=bucket_name, blob_name=f"predictions_monitoring.parquet"
-    )
+    predictions = monitoring_store.get_predictions_store().read()
     if predictions is None or len(predictions) == 0:
         logger.info(
             "Haven't found any predictions to compute the metrics on. Exiting..."
         )
 
         return
-    
-    predictions.index = predictions.index.set_levels(
-        pd.to_datetime(predictions.index.levels[2], unit="h").to_period("H"), level=2
-    )
+
     logger.info("Successfully loaded old predictions.")
 
     logger.info("Connecting to the feature store...")
     project = hopsworks.login(
-        api_key_value=settings.SETTINGS["FS_API_KEY"], project=settings.SETTINGS["FS_PROJECT_NAME"]
+        api_key_value=settings.SETTINGS["FS_API_KEY"],
+        project=settings.SETTINGS["FS_PROJECT_NAME"],
     )
     fs = project.get_feature_store()
     logger.info("Successfully connected to the feature store.")
@@ -94,15 +90,12 @@ def compute(feature_view_version: Optional[int] = None) -> None:
 
         return
 
-    mape_metrics = predictions.groupby("datetime_utc").apply(
-        lambda point_in_time: mean_absolute_percentage_error(
-            point_in_time["energy_consumption_observations"],
-            point_in_time["energy_consumption_predictions"],
-            symmetric=False,
-        )
-    )
-    mape_metrics = mape_metrics.rename("MAPE")
-    metrics = mape_metrics.to_frame()
+    metrics = compute_slice_metrics(
+        predictions["energy_consumption_observations"],
+        predictions["energy_consumption_predictions"],
+        by=["datetime_utc"],
+        metrics=["MAPE"],
+    ).set_index("datetime_utc")
     logger.info("Successfully computed metrics...")
 
     logger.info("Saving new metrics...")
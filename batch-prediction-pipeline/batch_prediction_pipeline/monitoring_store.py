@@ -0,0 +1,367 @@
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import fire
+import numpy as np
+import pandas as pd
+
+from batch_prediction_pipeline import utils
+
+
+logger = utils.get_logger(__name__)
+
+PREDICTIONS_PREFIX = "predictions_monitoring"
+# The predictions of the shadow models are stored under <prefix>/model_version=<version>.
+SHADOW_PREDICTIONS_PREFIX = "predictions_monitoring_shadow"
+# Single file that held all the predictions before they were partitioned. It is migrated by the first append or compaction.
+LEGACY_BLOB_NAME = "predictions_monitoring.parquet"
+LEGACY_WRITE_ID = "00000000T000000000000-legacy"
+
+
+class PredictionsStore:
+    """
+    Append-only store of the predictions used for monitoring, partitioned by the date of the forecasted hour:
+    <prefix>/date=<YYYY-MM-DD>/part-<write id>.parquet
+
+    Every append writes a new part to each partition it touches, thus it costs O(new predictions). The write ids
+    sort in write order. When a (area, consumer_type, datetime_utc) is forecasted more than once, readers keep the
+    first prediction, which is the one forecasted the longest time before the hour.
+    compact() periodically merges the parts of every partition and drops the partitions out of retention.
+    The legacy single-file predictions, if any, are migrated to the partitions by the first append or compaction.
+
+    Args:
+        bucket_name: Name of the bucket.
+        prefix: Prefix of the partitions within the bucket.
+    """
+
+    def __init__(self, bucket_name: str, prefix: str = PREDICTIONS_PREFIX):
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+
+        # The legacy blob is read at most once per store, as it is deleted once migrated.
+        self._legacy_partitions: Optional[Dict[str, pd.DataFrame]] = None
+
+    def append(self, predictions: pd.DataFrame) -> List[str]:
+        """
+        Append the predictions as new parts.
+
+        Returns: The names of the written parts.
+        """
+
+        self._migrate_legacy_blob()
+
+        predictions = predictions.dropna(subset=["energy_consumption"])
+        write_id = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+
+        blob_names = []
+        for date, partition in split_by_date(predictions).items():
+            blob_name = self._get_part_name(date, write_id)
+            utils.write_blob_to(
+                bucket_name=self.bucket_name, blob_name=blob_name, data=partition
+            )
+            blob_names.append(blob_name)
+
+        return blob_names
+
+    def iter_partitions(
+        self,
+        start_datetime: Optional[datetime] = None,
+        end_datetime: Optional[datetime] = None,
+    ) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        Lazily read the partitions overlapping [start_datetime, end_datetime], one at a time and in date order.
+        The partitions out of the range aren't read at all.
+
+        Yields: The date and the merged predictions of every partition.
+        """
+
+        start_date = _to_date(start_datetime)
+        end_date = _to_date(end_datetime)
+
+        parts = self._list_parts()
+        legacy_partitions = self._read_legacy_partitions()
+        for date in sorted(set(parts) | set(legacy_partitions)):
+            if (start_date is not None and date < start_date) or (
+                end_date is not None and date > end_date
+            ):
+                continue
+
+            frames = [legacy_partitions[date]] if date in legacy_partitions else []
+            frames.extend(self._read_parts(parts.get(date, [])))
+            if len(frames) == 0:
+                continue
+
+            partition = merge_predictions(frames)
+            partition = _filter_datetimes(partition, start_datetime, end_datetime)
+            if len(partition) > 0:
+                yield date, partition
+
+    def read(
+        self,
+        start_datetime: Optional[datetime] = None,
+        end_datetime: Optional[datetime] = None,
+    ) -> Optional[pd.DataFrame]:
+        """
+        Read the predictions within [start_datetime, end_datetime].
+
+        Returns: The predictions indexed by area, consumer_type & datetime_utc or None if there aren't any.
+        """
+
+        partitions = [
+            partition
+            for _, partition in self.iter_partitions(start_datetime, end_datetime)
+        ]
+        if len(partitions) == 0:
+            return None
+
+        return pd.concat(partitions).sort_index()
+
+    def compact(
+        self, retention_start: Optional[datetime] = None, min_parts: int = 2
+    ) -> dict:
+        """
+        Merge the parts of every partition into a single part and drop the predictions before retention_start.
+        The legacy single-file predictions, if any, are migrated to the partitions first.
+
+        Args:
+            retention_start: Predictions forecasted for an hour before it are dropped. If None, nothing is dropped.
+            min_parts: Only the partitions with at least min_parts parts are merged.
+
+        Returns: Statistics of the compaction.
+        """
+
+        self._migrate_legacy_blob()
+
+        retention_date = _to_date(retention_start)
+        deleted_blob_names = []
+        n_compacted_partitions = 0
+        n_dropped_partitions = 0
+        for date, blob_names in self._list_parts().items():
+            if retention_date is not None and date < retention_date:
+                deleted_blob_names.extend(blob_names)
+                n_dropped_partitions += 1
+
+                continue
+
+            is_retention_boundary = (
+                retention_date is not None and date == retention_date
+            )
+            if len(blob_names) < min_parts and not is_retention_boundary:
+                continue
+
+            frames = self._read_parts(blob_names)
+            if len(frames) == 0:
+                continue
+
+            partition = merge_predictions(frames)
+            partition = _filter_datetimes(partition, start_datetime=retention_start)
+            if len(partition) == 0:
+                deleted_blob_names.extend(blob_names)
+                n_dropped_partitions += 1
+
+                continue
+
+            # The merged part takes the place of the last merged part in the write order,
+            # therefore it is still read before the parts appended after the compaction started.
+            compacted_blob_name = blob_names[-1]
+            if not compacted_blob_name.endswith("-compacted.parquet"):
+                compacted_blob_name = compacted_blob_name.replace(
+                    ".parquet", "-compacted.parquet"
+                )
+            utils.write_blob_to(
+                bucket_name=self.bucket_name,
+                blob_name=compacted_blob_name,
+                data=partition,
+            )
+            deleted_blob_names.extend(
+                blob_name
+                for blob_name in blob_names
+                if blob_name != compacted_blob_name
+            )
+            n_compacted_partitions += 1
+
+        if len(deleted_blob_names) > 0:
+            utils.delete_blobs(self.bucket_name, deleted_blob_names)
+
+        stats = {
+            "n_compacted_partitions": n_compacted_partitions,
+            "n_dropped_partitions": n_dropped_partitions,
+            "n_deleted_parts": len(deleted_blob_names),
+        }
+        logger.info(f"Compacted the monitoring predictions: {stats}")
+
+        return stats
+
+    def _migrate_legacy_blob(self):
+        legacy_partitions = self._read_legacy_partitions()
+        if len(legacy_partitions) == 0:
+            return
+
+        logger.info(
+            f"Migrating {LEGACY_BLOB_NAME} to {len(legacy_partitions)} partitions."
+        )
+        for date, partition in legacy_partitions.items():
+            utils.write_blob_to(
+                bucket_name=self.bucket_name,
+                blob_name=self._get_part_name(date, LEGACY_WRITE_ID),
+                data=partition,
+            )
+        utils.delete_blobs(self.bucket_name, [LEGACY_BLOB_NAME])
+        self._legacy_partitions = {}
+
+    def _read_legacy_partitions(self) -> Dict[str, pd.DataFrame]:
+        # The legacy blob holds only the predictions of the production model.
+        if self.prefix != PREDICTIONS_PREFIX:
+            return {}
+
+        if self._legacy_partitions is None:
+            predictions = utils.read_blob_from(
+                bucket_name=self.bucket_name, blob_name=LEGACY_BLOB_NAME
+            )
+            self._legacy_partitions = (
+                {}
+                if predictions is None
+                else split_by_date(_parse_datetimes(predictions))
+            )
+
+        return self._legacy_partitions
+
+    def _list_parts(self) -> Dict[str, List[str]]:
+        """Map the date of every partition to the names of its parts, in write order."""
+
+        parts = defaultdict(list)
+        for blob_name in utils.list_blobs(
+            self.bucket_name, prefix=f"{self.prefix}/date="
+        ):
+            if not blob_name.endswith(".parquet"):
+                continue
+
+            partition_name = blob_name[len(self.prefix) + 1 :].split("/")[0]
+            parts[partition_name[len("date=") :]].append(blob_name)
+
+        return {date: sorted(blob_names) for date, blob_names in sorted(parts.items())}
+
+    def _read_parts(self, blob_names: List[str]) -> List[pd.DataFrame]:
+        parts = []
+        for blob_name in blob_names:
+            part = utils.read_blob_from(
+                bucket_name=self.bucket_name, blob_name=blob_name
+            )
+            # A part listed before a concurrent compaction might be deleted by the time it is read.
+            if part is not None:
+                parts.append(_parse_datetimes(part))
+
+        return parts
+
+    def _get_part_name(self, date: str, write_id: str) -> str:
+        return f"{self.prefix}/date={date}/part-{write_id}.parquet"
+
+
+def split_by_date(predictions: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """Split the predictions by the date of their forecasted hour."""
+
+    dates = predictions.index.get_level_values("datetime_utc").asfreq("D").astype(str)
+
+    return {
+        date: partition for date, partition in predictions.groupby(dates, sort=True)
+    }
+
+
+def merge_predictions(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Merge predictions ordered from the oldest to the newest write, keeping the first prediction of every hour."""
+
+    predictions = pd.concat(frames)
+    predictions = predictions.dropna(subset=["energy_consumption"])
+    predictions = predictions[~predictions.index.duplicated(keep="first")]
+
+    return predictions.sort_index()
+
+
+def _parse_datetimes(predictions: pd.DataFrame) -> pd.DataFrame:
+    """Parse the datetime_utc level into hourly periods. Depending on the parquet engine, it is read as hours since the epoch."""
+
+    datetimes = predictions.index.levels[2]
+    if not isinstance(datetimes, pd.PeriodIndex):
+        predictions.index = predictions.index.set_levels(
+            pd.to_datetime(datetimes, unit="h").to_period("H"), level=2
+        )
+
+    return predictions
+
+
+def _filter_datetimes(
+    predictions: pd.DataFrame,
+    start_datetime: Optional[datetime] = None,
+    end_datetime: Optional[datetime] = None,
+) -> pd.DataFrame:
+    datetimes = predictions.index.get_level_values("datetime_utc")
+    mask = np.ones(len(predictions), dtype=bool)
+    if start_datetime is not None:
+        mask &= datetimes >= pd.Period(start_datetime, freq="H")
+    if end_datetime is not None:
+        mask &= datetimes <= pd.Period(end_datetime, freq="H")
+
+    return predictions[mask]
+
+
+def _to_date(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+
+    return str(pd.Period(value, freq="D"))
+
+
+def get_predictions_store(
+    shadow_model_version: Optional[int] = None,
+) -> PredictionsStore:
+    """Get the store of the production predictions or, if shadow_model_version is given, of a shadow model."""
+
+    if shadow_model_version is None:
+        return PredictionsStore(bucket_name=utils.get_bucket())
+
+    return PredictionsStore(
+        bucket_name=utils.get_bucket(),
+        prefix=f"{SHADOW_PREDICTIONS_PREFIX}/model_version={shadow_model_version}",
+    )
+
+
+def list_shadow_model_versions() -> List[int]:
+    """List the versions of the shadow models that have predictions stored for monitoring."""
+
+    prefix = f"{SHADOW_PREDICTIONS_PREFIX}/model_version="
+    model_versions = {
+        int(blob_name[len(prefix) :].split("/")[0])
+        for blob_name in utils.list_blobs(utils.get_bucket(), prefix=prefix)
+    }
+
+    return sorted(model_versions)
+
+
+def compact(
+    retention_start: Optional[Union[str, datetime]] = None, min_parts: int = 2
+) -> dict:
+    """
+    Compact the monitoring predictions of the production model and of every shadow model.
+    Run it periodically, e.g. after every batch prediction.
+
+    Args:
+        retention_start: Predictions forecasted for an hour before it are dropped, e.g. "2023-04-01 00:00". If None, nothing is dropped.
+        min_parts: Only the partitions with at least min_parts parts are merged.
+    """
+
+    retention_start = pd.Timestamp(retention_start) if retention_start else None
+    stats = get_predictions_store().compact(
+        retention_start=retention_start, min_parts=min_parts
+    )
+    for shadow_model_version in list_shadow_model_versions():
+        get_predictions_store(shadow_model_version).compact(
+            retention_start=retention_start, min_parts=min_parts
+        )
+
+    return stats
+
+
+if __name__ == "__main__":
+    fire.Fire(compact)
@@ -0,0 +1,640 @@
+import io
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+
+from batch_prediction_pipeline import settings
+
+
+# S3 rejects the parts of a multipart upload smaller than 5 MiB, except the last one.
+S3_MIN_PART_SIZE = 5 * 1024**2
+
+
+class LatencyMetrics:
+    """Thread-safe recorder of the latency of every storage call, grouped by operation."""
+
+    def __init__(self):
+        self._latencies = defaultdict(list)
+        self._n_bytes = defaultdict(int)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, operation: str, n_bytes: int = 0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(operation, time.perf_counter() - start, n_bytes=n_bytes)
+
+    def record(self, operation: str, latency: float, n_bytes: int = 0):
+        with self._lock:
+            self._latencies[operation].append(latency)
+            self._n_bytes[operation] += n_bytes
+
+    def add_bytes(self, operation: str, n_bytes: int):
+        with self._lock:
+            self._n_bytes[operation] += n_bytes
+
+    def summary(self) -> dict:
+        """Count, total bytes & latency percentiles, in milliseconds, of every operation."""
+
+        with self._lock:
+            summary = {}
+            for operation, latencies in self._latencies.items():
+                latencies_ms = np.array(latencies) * 1000
+                summary[operation] = {
+                    "count": len(latencies),
+                    "bytes": self._n_bytes[operation],
+                    "total_ms": float(latencies_ms.sum()),
+                    "p50_ms": float(np.percentile(latencies_ms, 50)),
+                    "p95_ms": float(np.percentile(latencies_ms, 95)),
+                    "max_ms": float(latencies_ms.max()),
+                }
+
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._latencies.clear()
+            self._n_bytes.clear()
+
+
+class BlobWriter(io.RawIOBase):
+    """
+    Writable file-like object that streams its content to a blob. The blob is committed by close().
+    Used as a context manager, the upload is aborted if the block raises an error.
+    """
+
+    def __init__(self, storage: "Storage", bucket_name: str, blob_name: str):
+        super().__init__()
+
+        self.storage = storage
+        self.bucket_name = bucket_name
+        self.blob_name = blob_name
+
+        self._n_bytes = 0
+        self._start = time.perf_counter()
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._n_bytes
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._write(data)
+        self._n_bytes += len(data)
+
+        return len(data)
+
+    def close(self):
+        if self.closed:
+            return
+
+        try:
+            self._commit()
+            self.storage.metrics.record(
+                "put", time.perf_counter() - self._start, n_bytes=self._n_bytes
+            )
+        except BaseException:
+            self._abort()
+
+            raise
+        finally:
+            super().close()
+
+    def abort(self):
+        if self.closed:
+            return
+
+        try:
+            self._abort()
+        finally:
+            super().close()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def __del__(self):
+        # Never commit a blob that wasn't explicitly closed, as it might be incomplete.
+        try:
+            self.abort()
+        except Exception:
+            pass
+
+    def _write(self, data: bytes):
+        raise NotImplementedError()
+
+    def _commit(self):
+        raise NotImplementedError()
+
+    def _abort(self):
+        pass
+
+
+class BufferedBlobWriter(BlobWriter):
+    """Writer that buffers the whole blob in memory and uploads it with a single put on close."""
+
+    def __init__(self, storage: "Storage", bucket_name: str, blob_name: str):
+        super().__init__(storage, bucket_name, blob_name)
+
+        self._buffer = io.BytesIO()
+
+    def _write(self, data: bytes):
+        self._buffer.write(data)
+
+    def _commit(self):
+        self.storage._put(self.bucket_name, self.blob_name, self._buffer.getvalue())
+
+    def _abort(self):
+        self._buffer = io.BytesIO()
+
+
+class Storage:
+    """
+    Blob storage backend. Subclasses implement the _put, _get, _list & _delete methods, and the public methods
+    record the latency of every call in self.metrics. Backends that can stream an upload override open_writer().
+    """
+
+    name = None
+
+    def __init__(self):
+        self.metrics = LatencyMetrics()
+
+    def put(self, bucket_name: str, blob_name: str, data: bytes):
+        with self.metrics.measure("put", n_bytes=len(data)):
+            self._put(bucket_name, blob_name, data)
+
+    def open_writer(self, bucket_name: str, blob_name: str) -> BlobWriter:
+        """Open a file-like object that uploads everything written to it to the blob."""
+
+        return BufferedBlobWriter(self, bucket_name, blob_name)
+
+    def get(self, bucket_name: str, blob_name: str) -> Optional[bytes]:
+        """Get the content of a blob or None if it doesn't exist."""
+
+        with self.metrics.measure("get"):
+            data = self._get(bucket_name, blob_name)
+        if data is not None:
+            self.metrics.add_bytes("get", len(data))
+
+        return data
+
+    def list(self, bucket_name: str, prefix: str) -> List[str]:
+        """Sorted names of the blobs that start with the given prefix."""
+
+        with self.metrics.measure("list"):
+            return sorted(self._list(bucket_name, prefix))
+
+    def delete(self, bucket_name: str, blob_names: List[str]):
+        with self.metrics.measure("delete"):
+            self._delete(bucket_name, blob_names)
+
+    def _put(self, bucket_name: str, blob_name: str, data: bytes):
+        raise NotImplementedError()
+
+    def _get(self, bucket_name: str, blob_name: str) -> Optional[bytes]:
+        raise NotImplementedError()
+
+    def _list(self, bucket_name: str, prefix: str) -> List[str]:
+        raise NotImplementedError()
+
+    def _delete(self, bucket_name: str, blob_names: List[str]):
+        raise NotImplementedError()
+
+
+class S3Storage(Storage):
+    """
+    AWS S3 backend built on a single boto3 client. boto3 clients are thread-safe, thus the client and its pool of
+    keep-alive connections are shared by all the calls of the process.
+
+    Large blobs written with open_writer() are streamed with a multipart upload of part_size parts, of which at most
+    max_concurrent_parts are uploaded at the same time.
+
+    Args:
+        max_pool_connections: Maximum number of open connections of the pool.
+        max_attempts: Maximum number of attempts of a call, retried with the adaptive mode of botocore.
+        connect_timeout: Timeout, in seconds, to open a connection.
+        read_timeout: Timeout, in seconds, to read from a connection.
+        part_size: Size, in bytes, of the parts of a multipart upload. S3 requires at least 5 MiB.
+        max_concurrent_parts: Maximum number of parts of a multipart upload in flight.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        max_pool_connections: int = 32,
+        max_attempts: int = 5,
+        connect_timeout: float = 10,
+        read_timeout: float = 60,
+        part_size: int = 8 * 1024**2,
+        max_concurrent_parts: int = 4,
+    ):
+        super().__init__()
+
+        if part_size < S3_MIN_PART_SIZE:
+            raise ValueError(
+                f"The part size must be at least {S3_MIN_PART_SIZE} bytes."
+            )
+        self.part_size = part_size
+        self.max_concurrent_parts = max_concurrent_parts
+
+        import boto3
+        from botocore.config import Config
+
+        config = Config(
+            max_pool_connections=max_pool_connections,
+            retries={"total_max_attempts": max_attempts, "mode": "adaptive"},
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            tcp_keepalive=True,
+        )
+        self.client = boto3.client(
+            "s3",
+            aws_access_key_id=settings.SETTINGS["AWS_ACCESS_KEY_ID"],
+            aws_secret_access_key=settings.SETTINGS["AWS_SECRET_ACCESS_KEY"],
+            region_name=settings.SETTINGS["AWS_DEFAULT_REGION"],
+            config=config,
+        )
+
+    def open_writer(self, bucket_name: str, blob_name: str) -> BlobWriter:
+        return S3MultipartWriter(self, bucket_name, blob_name)
+
+    def _put(self, bucket_name: str, blob_name: str, data: bytes):
+        self.client.put_object(Bucket=bucket_name, Key=blob_name, Body=data)
+
+    def _get(self, bucket_name: str, blob_name: str) -> Optional[bytes]:
+        from botocore.exceptions import ClientError
+
+        try:
+            response = self.client.get_object(Bucket=bucket_name, Key=blob_name)
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "NoSuchKey":
+                return None
+
+            raise
+
+        return response["Body"].read()
+
+    def _list(self, bucket_name: str, prefix: str) -> List[str]:
+        blob_names = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+            blob_names.extend(blob["Key"] for blob in page.get("Contents", []))
+
+        return blob_names
+
+    def _delete(self, bucket_name: str, blob_names: List[str]):
+        # S3 deletes at most 1000 objects per request.
+        for start in range(0, len(blob_names), 1000):
+            self.client.delete_objects(
+                Bucket=bucket_name,
+                Delete={
+                    "Objects": [
+                        {"Key": blob_name}
+                        for blob_name in blob_names[start : start + 1000]
+                    ]
+                },
+            )
+
+
+class S3MultipartWriter(BlobWriter):
+    """
+    Writer that uploads every full part in a background thread while the caller keeps writing, thus the
+    serialization and the network transfer overlap. The writes block while max_concurrent_parts parts are in flight,
+    which bounds the memory to (max_concurrent_parts + 1) parts. A blob smaller than a part is sent with a single put.
+    """
+
+    def __init__(self, storage: S3Storage, bucket_name: str, blob_name: str):
+        super().__init__(storage, bucket_name, blob_name)
+
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._futures = []
+        self._slots = threading.Semaphore(storage.max_concurrent_parts)
+        self._executor = None
+
+    def _write(self, data: bytes):
+        self._buffer += data
+        while len(self._buffer) >= self.storage.part_size:
+            part = bytes(self._buffer[: self.storage.part_size])
+            del self._buffer[: self.storage.part_size]
+            self._upload_part(part)
+
+    def _upload_part(self, part: bytes):
+        if self._upload_id is None:
+            response = self.storage.client.create_multipart_upload(
+                Bucket=self.bucket_name, Key=self.blob_name
+            )
+            self._upload_id = response["UploadId"]
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.storage.max_concurrent_parts
+            )
+
+        # Fail fast instead of serializing the rest of the blob if a part already failed.
+        for future in self._futures:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+
+        self._slots.acquire()
+        part_number = len(self._futures) + 1
+        self._futures.append(self._executor.submit(self._send_part, part_number, part))
+
+    def _send_part(self, part_number: int, part: bytes) -> dict:
+        try:
+            with self.storage.metrics.measure("put_part", n_bytes=len(part)):
+                response = self.storage.client.upload_part(
+                    Bucket=self.bucket_name,
+                    Key=self.blob_name,
+                    UploadId=self._upload_id,
+                    PartNumber=part_number,
+                    Body=part,
+                )
+        finally:
+            self._slots.release()
+
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    def _commit(self):
+        if self._upload_id is None:
+            self.storage._put(self.bucket_name, self.blob_name, bytes(self._buffer))
+            self._buffer = bytearray()
+
+            return
+
+        if len(self._buffer) > 0:
+            self._upload_part(bytes(self._buffer))
+            self._buffer = bytearray()
+
+        parts = [future.result() for future in self._futures]
+        self._executor.shutdown()
+        self.storage.client.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=self.blob_name,
+            UploadId=self._upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+
+    def _abort(self):
+        self._buffer = bytearray()
+        if self._upload_id is None:
+            return
+
+        self._executor.shutdown(cancel_futures=True)
+        self.storage.client.abort_multipart_upload(
+            Bucket=self.bucket_name, Key=self.blob_name, UploadId=self._upload_id
+        )
+
+
+class GCSStorage(Storage):
+    """
+    Google Cloud Storage backend built on a single client, whose HTTP session keeps its connections alive.
+
+    Blobs written with open_writer() are streamed with a resumable upload of part_size chunks.
+
+    Args:
+        max_pool_connections: Maximum number of open connections of the pool.
+        max_attempts: The calls are retried with exponential backoff for up to max_attempts timeouts.
+        timeout: Timeout, in seconds, of a call.
+        part_size: Size, in bytes, of the chunks of a resumable upload. It must be a multiple of 256 KiB.
+    """
+
+    name = "gcs"
+
+    def __init__(
+        self,
+        max_pool_connections: int = 32,
+        max_attempts: int = 5,
+        timeout: float = 60,
+        part_size: int = 8 * 1024**2,
+    ):
+        super().__init__()
+
+        self.part_size = part_size
+
+        from google.api_core.retry import Retry
+        from google.cloud import storage
+        from google.cloud.storage.retry import DEFAULT_RETRY
+        from requests.adapters import HTTPAdapter
+
+        json_credentials_path = settings.SETTINGS.get(
+            "GOOGLE_CLOUD_SERVICE_ACCOUNT_JSON_PATH"
+        )
+        if json_credentials_path:
+            self.client = storage.Client.from_service_account_json(
+                json_credentials_path=json_credentials_path,
+                project=settings.SETTINGS.get("GOOGLE_CLOUD_PROJECT"),
+            )
+        else:
+            self.client = storage.Client(
+                project=settings.SETTINGS.get("GOOGLE_CLOUD_PROJECT")
+            )
+
+        adapter = HTTPAdapter(
+            pool_connections=max_pool_connections, pool_maxsize=max_pool_connections
+        )
+        self.client._http.mount("https://", adapter)
+
+        # The retries of the library are bounded by a deadline, which is set to the duration of max_attempts calls.
+        self.retry: Retry = DEFAULT_RETRY.with_deadline(timeout * max_attempts)
+        self.timeout = timeout
+
+    def open_writer(self, bucket_name: str, blob_name: str) -> BlobWriter:
+        return GCSStreamWriter(self, bucket_name, blob_name)
+
+    def _put(self, bucket_name: str, blob_name: str, data: bytes):
+        blob = self.client.bucket(bucket_name).blob(blob_name)
+        blob.upload_from_string(data, timeout=self.timeout, retry=self.retry)
+
+    def _get(self, bucket_name: str, blob_name: str) -> Optional[bytes]:
+        from google.api_core.exceptions import NotFound
+
+        blob = self.client.bucket(bucket_name).blob(blob_name)
+        try:
+            return blob.download_as_bytes(timeout=self.timeout, retry=self.retry)
+        except NotFound:
+            return None
+
+    def _list(self, bucket_name: str, prefix: str) -> List[str]:
+        blobs = self.client.list_blobs(
+            bucket_name, prefix=prefix, timeout=self.timeout, retry=self.retry
+        )
+
+        return [blob.name for blob in blobs]
+
+    def _delete(self, bucket_name: str, blob_names: List[str]):
+        bucket = self.client.bucket(bucket_name)
+        for blob_name in blob_names:
+            bucket.blob(blob_name).delete(timeout=self.timeout, retry=self.retry)
+
+
+class GCSStreamWriter(BlobWriter):
+    """Writer that streams to a resumable upload, which sends a chunk every time part_size bytes are buffered."""
+
+    def __init__(self, storage: GCSStorage, bucket_name: str, blob_name: str):
+        super().__init__(storage, bucket_name, blob_name)
+
+        blob = storage.client.bucket(bucket_name).blob(blob_name)
+        # The parquet writers flush their sink, which a resumable upload can't do before the end of a chunk.
+        self._file = blob.open(
+            "wb",
+            chunk_size=storage.part_size,
+            ignore_flush=True,
+            timeout=storage.timeout,
+            retry=storage.retry,
+        )
+
+    def _write(self, data: bytes):
+        self._file.write(data)
+
+    def _commit(self):
+        self._file.close()
+
+    def _abort(self):
+        # The resumable upload is never finalized, thus the blob isn't created.
+        self._file = None
+
+
+class LocalStorage(Storage):
+    """
+    Local filesystem backend, which stores every bucket as a directory of root_dir. It doesn't require any cloud
+    access, thus it is used to run & benchmark the pipeline locally.
+
+    Args:
+        root_dir: Directory of the buckets.
+    """
+
+    name = "local"
+
+    def __init__(self, root_dir: Union[str, Path]):
+        super().__init__()
+
+        self.root_dir = Path(root_dir)
+
+    def open_writer(self, bucket_name: str, blob_name: str) -> BlobWriter:
+        return LocalFileWriter(self, bucket_name, blob_name)
+
+    def _put(self, bucket_name: str, blob_name: str, data: bytes):
+        path = self._get_path(bucket_name, blob_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first, so the readers never see a partial blob.
+        tmp_path = path.parent / f".{path.name}.{uuid.uuid4().hex}"
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def _get(self, bucket_name: str, blob_name: str) -> Optional[bytes]:
+        path = self._get_path(bucket_name, blob_name)
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _list(self, bucket_name: str, prefix: str) -> List[str]:
+        bucket_dir = self.root_dir / bucket_name
+        if not bucket_dir.exists():
+            return []
+
+        blob_names = (
+            path.relative_to(bucket_dir).as_posix()
+            for path in bucket_dir.rglob("*")
+            if path.is_file() and not path.name.startswith(".")
+        )
+
+        return [blob_name for blob_name in blob_names if blob_name.startswith(prefix)]
+
+    def _delete(self, bucket_name: str, blob_names: List[str]):
+        for blob_name in blob_names:
+            self._get_path(bucket_name, blob_name).unlink(missing_ok=True)
+
+    def _get_path(self, bucket_name: str, blob_name: str) -> Path:
+        return self.root_dir / bucket_name / blob_name
+
+
+class LocalFileWriter(BlobWriter):
+    """Writer that streams to a temporary file, which is renamed into the blob on close."""
+
+    def __init__(self, storage: LocalStorage, bucket_name: str, blob_name: str):
+        super().__init__(storage, bucket_name, blob_name)
+
+        self._path = storage._get_path(bucket_name, blob_name)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = self._path.parent / f".{self._path.name}.{uuid.uuid4().hex}"
+        self._file = open(self._tmp_path, "wb")
+
+    def _write(self, data: bytes):
+        self._file.write(data)
+
+    def _commit(self):
+        self._file.close()
+        os.replace(self._tmp_path, self._path)
+
+    def _abort(self):
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+
+def build_storage(backend: str) -> Storage:
+    """Build the storage backend configured through the STORAGE_* settings."""
+
+    max_pool_connections = int(
+        settings.SETTINGS.get("STORAGE_MAX_POOL_CONNECTIONS", 32)
+    )
+    max_attempts = int(settings.SETTINGS.get("STORAGE_MAX_ATTEMPTS", 5))
+    part_size = int(float(settings.SETTINGS.get("STORAGE_PART_SIZE_MB", 8)) * 1024**2)
+
+    if backend == "s3":
+        return S3Storage(
+            max_pool_connections=max_pool_connections,
+            max_attempts=max_attempts,
+            part_size=part_size,
+            max_concurrent_parts=int(
+                settings.SETTINGS.get("STORAGE_MAX_CONCURRENT_PARTS", 4)
+            ),
+        )
+    elif backend == "gcs":
+        return GCSStorage(
+            max_pool_connections=max_pool_connections,
+            max_attempts=max_attempts,
+            part_size=part_size,
+        )
+    elif backend == "local":
+        return LocalStorage(
+            root_dir=settings.SETTINGS.get("STORAGE_LOCAL_DIR")
+            or settings.OUTPUT_DIR / "storage"
+        )
+
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+_STORAGE = None
+_STORAGE_PID = None
+
+
+def get_storage() -> Storage:
+    """
+    Get the storage backend shared by the whole process. It is selected with the STORAGE_BACKEND setting:
+    "s3" (default), "gcs" or "local".
+    """
+
+    global _STORAGE, _STORAGE_PID
+
+    # The connections of the pool can't be shared with a forked child process, thus every process builds its own client.
+    if _STORAGE is None or _STORAGE_PID != os.getpid():
+        _STORAGE = build_storage(settings.SETTINGS.get("STORAGE_BACKEND", "s3"))
+        _STORAGE_PID = os.getpid()
+
+    return _STORAGE
@@ -2,15 +2,18 @@ import json
 import logging
 import joblib
 import pandas as pd
-import boto3
 
 from io import BytesIO
 from pathlib import Path
-from typing import Optional, Union
-from botocore.exceptions import ClientError
+from typing import List, Optional, Union
 
 
 from batch_prediction_pipeline import settings
+from batch_prediction_pipeline import storage
+
+
+# Number of rows of a parquet row group. The row groups are serialized & streamed one at a time.
+PARQUET_ROW_GROUP_SIZE = 100_000
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -75,9 +78,8 @@ def load_json(file_name: str, save_dir: str = settings.OUTPUT_DIR) -> dict:
         return json.load(f)
 
 
-
 def get_bucket(
-    bucket_name: str=settings.SETTINGS["S3_CLOUD_BUCKET_NAME"],
+    bucket_name: str = settings.SETTINGS["S3_CLOUD_BUCKET_NAME"],
 ):
     """Get an AWS S3 bucket.
 
@@ -99,108 +101,62 @@ def get_bucket(
 
     return bucket_name
 
-# def get_bucket(
-#     bucket_name: str = settings.SETTINGS["GOOGLE_CLOUD_BUCKET_NAME"],
-#     bucket_project: str = settings.SETTINGS["GOOGLE_CLOUD_PROJECT"],
-#     json_credentials_path: str = settings.SETTINGS[
-#         "GOOGLE_CLOUD_SERVICE_ACCOUNT_JSON_PATH"
-#     ],
-# ) -> storage.Bucket:
-#     """Get a Google Cloud Storage bucket.
-
-#     This function returns a Google Cloud Storage bucket that can be used to upload and download
-#     files from Google Cloud Storage.
-
-#     Args:
-#         bucket_name : str
-#             The name of the bucket to connect to.
-#         bucket_project : str
-#             The name of the project in which the bucket resides.
-#         json_credentials_path : str
-#             Path to the JSON credentials file for your Google Cloud Project.
-
-#     Returns
-#         storage.Bucket
-#             A storage bucket that can be used to upload and download files from Google Cloud Storage.
-#     """
-
-#     storage_client = storage.Client.from_service_account_json(
-#         json_credentials_path=json_credentials_path,
-#         project=bucket_project,
-#     )
-#     bucket = storage_client.bucket(bucket_name=bucket_name)
-
-#     return bucket
 
 def write_blob_to(bucket_name: str, blob_name: str, data: pd.DataFrame):
-    """Write a dataframe to an S3 bucket as a parquet file.
+    """Write a dataframe to a bucket as a parquet file.
+
+    The bucket is stored by the backend selected with the STORAGE_BACKEND setting: "s3" (default), "gcs" or "local".
+    The parquet file is streamed to the backend while it is serialized, row group by row group, thus the whole
+    file is never held in memory.
 
     Args:
-        bucket_name (str): The name of the S3 bucket to write to.
+        bucket_name (str): The name of the bucket to write to.
         blob_name (str): The name of the blob to write to. Must be a parquet file.
-        data (pd.DataFrame): The dataframe to write to S3.
+        data (pd.DataFrame): The dataframe to write.
     """
 
-    # Configure AWS credentials and region
-    aws_access_key_id = settings.SETTINGS["AWS_ACCESS_KEY_ID"]
-    aws_secret_access_key = settings.SETTINGS["AWS_SECRET_ACCESS_KEY"]
-    aws_region = settings.SETTINGS["AWS_DEFAULT_REGION"]
-
-    s3_client = boto3.client('s3', aws_access_key_id=aws_access_key_id, aws_secret_access_key=aws_secret_access_key, region_name=aws_region)
-
-    # Convert DataFrame to bytes
-    parquet_data = data.to_parquet(index=True)
+    with storage.get_storage().open_writer(bucket_name, blob_name) as f:
+        data.to_parquet(f, index=True, row_group_size=PARQUET_ROW_GROUP_SIZE)
 
-    # Upload to S3
-    s3_client.put_object(Bucket=bucket_name, Key=blob_name, Body=parquet_data)
 
+def read_blob_from(bucket_name: str, blob_name: str) -> Optional[pd.DataFrame]:
+    """Reads a parquet blob from a bucket and returns a dataframe.
 
-# def read_blob_from(bucket: storage.Bucket, blob_name: str) -> Optional[pd.DataFrame]:
-#     """Reads a blob from a bucket and returns a dataframe.
+    Args:
+        bucket_name (str): The name of the bucket to read from.
+        blob_name (str): The name of the blob to read.
 
-#     Args:
-#         bucket: The bucket to read from.
-#         blob_name: The name of the blob to read.
+    Returns:
+        A dataframe containing the data from the blob, or None if the blob doesn't exist.
+    """
 
-#     Returns:
-#         A dataframe containing the data from the blob.
-#     """
+    data = storage.get_storage().get(bucket_name, blob_name)
+    if data is None:
+        return None
 
-#     blob = bucket.blob(blob_name=blob_name)
-#     if not blob.exists():
-#         return None
+    return pd.read_parquet(BytesIO(data))
 
-#     with blob.open("rb") as f:
-#         return pd.read_parquet(f)
 
-def read_blob_from(bucket_name: str, blob_name: str) -> Optional[pd.DataFrame]:
-    """Reads a blob from an S3 bucket and returns a dataframe.
+def list_blobs(bucket_name: str, prefix: str) -> List[str]:
+    """Lists the names of the blobs of a bucket that start with the given prefix.
 
     Args:
-        bucket_name (str): The name of the S3 bucket to read from.
-        blob_name (str): The name of the blob to read.
+        bucket_name (str): The name of the bucket.
+        prefix (str): The prefix of the blob names.
 
     Returns:
-        A dataframe containing the data from the blob, or None if the blob doesn't exist.
+        The sorted names of the blobs.
+    """
+
+    return storage.get_storage().list(bucket_name, prefix)
+
+
+def delete_blobs(bucket_name: str, blob_names: List[str]):
+    """Deletes the given blobs from a bucket.
+
+    Args:
+        bucket_name (str): The name of the bucket.
+        blob_names (List[str]): The names of the blobs to delete.
     """
 
-    # Configure AWS credentials and region
-    aws_access_key_id = settings.SETTINGS["AWS_ACCESS_KEY_ID"]
-    aws_secret_access_key = settings.SETTINGS["AWS_SECRET_ACCESS_KEY"]
-    aws_region = settings.SETTINGS["AWS_DEFAULT_REGION"]
-
-    s3_resource = boto3.resource('s3', aws_access_key_id=aws_access_key_id, aws_secret_access_key=aws_secret_access_key, region_name=aws_region)
-    
-    bucket = s3_resource.Bucket(bucket_name)
-
-    try:
-        # Read the Parquet file and return as DataFrame
-        response = bucket.Object(blob_name).get()
-        data = response['Body'].read()
-        dataframe = pd.read_parquet(BytesIO(data))
-        return dataframe
-    except ClientError as e:
-        if e.response['Error']['Code'] == 'NoSuchKey':
-            return None
-        else:
-            raise
\ No newline at end of file
+    storage.get_storage().delete(bucket_name, blob_names)
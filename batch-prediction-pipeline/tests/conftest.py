@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+# The bucket name is read when batch_prediction_pipeline.utils is imported.
+os.environ.setdefault("S3_CLOUD_BUCKET_NAME", "test-bucket")
+
+from batch_prediction_pipeline import storage  # noqa: E402
+
+
+@pytest.fixture
+def blob_storage(monkeypatch, tmp_path):
+    """Replace the process wide storage backend with a local one rooted at a temporary directory."""
+
+    local_storage = storage.LocalStorage(root_dir=tmp_path)
+    monkeypatch.setattr(storage, "_STORAGE", local_storage)
+    monkeypatch.setattr(storage, "_STORAGE_PID", os.getpid())
+
+    return local_storage
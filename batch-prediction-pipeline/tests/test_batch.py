@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_prediction_pipeline import batch
+from training_pipeline.models import build_model
+
+
+FH = 24
+MODEL_CONFIGS = {
+    # The production model comes first.
+    1: {
+        "forecaster__estimator__n_estimators": 20,
+        "forecaster_transformers__window_summarizer__lag_feature__lag": [1, 2, 24],
+    },
+    2: {
+        "forecaster__estimator__n_estimators": 30,
+        "forecaster__estimator__learning_rate": 0.05,
+        "forecaster_transformers__window_summarizer__lag_feature__lag": [1, 24],
+    },
+    # Needs a longer history than the production model stores, thus it is scored alone.
+    3: {
+        "forecaster__estimator__n_estimators": 20,
+        "forecaster_transformers__window_summarizer__lag_feature__lag": [1, 2, 96],
+    },
+}
+
+
+@pytest.fixture(scope="module")
+def data():
+    """Hourly observations of 2 areas & 2 consumer types, indexed the same way as the feature store data."""
+
+    rng = np.random.default_rng(0)
+    index = pd.MultiIndex.from_product(
+        [
+            [0, 1],
+            [111, 112],
+            pd.period_range("2023-04-01 00:00", periods=24 * 14, freq="H"),
+        ],
+        names=["area", "consumer_type", "datetime_utc"],
+    )
+    hours = index.get_level_values("datetime_utc").hour.to_numpy()
+    y = pd.DataFrame(
+        {
+            "energy_consumption": 100
+            + 20 * np.sin(2 * np.pi * hours / 24)
+            + rng.normal(0, 2, len(index))
+        },
+        index=index,
+    )
+    X = pd.DataFrame(index=index)
+
+    return y, X
+
+
+@pytest.fixture(scope="module")
+def models(data):
+    y, X = data
+    models = {}
+    for model_version, config in MODEL_CONFIGS.items():
+        models[model_version] = build_model(dict(config))
+        models[model_version].fit(y, X=X, fh=np.arange(FH) + 1)
+
+    return models
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_forecast_many_matches_one_forecast_per_model(data, models, n_jobs):
+    _, X = data
+
+    predictions = batch.forecast_many(models, X, fh=FH, n_jobs=n_jobs)
+
+    assert list(predictions) == list(models)
+    for model_version, model in models.items():
+        pd.testing.assert_frame_equal(
+            predictions[model_version],
+            batch.forecast(model, X, fh=FH, n_jobs=n_jobs),
+            check_exact=True,
+        )
+
+
+def test_production_predictions_dont_depend_on_the_shadow_models(data, models):
+    _, X = data
+    production_model_version = next(iter(models))
+
+    predictions = batch.forecast_many(models, X, fh=FH, n_jobs=1)
+    production_predictions = batch.forecast_many(
+        {production_model_version: models[production_model_version]}, X, fh=FH
+    )
+
+    pd.testing.assert_frame_equal(
+        predictions[production_model_version],
+        production_predictions[production_model_version],
+        check_exact=True,
+    )
@@ -0,0 +1,149 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from batch_prediction_pipeline import model_cache
+from batch_prediction_pipeline.model_cache import ModelCache
+
+
+MODEL_SIZE = 100 * 1024
+
+
+class Registry:
+    """Fake model registry that writes a model directory of MODEL_SIZE bytes on every download."""
+
+    def __init__(self, root_dir: Path):
+        self.root_dir = root_dir
+        self.downloads = []
+
+    def download(self, name: str, version: int):
+        def download() -> Path:
+            self.downloads.append((name, version))
+            model_dir = self.root_dir / f"{name}-{version}-{len(self.downloads)}"
+            model_dir.mkdir(parents=True)
+            (model_dir / "model.bin").write_bytes(bytes([version % 256]) * MODEL_SIZE)
+
+            return model_dir
+
+        return download
+
+
+def load_model(model_dir: Path) -> bytes:
+    return (model_dir / "model.bin").read_bytes()
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return Registry(tmp_path / "registry")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ModelCache(tmp_path / "model_cache")
+
+
+def test_model_is_downloaded_once(registry, cache):
+    first_dir = cache.get_dir("model", 1, registry.download("model", 1))
+    second_dir = cache.get_dir("model", 1, registry.download("model", 1))
+    cache.get_dir("model", 2, registry.download("model", 2))
+
+    assert first_dir == second_dir
+    assert registry.downloads == [("model", 1), ("model", 2)]
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert load_model(first_dir) == bytes([1]) * MODEL_SIZE
+
+
+def test_loaded_models_are_memoized(registry, cache):
+    loads = []
+
+    def loader(model_dir: Path) -> bytes:
+        loads.append(model_dir)
+
+        return load_model(model_dir)
+
+    for _ in range(2):
+        model = cache.load("model", 1, registry.download("model", 1), loader)
+
+    assert model == bytes([1]) * MODEL_SIZE
+    assert len(loads) == 1
+
+    cache.clear_memo()
+    cache.load("model", 1, registry.download("model", 1), loader)
+
+    assert len(loads) == 2
+    assert registry.downloads == [("model", 1)]
+
+
+@pytest.mark.parametrize(
+    "corrupt",
+    [
+        lambda path: path.write_bytes(b"truncated"),
+        lambda path: path.write_bytes(bytes([255]) * MODEL_SIZE),
+        lambda path: path.unlink(),
+    ],
+    ids=["size", "content", "missing"],
+)
+def test_corrupted_entry_is_downloaded_again(registry, cache, corrupt):
+    entry_dir = cache.get_dir("model", 1, registry.download("model", 1))
+    corrupt(entry_dir / "model.bin")
+
+    entry_dir = cache.get_dir("model", 1, registry.download("model", 1))
+
+    assert registry.downloads == [("model", 1), ("model", 1)]
+    assert load_model(entry_dir) == bytes([1]) * MODEL_SIZE
+
+
+def test_unchanged_files_are_not_hashed_again(monkeypatch, registry, cache):
+    cache.get_dir("model", 1, registry.download("model", 1))
+
+    def hash_file(path):
+        raise AssertionError(f"{path} was hashed again.")
+
+    monkeypatch.setattr(model_cache, "_hash_file", hash_file)
+
+    cache.get_dir("model", 1, registry.download("model", 1))
+
+    assert cache.hits == 1
+
+
+def test_full_verification_detects_corruptions_that_keep_the_file_stats(
+    registry, tmp_path
+):
+    cache = ModelCache(tmp_path / "model_cache", verify_checksums=True)
+    entry_dir = cache.get_dir("model", 1, registry.download("model", 1))
+    model_path = entry_dir / "model.bin"
+    stat = model_path.stat()
+    model_path.write_bytes(bytes([255]) * MODEL_SIZE)
+    os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert model_cache.verify_dir(entry_dir)
+    assert not model_cache.verify_dir(entry_dir, full=True)
+
+    cache.get_dir("model", 1, registry.download("model", 1))
+
+    assert registry.downloads == [("model", 1), ("model", 1)]
+
+
+def test_least_recently_used_entries_are_evicted(registry, tmp_path):
+    # Room for 2 models, as the checksums files take a few bytes more.
+    cache = ModelCache(
+        tmp_path / "model_cache", max_size_mb=2.5 * MODEL_SIZE / 1024**2
+    )
+    entry_dirs = {}
+    for version in [1, 2]:
+        entry_dirs[version] = cache.get_dir(
+            "model", version, registry.download("model", version)
+        )
+        # Space out the last use times, as the filesystem timestamps may be coarse.
+        checksums_path = entry_dirs[version] / model_cache.CHECKSUMS_FILE_NAME
+        os.utime(checksums_path, (version, version))
+
+    # Using the version 1 makes the version 2 the least recently used entry.
+    cache.get_dir("model", 1, registry.download("model", 1))
+    entry_dirs[3] = cache.get_dir("model", 3, registry.download("model", 3))
+
+    assert entry_dirs[1].exists()
+    assert not entry_dirs[2].exists()
+    assert entry_dirs[3].exists()
+    assert registry.downloads == [("model", 1), ("model", 2), ("model", 3)]
@@ -0,0 +1,153 @@
+import pandas as pd
+import pytest
+
+from batch_prediction_pipeline import monitoring_store, utils
+from batch_prediction_pipeline.monitoring_store import PredictionsStore
+
+
+BUCKET_NAME = "test-bucket"
+
+
+def make_predictions(start: str, n_hours: int, value: float) -> pd.DataFrame:
+    index = pd.MultiIndex.from_product(
+        [
+            [1, 2],
+            [111, 112],
+            pd.period_range(start, periods=n_hours, freq="H"),
+        ],
+        names=["area", "consumer_type", "datetime_utc"],
+    )
+
+    return pd.DataFrame({"energy_consumption": value}, index=index)
+
+
+def count_parts(store: PredictionsStore) -> dict:
+    return {date: len(blob_names) for date, blob_names in store._list_parts().items()}
+
+
+@pytest.fixture
+def store(blob_storage):
+    return PredictionsStore(bucket_name=BUCKET_NAME)
+
+
+def test_first_write_wins(store):
+    store.append(make_predictions("2023-04-01 00:00", 48, value=1.0))
+    store.append(make_predictions("2023-04-02 00:00", 48, value=2.0))
+
+    predictions = store.read()
+
+    assert count_parts(store) == {"2023-04-01": 1, "2023-04-02": 2, "2023-04-03": 1}
+    pd.testing.assert_frame_equal(
+        predictions,
+        pd.concat(
+            [
+                make_predictions("2023-04-01 00:00", 48, value=1.0),
+                make_predictions("2023-04-03 00:00", 24, value=2.0),
+            ]
+        ).sort_index(),
+    )
+
+
+def test_compaction_keeps_the_first_write(store):
+    store.append(make_predictions("2023-04-01 00:00", 48, value=1.0))
+    store.append(make_predictions("2023-04-02 00:00", 48, value=2.0))
+    expected = store.read()
+
+    stats = store.compact()
+
+    assert stats["n_compacted_partitions"] == 1
+    assert count_parts(store) == {"2023-04-01": 1, "2023-04-02": 1, "2023-04-03": 1}
+    pd.testing.assert_frame_equal(store.read(), expected)
+
+    # The compacted part is still read before the parts appended after the compaction.
+    store.append(make_predictions("2023-04-02 12:00", 48, value=3.0))
+    pd.testing.assert_frame_equal(
+        store.read(),
+        pd.concat(
+            [expected, make_predictions("2023-04-04 00:00", 12, value=3.0)]
+        ).sort_index(),
+    )
+
+
+def test_compaction_drops_the_predictions_out_of_retention(store):
+    store.append(make_predictions("2023-04-01 00:00", 72, value=1.0))
+
+    stats = store.compact(retention_start=pd.Timestamp("2023-04-02 12:00"))
+
+    assert stats["n_dropped_partitions"] == 1
+    assert count_parts(store) == {"2023-04-02": 1, "2023-04-03": 1}
+    pd.testing.assert_frame_equal(
+        store.read(), make_predictions("2023-04-02 12:00", 36, value=1.0)
+    )
+
+
+def test_read_window(store):
+    store.append(make_predictions("2023-04-01 00:00", 72, value=1.0))
+
+    predictions = store.read(
+        start_datetime=pd.Timestamp("2023-04-02 06:00"),
+        end_datetime=pd.Timestamp("2023-04-02 17:00"),
+    )
+
+    pd.testing.assert_frame_equal(
+        predictions, make_predictions("2023-04-02 06:00", 12, value=1.0)
+    )
+
+
+def write_legacy_blob(predictions: pd.DataFrame):
+    utils.write_blob_to(
+        bucket_name=BUCKET_NAME,
+        blob_name=monitoring_store.LEGACY_BLOB_NAME,
+        data=predictions,
+    )
+
+
+def test_legacy_blob_is_migrated_by_the_first_append(store):
+    write_legacy_blob(make_predictions("2023-04-01 00:00", 48, value=0.0))
+
+    store.append(make_predictions("2023-04-02 00:00", 48, value=1.0))
+
+    assert utils.read_blob_from(BUCKET_NAME, monitoring_store.LEGACY_BLOB_NAME) is None
+    assert count_parts(store) == {"2023-04-01": 1, "2023-04-02": 2, "2023-04-03": 1}
+    # The legacy predictions are still read first.
+    expected = pd.concat(
+        [
+            make_predictions("2023-04-01 00:00", 48, value=0.0),
+            make_predictions("2023-04-03 00:00", 24, value=1.0),
+        ]
+    ).sort_index()
+    pd.testing.assert_frame_equal(store.read(), expected)
+    pd.testing.assert_frame_equal(
+        PredictionsStore(bucket_name=BUCKET_NAME).read(), expected
+    )
+
+
+def test_legacy_blob_is_migrated_by_compaction(store):
+    expected = make_predictions("2023-04-01 00:00", 48, value=0.0)
+    write_legacy_blob(expected)
+    pd.testing.assert_frame_equal(store.read(), expected)
+
+    store.compact()
+
+    assert utils.read_blob_from(BUCKET_NAME, monitoring_store.LEGACY_BLOB_NAME) is None
+    assert count_parts(store) == {"2023-04-01": 1, "2023-04-02": 1}
+    pd.testing.assert_frame_equal(store.read(), expected)
+
+
+def test_legacy_blob_is_read_once(monkeypatch, store):
+    write_legacy_blob(make_predictions("2023-04-01 00:00", 48, value=0.0))
+    read_blob_from = utils.read_blob_from
+    legacy_reads = []
+
+    def record_read(bucket_name, blob_name):
+        if blob_name == monitoring_store.LEGACY_BLOB_NAME:
+            legacy_reads.append(blob_name)
+
+        return read_blob_from(bucket_name, blob_name)
+
+    monkeypatch.setattr(utils, "read_blob_from", record_read)
+
+    for _ in range(3):
+        store.read(start_datetime=pd.Timestamp("2023-04-02 00:00"))
+
+    assert len(legacy_reads) == 1
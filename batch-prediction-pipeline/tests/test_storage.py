@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+
+from batch_prediction_pipeline import settings, storage
+
+
+PART_SIZE = storage.S3_MIN_PART_SIZE
+
+
+class S3Client:
+    """Fake S3 client that records the multipart uploads and fails the upload of the parts in failing_parts."""
+
+    def __init__(self, failing_parts=()):
+        self.failing_parts = set(failing_parts)
+        self.objects = {}
+        self.parts = {}
+        self.aborted = []
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Key] = bytes(Body)
+
+    def create_multipart_upload(self, Bucket, Key):
+        return {"UploadId": f"upload-{Key}"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        if PartNumber in self.failing_parts:
+            raise ConnectionError(f"Part {PartNumber} failed.")
+
+        with self._lock:
+            self.parts.setdefault(UploadId, {})[PartNumber] = bytes(Body)
+
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.parts.pop(UploadId)
+        self.objects[Key] = b"".join(
+            parts[part["PartNumber"]] for part in MultipartUpload["Parts"]
+        )
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.parts.pop(UploadId, None)
+        self.aborted.append((Key, UploadId))
+
+
+@pytest.fixture
+def make_storage(monkeypatch):
+    """Make a S3 storage whose boto3 client is replaced by the given fake client."""
+
+    for key, value in [
+        ("AWS_ACCESS_KEY_ID", "test-access-key-id"),
+        ("AWS_SECRET_ACCESS_KEY", "test-secret-access-key"),
+        ("AWS_DEFAULT_REGION", "us-east-1"),
+    ]:
+        monkeypatch.setitem(settings.SETTINGS, key, value)
+
+    def make_storage(client: S3Client) -> storage.S3Storage:
+        s3_storage = storage.S3Storage(part_size=PART_SIZE, max_concurrent_parts=2)
+        s3_storage.client = client
+
+        return s3_storage
+
+    return make_storage
+
+
+def make_data(n_bytes: int) -> bytes:
+    return bytes(i % 251 for i in range(n_bytes))
+
+
+@pytest.mark.parametrize(
+    "n_bytes", [PART_SIZE // 2, 3 * PART_SIZE, 3 * PART_SIZE + 1024]
+)
+def test_multipart_upload_assembles_the_blob(make_storage, n_bytes):
+    client = S3Client()
+    data = make_data(n_bytes)
+
+    with make_storage(client).open_writer("bucket", "blob.parquet") as writer:
+        # Write in chunks that don't align with the parts.
+        for start in range(0, len(data), 1024**2 + 7):
+            writer.write(data[start : start + 1024**2 + 7])
+
+    assert client.objects == {"blob.parquet": data}
+    assert client.parts == {}
+    assert client.aborted == []
+
+
+@pytest.mark.parametrize("failing_part", [1, 3, 4])
+def test_failed_part_aborts_the_multipart_upload(make_storage, failing_part):
+    client = S3Client(failing_parts=[failing_part])
+    data = make_data(3 * PART_SIZE + 1024)
+
+    with pytest.raises(ConnectionError, match=f"Part {failing_part} failed"):
+        with make_storage(client).open_writer("bucket", "blob.parquet") as writer:
+            writer.write(data)
+
+    assert client.aborted == [("blob.parquet", "upload-blob.parquet")]
+    assert client.objects == {}
+    assert client.parts == {}
@@ -0,0 +1,91 @@
+"""
+Benchmark the throughput of the batched inference engine against the sktime pipeline as the number of series grows.
+
+The model is fitted once. The engine is then run on the history of the training series replicated
+scale times under new consumer types.
+
+Usage:
+    python -m benchmarks.batched_inference --n_consumer_types 20 --scales "[1, 10, 100]"
+"""
+
+import time
+from typing import List
+
+import fire
+import numpy as np
+import pandas as pd
+
+from benchmarks.data import make_training_data
+from training_pipeline import compiled
+from training_pipeline.models import build_model
+from training_pipeline.settings import PRECISION
+from training_pipeline.train import compute_forecast_exogenous_variables
+
+
+def run(
+    fh: int = 24,
+    n_repeats: int = 3,
+    n_estimators: int = 200,
+    n_areas: int = 3,
+    n_consumer_types: int = 20,
+    n_days: int = 90,
+    scales: List[int] = (1, 10, 100),
+):
+    y_train, y_test, X_train, X_test = make_training_data(
+        fh=fh, n_areas=n_areas, n_consumer_types=n_consumer_types, n_days=n_days
+    )
+    y = pd.concat([y_train, y_test]).sort_index()
+    X = pd.concat([X_train, X_test]).sort_index()
+    model = build_model({"forecaster__estimator__n_estimators": n_estimators})
+    model.fit(y, X=X, fh=np.arange(fh) + 1)
+    X_forecast = compute_forecast_exogenous_variables(X_test, fh)
+
+    start = time.perf_counter()
+    y_expected = model.predict(X=X_forecast)
+    sktime_latency = time.perf_counter() - start
+    n_series = len(y_expected) // fh
+    print(
+        f"sktime pipeline: {n_series} series, latency {sktime_latency:.3f} s, "
+        f"throughput {n_series * fh / sktime_latency:.0f} forecasts/s"
+    )
+
+    engine = compiled.compile_model(model, compile_trees=False)
+    y_pred = engine.predict(fh=fh).reindex(y_expected.index).astype(PRECISION)
+    n_mismatches = int((y_pred.to_numpy() != y_expected.to_numpy()).sum())
+    print(
+        f"Batched inference engine mismatches against the sktime pipeline: {n_mismatches}"
+    )
+
+    for scale in scales:
+        y_scaled = replicate_series(y, scale=scale)
+        latencies = []
+        for _ in range(n_repeats):
+            start = time.perf_counter()
+            engine.predict(fh=fh, y=y_scaled)
+            latencies.append(time.perf_counter() - start)
+
+        n_scaled_series = n_series * scale
+        print(
+            f"Batched inference engine: {n_scaled_series} series, median latency {np.median(latencies):.3f} s, "
+            f"throughput {n_scaled_series * fh / np.median(latencies):.0f} forecasts/s"
+        )
+
+
+def replicate_series(y: pd.DataFrame, scale: int) -> pd.DataFrame:
+    """Replicate every series of y scale times, under new consumer types."""
+
+    consumer_types = y.index.get_level_values("consumer_type")
+    offset = consumer_types.max() + 1
+    copies = []
+    for copy in range(scale):
+        y_copy = y.copy()
+        y_copy.index = y_copy.index.set_levels(
+            y_copy.index.levels[1] + copy * offset, level=1
+        )
+        copies.append(y_copy)
+
+    return pd.concat(copies)
+
+
+if __name__ == "__main__":
+    fire.Fire(run)
@@ -0,0 +1,79 @@
+"""
+Benchmark the load time, latency & throughput of the compiled model bundle against the pickled sktime pipeline.
+
+Usage:
+    python -m benchmarks.compiled_inference --n_consumer_types 20 --n_repeats 5
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+import fire
+import numpy as np
+import pandas as pd
+
+from benchmarks.data import make_training_data
+from training_pipeline import compiled, utils
+from training_pipeline.models import build_model
+from training_pipeline.train import compute_forecast_exogenous_variables
+
+
+def run(
+    fh: int = 24,
+    n_repeats: int = 5,
+    n_estimators: int = 200,
+    n_areas: int = 3,
+    n_consumer_types: int = 20,
+    n_days: int = 90,
+):
+    y_train, y_test, X_train, X_test = make_training_data(
+        fh=fh, n_areas=n_areas, n_consumer_types=n_consumer_types, n_days=n_days
+    )
+    y = pd.concat([y_train, y_test]).sort_index()
+    X = pd.concat([X_train, X_test]).sort_index()
+    model = build_model({"forecaster__estimator__n_estimators": n_estimators})
+    model.fit(y, X=X, fh=np.arange(fh) + 1)
+    X_forecast = compute_forecast_exogenous_variables(X_test, fh)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bundle_dir = Path(tmp_dir) / "best_model_bundle"
+        pickle_path = Path(tmp_dir) / "best_model.pkl"
+        compiled.compile_model(model).save(bundle_dir)
+        utils.save_model(model, pickle_path)
+
+        start = time.perf_counter()
+        utils.load_model(pickle_path)
+        print(
+            f"Pickled pipeline load time: {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+        start = time.perf_counter()
+        compiled_model = compiled.CompiledForecaster.load(bundle_dir)
+        print(f"Model bundle load time: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    n_series = len(compiled_model.series)
+    for name, predict in [
+        ("sktime pipeline", lambda: model.predict(X=X_forecast)),
+        ("compiled forecaster", lambda: compiled_model.predict(fh=fh)),
+    ]:
+        latencies = []
+        for _ in range(n_repeats):
+            start = time.perf_counter()
+            y_pred = predict()
+            latencies.append(time.perf_counter() - start)
+
+        print(
+            f"{name}: median latency {np.median(latencies):.3f} s, "
+            f"throughput {n_series * fh / np.median(latencies):.0f} forecasts/s"
+        )
+        if name == "sktime pipeline":
+            y_expected = y_pred
+        else:
+            max_abs_error = np.abs(
+                y_pred.reindex(y_expected.index).to_numpy() - y_expected.to_numpy()
+            ).max()
+            print(f"Max absolute difference: {max_abs_error:.2e}")
+
+
+if __name__ == "__main__":
+    fire.Fire(run)
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from training_pipeline.data import prepare_data
+
+
+def make_energy_consumption_data(
+    n_areas: int = 3,
+    n_consumer_types: int = 20,
+    n_days: int = 90,
+    seed: int = 42,
+) -> pd.DataFrame:
+    """
+    Generate a synthetic dataset with the same schema as the feature store feature view.
+
+    Args:
+        n_areas: Number of areas.
+        n_consumer_types: Number of consumer types per area.
+        n_days: Number of days of hourly data per series.
+        seed: Random seed.
+
+    Returns: Dataframe with the area, consumer_type, datetime_utc & energy_consumption columns.
+    """
+
+    rng = np.random.default_rng(seed)
+    n_hours = n_days * 24
+    datetime_utc = pd.date_range("2023-01-01", periods=n_hours, freq="H")
+    hours = np.arange(n_hours)
+
+    data = []
+    for area in range(n_areas):
+        for consumer_type in range(n_consumer_types):
+            level = rng.uniform(50, 5000)
+            energy_consumption = (
+                level
+                + 0.2 * level * np.sin(2 * np.pi * hours / 24)
+                + 0.1 * level * np.sin(2 * np.pi * hours / (24 * 7))
+                + rng.normal(0, 0.02 * level, n_hours)
+            )
+            data.append(
+                pd.DataFrame(
+                    {
+                        "datetime_utc": datetime_utc,
+                        "area": area,
+                        "consumer_type": 100 + consumer_type,
+                        "energy_consumption": energy_consumption,
+                    }
+                )
+            )
+
+    return pd.concat(data, ignore_index=True)
+
+
+def make_training_data(fh: int = 24, **kwargs):
+    """Generate a synthetic dataset and split it the same way as the training pipeline."""
+
+    return prepare_data(make_energy_consumption_data(**kwargs), fh=fh)
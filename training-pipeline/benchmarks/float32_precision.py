@@ -0,0 +1,73 @@
+"""
+Report the impact of the float32 precision mode on the test MAPE & RMSPE and on the memory of the feature matrix.
+
+Usage:
+    python -m benchmarks.float32_precision --n_consumer_types 20
+"""
+
+import time
+
+import fire
+import numpy as np
+
+from benchmarks.data import make_energy_consumption_data
+from training_pipeline import utils
+from training_pipeline.data import prepare_data
+from training_pipeline.models import build_model
+from training_pipeline.train import evaluate
+
+
+def run(
+    fh: int = 24,
+    n_estimators: int = 200,
+    n_areas: int = 3,
+    n_consumer_types: int = 20,
+    n_days: int = 90,
+    report_file_name: str = "precision_report.json",
+):
+    data = make_energy_consumption_data(
+        n_areas=n_areas, n_consumer_types=n_consumer_types, n_days=n_days
+    )
+
+    report = {}
+    for precision in ["float64", "float32"]:
+        y_train, y_test, X_train, X_test = prepare_data(
+            data.copy(), fh=fh, precision=precision
+        )
+        model = build_model(
+            {"forecaster__estimator__n_estimators": n_estimators}, precision=precision
+        )
+
+        start = time.perf_counter()
+        model.fit(y_train, X=X_train, fh=np.arange(fh) + 1)
+        fit_time = time.perf_counter() - start
+        _, metrics = evaluate(model, y_test, X_test)
+
+        reducer = model.forecaster_
+        _, feature_matrix = reducer._transform(
+            y_train, model._transform(X=X_train.copy(), y=y_train)
+        )
+        report[precision] = {
+            "MAPE": float(metrics["MAPE"]),
+            "RMSPE": float(metrics["RMSPE"]),
+            "fit_time_seconds": fit_time,
+            "feature_matrix_mb": feature_matrix.memory_usage(deep=True).sum() / 1e6,
+        }
+        print(f"{precision}: {report[precision]}")
+
+    report["delta"] = {
+        metric: report["float32"][metric] - report["float64"][metric]
+        for metric in ["MAPE", "RMSPE"]
+    }
+    report["memory_ratio"] = (
+        report["float32"]["feature_matrix_mb"] / report["float64"]["feature_matrix_mb"]
+    )
+    print(
+        f"float32 - float64: {report['delta']}, memory ratio: {report['memory_ratio']:.2f}"
+    )
+
+    utils.save_json(report, file_name=report_file_name)
+
+
+if __name__ == "__main__":
+    fire.Fire(run)
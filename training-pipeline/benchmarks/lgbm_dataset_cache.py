@@ -0,0 +1,62 @@
+"""
+Benchmark the per-trial fit time of LightGBM with and without reusing the binned dataset.
+
+Usage:
+    python -m benchmarks.lgbm_dataset_cache --n_trials 6 --n_consumer_types 20
+"""
+
+import time
+
+import fire
+import lightgbm as lgb
+import numpy as np
+from sktime.transformations.series.summarize import WindowSummarizer
+
+from benchmarks.data import make_training_data
+from training_pipeline import regressors
+
+
+def run(
+    n_trials: int = 6,
+    n_estimators: int = 200,
+    n_areas: int = 3,
+    n_consumer_types: int = 20,
+    n_days: int = 90,
+):
+    y_train, _, _, _ = make_training_data(
+        n_areas=n_areas, n_consumer_types=n_consumer_types, n_days=n_days
+    )
+    window_summarizer = WindowSummarizer(
+        lag_feature={
+            "lag": list(range(1, 73)),
+            "mean": [[1, 24], [1, 48], [1, 72]],
+            "std": [[1, 24], [1, 48]],
+        },
+        n_jobs=1,
+    )
+    X = window_summarizer.fit_transform(y_train).dropna()
+    y = y_train.loc[X.index].to_numpy().ravel()
+    print(f"Feature matrix: {X.shape[0]} rows x {X.shape[1]} columns.")
+
+    learning_rates = np.linspace(0.05, 0.2, n_trials)
+    for name, regressor_class in [
+        ("LGBMRegressor", lgb.LGBMRegressor),
+        ("PrebinnedLGBMRegressor", regressors.PrebinnedLGBMRegressor),
+    ]:
+        fit_times = []
+        for learning_rate in learning_rates:
+            regressor = regressor_class(
+                n_estimators=n_estimators, learning_rate=learning_rate
+            )
+            start = time.perf_counter()
+            regressor.fit(X, y)
+            fit_times.append(time.perf_counter() - start)
+
+        print(
+            f"{name}: first fit {fit_times[0]:.2f} s, "
+            f"mean fit of the next {n_trials - 1} trials {np.mean(fit_times[1:]):.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    fire.Fire(run)
@@ -0,0 +1,86 @@
+"""
+Benchmark the cost of scoring shadow models in the same pass as the production model.
+
+n_models models are fitted with different seeds. They are then scored on the history of the training series
+replicated scale times, once one after another and once in a single pass with compiled.predict_many().
+
+Usage:
+    python -m benchmarks.shadow_scoring --n_models 3 --scale 100
+"""
+
+import time
+
+import fire
+import numpy as np
+import pandas as pd
+
+from benchmarks.batched_inference import replicate_series
+from benchmarks.data import make_training_data
+from training_pipeline import compiled
+from training_pipeline.models import build_model
+
+
+def run(
+    fh: int = 24,
+    n_repeats: int = 3,
+    n_estimators: int = 200,
+    n_areas: int = 3,
+    n_consumer_types: int = 20,
+    n_days: int = 90,
+    scale: int = 100,
+    n_models: int = 3,
+):
+    y_train, y_test, X_train, X_test = make_training_data(
+        fh=fh, n_areas=n_areas, n_consumer_types=n_consumer_types, n_days=n_days
+    )
+    y = pd.concat([y_train, y_test]).sort_index()
+    X = pd.concat([X_train, X_test]).sort_index()
+    forecasters = {}
+    for model_version in range(1, n_models + 1):
+        model = build_model(
+            {
+                "forecaster__estimator__n_estimators": n_estimators,
+                "forecaster__estimator__random_state": model_version,
+            }
+        )
+        model.fit(y, X=X, fh=np.arange(fh) + 1)
+        forecasters[model_version] = compiled.compile_model(model)
+    y_scaled = replicate_series(y, scale=scale)
+    n_series = len(y_scaled.index.droplevel(-1).unique())
+
+    latencies = {
+        "production model only": [],
+        "one run per model": [],
+        "single pass": [],
+    }
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        forecasters[1].predict(fh=fh, y=y_scaled)
+        latencies["production model only"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        y_expected = {
+            model_version: forecaster.predict(fh=fh, y=y_scaled)
+            for model_version, forecaster in forecasters.items()
+        }
+        latencies["one run per model"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        y_pred = compiled.predict_many(forecasters, y=y_scaled, fh=fh)
+        latencies["single pass"].append(time.perf_counter() - start)
+
+    is_identical = all(
+        y_pred[model_version].equals(y_expected[model_version])
+        for model_version in forecasters
+    )
+    baseline_latency = np.median(latencies["production model only"])
+    for name, values in latencies.items():
+        print(
+            f"{name}: {n_series} series, median latency {np.median(values):.3f} s, "
+            f"{np.median(values) / baseline_latency:.2f}x the production model only"
+        )
+    print(f"Single pass identical to one run per model: {is_identical}")
+
+
+if __name__ == "__main__":
+    fire.Fire(run)
@@ -0,0 +1,79 @@
+"""
+Benchmark how the sharded batch inference scales with the number of worker processes.
+
+The model is fitted once and saved as a model bundle, which every worker memory-maps. The history of the
+training series is replicated scale times under new consumer types to get a large number of series.
+
+Usage:
+    python -m benchmarks.sharded_inference --scale 100 --n_jobs "[1, 2, 4, 8]"
+"""
+
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import fire
+import numpy as np
+import pandas as pd
+
+from benchmarks.batched_inference import replicate_series
+from benchmarks.data import make_training_data
+from training_pipeline import compiled
+from training_pipeline.models import build_model
+
+
+def run(
+    fh: int = 24,
+    n_repeats: int = 3,
+    n_estimators: int = 200,
+    n_areas: int = 3,
+    n_consumer_types: int = 20,
+    n_days: int = 90,
+    scale: int = 100,
+    n_jobs: List[int] = (1, 2, 4, 8),
+):
+    y_train, y_test, X_train, X_test = make_training_data(
+        fh=fh, n_areas=n_areas, n_consumer_types=n_consumer_types, n_days=n_days
+    )
+    y = pd.concat([y_train, y_test]).sort_index()
+    X = pd.concat([X_train, X_test]).sort_index()
+    model = build_model({"forecaster__estimator__n_estimators": n_estimators})
+    model.fit(y, X=X, fh=np.arange(fh) + 1)
+
+    forecaster = compiled.compile_model(model)
+    y_scaled = replicate_series(y, scale=scale)
+    series, history, cutoff = compiled.extract_history(
+        y_scaled, forecaster.history_length
+    )
+    forecaster.series, forecaster.history, forecaster.cutoff = series, history, cutoff
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bundle_dir = Path(tmp_dir) / "best_model_bundle"
+        forecaster.save(bundle_dir)
+        forecaster = compiled.CompiledForecaster.load(bundle_dir)
+
+        y_expected = None
+        baseline_latency = None
+        for n in n_jobs:
+            latencies = []
+            for _ in range(n_repeats):
+                start = time.perf_counter()
+                y_pred = compiled.predict_sharded(forecaster, fh=fh, n_jobs=n)
+                latencies.append(time.perf_counter() - start)
+
+            if y_expected is None:
+                y_expected = y_pred
+                baseline_latency = np.median(latencies)
+            is_identical = y_pred.index.equals(y_expected.index) and np.array_equal(
+                y_pred.to_numpy(), y_expected.to_numpy()
+            )
+            print(
+                f"n_jobs={n}: {len(series)} series, median latency {np.median(latencies):.3f} s, "
+                f"throughput {len(series) * fh / np.median(latencies):.0f} forecasts/s, "
+                f"speedup {baseline_latency / np.median(latencies):.2f}x, identical: {is_identical}"
+            )
+
+
+if __name__ == "__main__":
+    fire.Fire(run)
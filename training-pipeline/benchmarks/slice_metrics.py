@@ -0,0 +1,51 @@
+"""
+Benchmark the per-slice evaluation of the vectorized metric engine against a groupby over the sktime metrics.
+
+Usage:
+    python -m benchmarks.slice_metrics --n_consumer_types 1000
+"""
+
+import time
+
+import fire
+import numpy as np
+import pandas as pd
+from sktime.performance_metrics.forecasting import mean_absolute_percentage_error
+
+from training_pipeline.metrics import compute_slice_metrics
+
+
+def run(n_areas: int = 3, n_consumer_types: int = 1000, fh: int = 24, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    index = pd.MultiIndex.from_product(
+        [
+            range(n_areas),
+            range(n_consumer_types),
+            pd.period_range("2023-01-01", periods=fh, freq="H"),
+        ],
+        names=["area", "consumer_type", "datetime_utc"],
+    )
+    y_test = pd.DataFrame(
+        {"energy_consumption": rng.uniform(10, 1000, len(index))}, index=index
+    )
+    y_pred = y_test * rng.uniform(0.8, 1.2, size=(len(index), 1))
+    print(f"Evaluating {n_areas * n_consumer_types} slices.")
+
+    start = time.perf_counter()
+    slices = compute_slice_metrics(y_test, y_pred, metrics=["RMSPE", "MAPE"])
+    print(f"Metric engine: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    expected_mape = y_test.groupby(["area", "consumer_type"]).apply(
+        lambda y_test_slice: mean_absolute_percentage_error(
+            y_test_slice, y_pred.loc[y_test_slice.index], symmetric=False
+        )
+    )
+    print(f"groupby + sktime MAPE: {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(
+        f"Max absolute MAPE difference: {np.abs(slices['MAPE'].to_numpy() - expected_mape.to_numpy()).max():.2e}"
+    )
+
+
+if __name__ == "__main__":
+    fire.Fire(run)
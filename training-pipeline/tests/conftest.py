@@ -0,0 +1,21 @@
+import pytest
+
+from benchmarks.data import make_training_data
+from training_pipeline import feature_cache
+
+
+@pytest.fixture(scope="session")
+def training_data():
+    """Small synthetic dataset split the same way as the training pipeline: y_train, y_test, X_train, X_test."""
+
+    return make_training_data(fh=24, n_areas=2, n_consumer_types=3, n_days=21)
+
+
+@pytest.fixture
+def empty_feature_cache(monkeypatch):
+    """Replace the process wide feature cache with an empty one for the duration of the test."""
+
+    cache = feature_cache.FeatureCache()
+    monkeypatch.setattr(feature_cache, "_FEATURE_CACHE", cache)
+
+    return cache
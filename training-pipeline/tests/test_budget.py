@@ -0,0 +1,83 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from training_pipeline import budget
+from training_pipeline.budget import TimeBudget, TrialTimeoutError
+
+
+# Spawning the trial worker takes a few seconds, thus the timeout is well above it.
+TRIAL_TIMEOUT_S = 10
+
+
+@pytest.fixture
+def time_budget():
+    time_budget = TimeBudget(trial_timeout_s=TRIAL_TIMEOUT_S)
+    yield time_budget
+    time_budget.close()
+
+
+def test_unlimited_budget_runs_in_the_current_process():
+    assert TimeBudget().run(os.getpid) == os.getpid()
+
+
+def test_trials_reuse_the_worker(time_budget):
+    worker_pid = time_budget.run(os.getpid)
+
+    assert worker_pid != os.getpid()
+    assert time_budget.run(os.getpid) == worker_pid
+
+
+def test_worker_is_killed_on_timeout_and_restarted(time_budget):
+    worker_pid = time_budget.run(os.getpid)
+    process = time_budget._worker.process
+
+    time_budget.trial_timeout_s = 0.5
+    start = time.perf_counter()
+    with pytest.raises(TrialTimeoutError):
+        time_budget.run(time.sleep, 60)
+
+    assert time.perf_counter() - start < 10
+    assert not process.is_alive()
+    assert time_budget._worker is None
+
+    time_budget.trial_timeout_s = TRIAL_TIMEOUT_S
+    assert time_budget.run(os.getpid) not in (worker_pid, os.getpid())
+
+
+def test_exhausted_budget_times_out_immediately():
+    time_budget = TimeBudget(budget_s=1e-3)
+    time.sleep(1e-2)
+
+    assert time_budget.is_exhausted()
+    with pytest.raises(TrialTimeoutError):
+        time_budget.run(time.sleep, 60)
+
+
+def test_errors_are_raised_in_the_caller(time_budget):
+    with pytest.raises(ZeroDivisionError):
+        time_budget.run(divmod, 1, 0)
+
+    # The worker survives the errors of its trials.
+    assert time_budget.run(divmod, 7, 2) == (3, 1)
+
+
+def test_shared_dataframes_are_evicted(monkeypatch, time_budget):
+    monkeypatch.setattr(budget, "MAX_SHARED_ARGUMENTS", 2)
+    dataframes = [pd.DataFrame({"a": range(n)}) for n in range(1, 5)]
+
+    for dataframe in [*dataframes, dataframes[0]]:
+        assert time_budget.run(len, dataframe) == len(dataframe)
+
+    assert list(time_budget._worker._shared_arguments.values())[-1] is dataframes[0]
+    assert len(time_budget._worker._shared_arguments) == 2
+
+
+def test_ids_of_evicted_dataframes_are_not_confused(monkeypatch, time_budget):
+    monkeypatch.setattr(budget, "MAX_SHARED_ARGUMENTS", 1)
+
+    # The temporary DataFrames are freed after their trial, so their ids are likely to be reused.
+    for n in [1, 2, 3, 2, 1]:
+        assert time_budget.run(len, pd.DataFrame({"a": range(n)})) == n
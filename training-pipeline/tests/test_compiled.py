@@ -0,0 +1,114 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from training_pipeline import compiled
+from training_pipeline.models import build_model
+from training_pipeline.train import compute_forecast_exogenous_variables
+
+
+FH = 24
+
+
+@pytest.fixture(scope="module", params=["float64", "float32"])
+def fitted_model(request, training_data):
+    precision = request.param
+    y_train, y_test, X_train, X_test = training_data
+    # The time series are loaded in the precision of the pipeline, as data.prepare_data() does.
+    y = pd.concat([y_train, y_test]).sort_index().astype(precision)
+    X = pd.concat([X_train, X_test]).sort_index()
+    model = build_model(
+        {
+            "forecaster__estimator__n_estimators": 20,
+            "forecaster_transformers__window_summarizer__lag_feature__lag": [1, 2, 24],
+        },
+        precision=precision,
+    )
+    model.fit(y, X=X, fh=np.arange(FH) + 1)
+
+    return model, y, compute_forecast_exogenous_variables(X_test, FH)
+
+
+@pytest.fixture(scope="module")
+def y_expected(fitted_model):
+    model, _, X_forecast = fitted_model
+
+    return model.predict(X=X_forecast)
+
+
+@pytest.mark.parametrize("compile_trees", [True, False])
+def test_compiled_forecaster_matches_pipeline(fitted_model, y_expected, compile_trees):
+    model, y, _ = fitted_model
+    forecaster = compiled.compile_model(model, compile_trees=compile_trees)
+
+    pd.testing.assert_frame_equal(
+        forecaster.predict(fh=FH), y_expected, check_exact=True
+    )
+    pd.testing.assert_frame_equal(
+        forecaster.predict(fh=FH, y=y), y_expected, check_exact=True
+    )
+
+
+@pytest.fixture(scope="module")
+def bundle_dir(fitted_model, tmp_path_factory):
+    model, _, _ = fitted_model
+    bundle_dir = tmp_path_factory.mktemp("best_model_bundle")
+    compiled.compile_model(model).save(bundle_dir)
+
+    return bundle_dir
+
+
+def test_bundle_round_trip(bundle_dir, y_expected):
+    forecaster = compiled.CompiledForecaster.load(bundle_dir)
+
+    assert isinstance(forecaster.history, np.memmap)
+    pd.testing.assert_frame_equal(
+        forecaster.predict(fh=FH), y_expected, check_exact=True
+    )
+
+
+def test_bundle_checksum_mismatch(bundle_dir, tmp_path):
+    corrupted_bundle_dir = tmp_path / "corrupted_bundle"
+    compiled.CompiledForecaster.load(bundle_dir).save(corrupted_bundle_dir)
+    history_path = corrupted_bundle_dir / "arrays" / "history.npy"
+    history = np.load(history_path)
+    history[0, -1] += 1
+    np.save(history_path, history)
+
+    with pytest.raises(ValueError, match="Checksum mismatch for arrays/history.npy"):
+        compiled.CompiledForecaster.load(corrupted_bundle_dir)
+    compiled.CompiledForecaster.load(corrupted_bundle_dir, verify_checksum=False)
+
+
+def test_bundle_unsupported_schema_version(bundle_dir, tmp_path):
+    old_bundle_dir = tmp_path / "old_bundle"
+    compiled.CompiledForecaster.load(bundle_dir).save(old_bundle_dir)
+    manifest_path = old_bundle_dir / "manifest.json"
+    manifest = json.loads(manifest_path.read_text())
+    manifest["schema_version"] = compiled.SCHEMA_VERSION - 1
+    manifest_path.write_text(json.dumps(manifest))
+
+    with pytest.raises(ValueError, match="Unsupported model bundle schema version"):
+        compiled.CompiledForecaster.load(old_bundle_dir)
+
+
+@pytest.mark.parametrize("n_jobs", [2, 6])
+@pytest.mark.parametrize("from_bundle", [True, False])
+def test_sharded_forecasts_match_predict(
+    fitted_model, bundle_dir, y_expected, tmp_path, n_jobs, from_bundle
+):
+    model, _, _ = fitted_model
+    if from_bundle:
+        forecaster = compiled.CompiledForecaster.load(bundle_dir)
+    else:
+        # The forecaster is saved to a temporary bundle for the workers.
+        forecaster = compiled.compile_model(model)
+
+    predictions = compiled.predict_sharded(
+        forecaster, fh=FH, n_jobs=n_jobs, tmp_dir=tmp_path
+    )
+
+    pd.testing.assert_frame_equal(predictions, y_expected, check_exact=True)
+    assert list(tmp_path.iterdir()) == []
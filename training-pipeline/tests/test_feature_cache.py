@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+from training_pipeline.feature_cache import FeatureCache
+from training_pipeline.transformers import CachedWindowSummarizer
+
+
+LAG_FEATURE = {"lag": [1, 2, 24], "mean": [[1, 24]], "std": [[1, 48]]}
+
+
+def select_until(y: pd.DataFrame, n_hours: int) -> pd.DataFrame:
+    """Keep the first n_hours of every series."""
+
+    datetimes = y.index.get_level_values("datetime_utc")
+
+    return y[datetimes < datetimes.min() + n_hours]
+
+
+@pytest.mark.parametrize("dtype", [None, "float32"])
+def test_sliced_features_match_uncached(training_data, empty_feature_cache, dtype):
+    y_train = training_data[0]
+    summarizer = CachedWindowSummarizer(lag_feature=LAG_FEATURE, n_jobs=1, dtype=dtype)
+    summarizer.fit_transform(y_train)
+
+    for n_hours in [24 * 7, 24 * 14]:
+        y_fold = select_until(y_train, n_hours)
+        n_hits = empty_feature_cache.hits
+        cached = CachedWindowSummarizer(
+            lag_feature=LAG_FEATURE, n_jobs=1, dtype=dtype
+        ).fit_transform(y_fold)
+        expected = CachedWindowSummarizer(
+            lag_feature=LAG_FEATURE, n_jobs=1, dtype=dtype, use_cache=False
+        ).fit_transform(y_fold)
+
+        assert empty_feature_cache.hits == n_hits + 1
+        pd.testing.assert_frame_equal(cached, expected)
+
+
+def test_other_config_is_not_served_from_cache(training_data, empty_feature_cache):
+    y_train = training_data[0]
+    CachedWindowSummarizer(lag_feature=LAG_FEATURE, n_jobs=1).fit_transform(y_train)
+
+    lag_feature = {**LAG_FEATURE, "lag": [1, 2, 3]}
+    features = CachedWindowSummarizer(lag_feature=lag_feature, n_jobs=1).fit_transform(
+        y_train
+    )
+    expected = CachedWindowSummarizer(
+        lag_feature=lag_feature, n_jobs=1, use_cache=False
+    ).fit_transform(y_train)
+
+    assert empty_feature_cache.hits == 0
+    pd.testing.assert_frame_equal(features, expected)
+
+
+def test_spilled_features_are_shared_between_caches(training_data, tmp_path):
+    y_train = training_data[0]
+    config = CachedWindowSummarizer(lag_feature=LAG_FEATURE).get_cache_config()
+    features = CachedWindowSummarizer(
+        lag_feature=LAG_FEATURE, n_jobs=1, use_cache=False
+    ).fit_transform(y_train)
+    FeatureCache(spill_dir=tmp_path).put(y_train, config, features)
+
+    cache = FeatureCache(spill_dir=tmp_path)
+    y_fold = select_until(y_train, 24 * 7)
+    expected = CachedWindowSummarizer(
+        lag_feature=LAG_FEATURE, n_jobs=1, use_cache=False
+    ).fit_transform(y_fold)
+
+    pd.testing.assert_frame_equal(cache.get(y_train, config), features)
+    pd.testing.assert_frame_equal(cache.get(y_fold, config), expected)
+    assert cache.hits == 2
@@ -0,0 +1,178 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from sktime.forecasting.model_selection import ExpandingWindowSplitter
+
+from training_pipeline import best_config, budget, hyperparameter_tuning, trial_queue
+from training_pipeline.models import build_model
+
+
+FH = 24
+CONFIG = {
+    "forecaster__estimator__n_estimators": 500,
+    "forecaster__estimator__early_stopping_rounds": 5,
+    "forecaster__estimator__validation_size": FH,
+    "forecaster_transformers__window_summarizer__lag_feature__lag": [1, 2, 24],
+}
+# 3 folds over the 20 days of the training split.
+CV = ExpandingWindowSplitter(
+    step_length=FH * 5, fh=np.arange(FH) + 1, initial_window=FH * 8
+)
+
+
+def test_every_fold_records_its_best_iteration(training_data, empty_feature_cache):
+    y_train, _, X_train, _ = training_data
+    model = build_model(dict(CONFIG), prebinned=True)
+
+    results = hyperparameter_tuning.evaluate_folds(
+        model, y_train, X_train, cv=CV, n_jobs=1
+    )
+
+    assert len(results) == 3
+    for best_iterations in results["best_iterations"]:
+        assert len(best_iterations) == 1
+        assert 0 < best_iterations[0] < 500
+
+
+def test_parallel_folds_match_the_sequential_ones(training_data, empty_feature_cache):
+    y_train, _, X_train, _ = training_data
+    # A single LightGBM thread makes the fits independent of the threads available to every worker.
+    model = build_model({**CONFIG, "forecaster__estimator__n_jobs": 1}, prebinned=True)
+
+    sequential_results = hyperparameter_tuning.evaluate_folds(
+        model, y_train, X_train, cv=CV, n_jobs=1
+    )
+    parallel_results = hyperparameter_tuning.evaluate_folds(
+        model, y_train, X_train, cv=CV, n_jobs=2
+    )
+
+    timings = ["fit_time", "prediction_time"]
+    pd.testing.assert_frame_equal(
+        parallel_results.drop(columns=timings), sequential_results.drop(columns=timings)
+    )
+
+
+class TrialBudget(budget.TimeBudget):
+    """Time budget that runs out after n_trials trials."""
+
+    def __init__(self, n_trials: int):
+        super().__init__()
+
+        self.n_trials = n_trials
+        self.n_started = 0
+
+    def is_exhausted(self) -> bool:
+        return self.n_started >= self.n_trials
+
+
+def run_trial(config: dict, *args, time_budget: TrialBudget, fidelity: dict, **kwargs):
+    time_budget.n_started += 1
+    score = sum(value for value in config.values() if isinstance(value, float))
+
+    return {
+        "validation": {"MAPE": score, "best_iteration": fidelity.get("k", 3)},
+        "status": "finished",
+    }
+
+
+SEARCH_CONFIGS = {
+    "method": "successive_halving",
+    "proposer": "random",
+    "seed": 42,
+    "n_configs": 4,
+    "eta": 2,
+    "metric": {"name": "validation.MAPE", "goal": "minimize"},
+    "rungs": [{"k": 1}, {"k": 3}],
+    "parameters": {"learning_rate": {"values": [0.1, 0.15, 0.2, 0.25]}},
+}
+
+
+@pytest.mark.parametrize("method", ["successive_halving", "hyperband"])
+def test_multi_fidelity_search_returns_the_best_trial_so_far(
+    monkeypatch, training_data, method
+):
+    y_train, _, X_train, _ = training_data
+    monkeypatch.setattr(hyperparameter_tuning, "run_trial", run_trial)
+
+    # Only the first rung is evaluated before the budget runs out.
+    metadata = hyperparameter_tuning.run_multi_fidelity_search(
+        y_train,
+        X_train,
+        fh=FH,
+        method=method,
+        n_parallel_trials=1,
+        search_configs=SEARCH_CONFIGS,
+        time_budget=TrialBudget(n_trials=4),
+    )
+
+    assert metadata["best_rung"] == 0
+    assert metadata["best_config"] == {
+        "learning_rate": 0.1,
+        "forecaster__estimator__best_iteration": 1,
+    }
+    assert len(metadata["cut_trials"]) > 0
+    assert {trial["status"] for trial in metadata["cut_trials"]} == {"skipped"}
+
+
+def test_multi_fidelity_search_fails_without_finished_trials(
+    monkeypatch, training_data
+):
+    y_train, _, X_train, _ = training_data
+    monkeypatch.setattr(hyperparameter_tuning, "run_trial", run_trial)
+
+    with pytest.raises(RuntimeError, match="finished in time"):
+        hyperparameter_tuning.run_multi_fidelity_search(
+            y_train,
+            X_train,
+            fh=FH,
+            n_parallel_trials=1,
+            search_configs=SEARCH_CONFIGS,
+            time_budget=TrialBudget(n_trials=0),
+        )
+
+
+def test_queue_search_returns_the_best_trial_so_far(
+    monkeypatch, tmp_path, training_data
+):
+    y_train, _, X_train, _ = training_data
+    queue = trial_queue.TrialQueue(tmp_path / "trial_queue.sqlite")
+    monkeypatch.setattr(trial_queue, "get_trial_queue", lambda: queue)
+    monkeypatch.setattr(hyperparameter_tuning, "run_trial", run_trial)
+
+    metadata = hyperparameter_tuning.run_queue_search(
+        y_train,
+        X_train,
+        fh=FH,
+        n_parallel_trials=1,
+        cpu_budget=1,
+        time_budget=TrialBudget(n_trials=3),
+    )
+
+    trials = queue.get_trials(metadata["queue_name"])
+    finished_trials = trials[trials["status"] == "finished"]
+    scores = finished_trials["results"].map(
+        lambda results: results["validation"]["MAPE"]
+    )
+    assert len(finished_trials) == 3
+    assert len(metadata["cut_trials"]) == len(trials) - 3
+    assert metadata["best_results"]["validation"]["MAPE"] == scores.min()
+    assert metadata["best_config"] == {
+        **finished_trials.loc[scores.idxmin(), "config"],
+        "forecaster__estimator__best_iteration": 3,
+    }
+
+
+def test_best_run_of_a_sweep_ignores_the_cut_trials():
+    runs = [
+        SimpleNamespace(name="skipped", summary={"status": "skipped"}),
+        SimpleNamespace(name="worse", summary={"validation": {"MAPE": 0.2}}),
+        SimpleNamespace(name="timed_out", summary={"status": "timed_out"}),
+        SimpleNamespace(name="best", summary={"validation": {"MAPE": 0.1}}),
+    ]
+    metric = {"name": "validation.MAPE", "goal": "minimize"}
+
+    assert best_config.get_best_run(runs, metric).name == "best"
+    with pytest.raises(RuntimeError):
+        best_config.get_best_run(runs[:1], metric)
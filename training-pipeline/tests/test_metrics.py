@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sktime.performance_metrics.forecasting import (
+    mean_absolute_error,
+    mean_absolute_percentage_error,
+    mean_squared_error,
+    mean_squared_percentage_error,
+)
+
+from training_pipeline.metrics import compute_metrics, compute_slice_metrics
+
+
+def sktime_mape(y_true, y_pred):
+    return mean_absolute_percentage_error(y_true, y_pred, symmetric=False)
+
+
+def sktime_smape(y_true, y_pred):
+    return mean_absolute_percentage_error(y_true, y_pred, symmetric=True)
+
+
+def sktime_rmspe(y_true, y_pred):
+    return mean_squared_percentage_error(
+        y_true, y_pred, symmetric=False, square_root=True
+    )
+
+
+def sktime_rmse(y_true, y_pred):
+    return mean_squared_error(y_true, y_pred, square_root=True)
+
+
+SKTIME_METRICS = {
+    "MAPE": sktime_mape,
+    "SMAPE": sktime_smape,
+    "RMSPE": sktime_rmspe,
+    "MAE": mean_absolute_error,
+    "RMSE": sktime_rmse,
+}
+
+
+@pytest.fixture
+def predictions():
+    rng = np.random.default_rng(42)
+    index = pd.MultiIndex.from_product(
+        [
+            range(2),
+            [111, 200, 201],
+            pd.period_range("2023-01-01", periods=24, freq="H"),
+        ],
+        names=["area", "consumer_type", "datetime_utc"],
+    )
+    y_test = pd.DataFrame(
+        {"energy_consumption": rng.uniform(10, 1000, len(index))}, index=index
+    )
+    y_pred = y_test * rng.uniform(0.8, 1.2, size=(len(index), 1))
+
+    # The slices are computed in a single pass, so the order of the rows must not matter.
+    return y_test, y_pred.sample(frac=1, random_state=42)
+
+
+def test_slice_metrics_match_sktime(predictions):
+    y_test, y_pred = predictions
+
+    slices = compute_slice_metrics(y_test, y_pred, metrics=list(SKTIME_METRICS))
+
+    y_pred = y_pred.reindex(y_test.index)
+    expected = y_test.groupby(["area", "consumer_type"]).apply(
+        lambda y_test_slice: pd.Series(
+            {
+                name: metric(y_test_slice, y_pred.loc[y_test_slice.index])
+                for name, metric in SKTIME_METRICS.items()
+            }
+        )
+    )
+    assert list(slices.columns) == ["area", "consumer_type", *SKTIME_METRICS]
+    np.testing.assert_array_equal(
+        slices[["area", "consumer_type"]].to_numpy(),
+        expected.index.to_frame().to_numpy(),
+    )
+    np.testing.assert_allclose(
+        slices[list(SKTIME_METRICS)].to_numpy(), expected.to_numpy(), rtol=1e-10
+    )
+
+
+def test_slice_metrics_by_single_level(predictions):
+    y_test, y_pred = predictions
+
+    slices = compute_slice_metrics(
+        y_test, y_pred, by=["consumer_type"], metrics=["MAPE"]
+    )
+
+    y_pred = y_pred.reindex(y_test.index)
+    expected = y_test.groupby("consumer_type").apply(
+        lambda y_test_slice: sktime_mape(y_test_slice, y_pred.loc[y_test_slice.index])
+    )
+    assert slices["consumer_type"].tolist() == expected.index.tolist()
+    np.testing.assert_allclose(slices["MAPE"], expected, rtol=1e-10)
+
+
+def test_metrics_match_sktime(predictions):
+    y_test, y_pred = predictions
+
+    results = compute_metrics(y_test, y_pred, metrics=list(SKTIME_METRICS))
+
+    y_pred = y_pred.reindex(y_test.index)
+    for name, metric in SKTIME_METRICS.items():
+        assert results[name] == pytest.approx(metric(y_test, y_pred), rel=1e-10)
+
+
+def test_unknown_metric():
+    with pytest.raises(ValueError, match="Unknown metric"):
+        compute_metrics(pd.Series([1.0]), pd.Series([1.0]), metrics=["R2"])
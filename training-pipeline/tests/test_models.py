@@ -0,0 +1,43 @@
+from training_pipeline.models import build_model
+
+
+EARLY_STOPPING_CONFIG = {
+    "forecaster__estimator__n_estimators": 2500,
+    "forecaster__estimator__early_stopping_rounds": 50,
+    "forecaster__estimator__validation_size": 24,
+}
+
+
+def get_estimator_params(model) -> dict:
+    return model.get_params()["forecaster"].estimator.get_params()
+
+
+def test_best_iteration_becomes_the_number_of_trees():
+    model = build_model(
+        {**EARLY_STOPPING_CONFIG, "forecaster__estimator__best_iteration": 123.0},
+        prebinned=True,
+    )
+
+    params = get_estimator_params(model)
+    assert params["n_estimators"] == 123
+    assert "early_stopping_rounds" not in params
+    assert "validation_size" not in params
+    assert "best_iteration" not in params
+
+
+def test_early_stopping_is_kept_for_the_hyperparameter_optimization():
+    params = get_estimator_params(
+        build_model(dict(EARLY_STOPPING_CONFIG), prebinned=True)
+    )
+
+    assert params["n_estimators"] == 2500
+    assert params["early_stopping_rounds"] == 50
+    assert params["validation_size"] == 24
+
+
+def test_early_stopping_is_dropped_without_the_prebinned_regressor():
+    params = get_estimator_params(build_model(dict(EARLY_STOPPING_CONFIG)))
+
+    assert params["n_estimators"] == 2500
+    assert "early_stopping_rounds" not in params
+    assert "validation_size" not in params
@@ -0,0 +1,92 @@
+import pytest
+
+from training_pipeline import profiling, utils
+from training_pipeline.profiling import StageProfiler
+
+
+def make_profiler(wall_times: dict, **kwargs) -> StageProfiler:
+    """Make a profiler that recorded stages with the given wall times."""
+
+    profiler = StageProfiler(**kwargs)
+    profiler.stages = [
+        {
+            "stage": stage,
+            "wall_time_s": wall_time_s,
+            "cpu_time_s": wall_time_s,
+            "peak_rss_mb": 100.0,
+        }
+        for stage, wall_time_s in wall_times.items()
+    ]
+
+    return profiler
+
+
+def test_stages_are_recorded_in_execution_order():
+    profiler = StageProfiler()
+
+    @profiler.track()
+    def fit():
+        return "fitted"
+
+    with profiler.stage("load"):
+        pass
+    assert fit() == "fitted"
+    with pytest.raises(ValueError):
+        with profiler.stage("evaluate"):
+            raise ValueError()
+
+    assert list(profiler.to_dataframe()["stage"]) == ["load", "fit", "evaluate"]
+    assert all(stage["wall_time_s"] >= 0 for stage in profiler.stages)
+    assert all(stage["peak_rss_mb"] > 0 for stage in profiler.stages)
+
+
+def test_regressions_are_detected():
+    previous_profile = {
+        "stages": make_profiler({"load": 10.0, "fit": 100.0, "evaluate": 10.0}).stages
+    }
+    profiler = make_profiler(
+        {"load": 11.0, "fit": 150.0, "evaluate": 12.5, "refit": 100.0},
+        regression_threshold=0.2,
+    )
+
+    regressions = profiler.compare(previous_profile)
+
+    # The stages without a previous wall time, e.g. refit, aren't compared.
+    assert [regression["stage"] for regression in regressions] == ["fit", "evaluate"]
+    assert regressions[0] == {
+        "stage": "fit",
+        "wall_time_s": 150.0,
+        "previous_wall_time_s": 100.0,
+        "relative_change": pytest.approx(0.5),
+    }
+
+
+def test_fast_stages_are_never_regressions():
+    previous_profile = {"stages": make_profiler({"split": 0.1}).stages}
+    profiler = make_profiler({"split": 0.9}, min_wall_time_s=1.0)
+
+    assert profiler.compare(previous_profile) == []
+    assert profiler.compare(None) == []
+
+
+def test_save_reports_the_regressions_against_the_previous_profile(tmp_path):
+    first_profile = make_profiler({"load": 10.0, "fit": 100.0}).save(save_dir=tmp_path)
+    second_profile = make_profiler({"load": 10.0, "fit": 130.0}).save(save_dir=tmp_path)
+
+    assert first_profile["regressions"] == []
+    assert first_profile["total_wall_time_s"] == pytest.approx(110.0)
+    assert [regression["stage"] for regression in second_profile["regressions"]] == [
+        "fit"
+    ]
+    assert utils.load_json("train_profile.json", save_dir=tmp_path) == second_profile
+
+
+def test_profiler_is_configured_from_the_settings(monkeypatch):
+    monkeypatch.setattr(profiling, "_PROFILER", None)
+    monkeypatch.setitem(profiling.SETTINGS, "PROFILE_REGRESSION_THRESHOLD", "0.5")
+    monkeypatch.setitem(profiling.SETTINGS, "PROFILE_MIN_WALL_TIME_S", "10")
+
+    profiler = profiling.get_profiler()
+
+    assert (profiler.regression_threshold, profiler.min_wall_time_s) == (0.5, 10.0)
+    assert profiling.get_profiler() is profiler
@@ -0,0 +1,131 @@
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+
+from training_pipeline import regressors
+
+
+PARAMS = {"n_estimators": 30, "num_leaves": 15, "n_jobs": 1, "random_state": 42}
+
+
+@pytest.fixture
+def empty_dataset_cache(monkeypatch):
+    """Replace the process wide dataset cache with an empty one for the duration of the test."""
+
+    cache = regressors.DatasetCache()
+    monkeypatch.setattr(regressors, "_DATASET_CACHE", cache)
+
+    return cache
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(500, 5)), columns=[f"x{i}" for i in range(5)])
+    y = X["x0"] * 2 - X["x1"] + rng.normal(scale=0.1, size=len(X))
+
+    return X, y.to_numpy()
+
+
+@pytest.mark.parametrize("learning_rate", [0.1, 0.05])
+def test_predictions_match_lgbm_regressor(data, empty_dataset_cache, learning_rate):
+    X, y = data
+    params = {**PARAMS, "learning_rate": learning_rate}
+
+    expected = lgb.LGBMRegressor(**params).fit(X, y).predict(X)
+    first = regressors.PrebinnedLGBMRegressor(**params).fit(X, y).predict(X)
+    # The second fit reuses the binned dataset of the first one.
+    second = regressors.PrebinnedLGBMRegressor(**params).fit(X, y).predict(X)
+
+    assert (empty_dataset_cache.misses, empty_dataset_cache.hits) == (1, 1)
+    np.testing.assert_array_equal(first, expected)
+    np.testing.assert_array_equal(second, expected)
+
+
+def test_boosting_params_share_the_binned_dataset(data, empty_dataset_cache):
+    X, y = data
+    regressors.PrebinnedLGBMRegressor(**PARAMS).fit(X, y)
+
+    params = {**PARAMS, "learning_rate": 0.3, "num_leaves": 7}
+    predictions = regressors.PrebinnedLGBMRegressor(**params).fit(X, y).predict(X)
+    expected = lgb.LGBMRegressor(**params).fit(X, y).predict(X)
+
+    assert empty_dataset_cache.hits == 1
+    np.testing.assert_array_equal(predictions, expected)
+
+
+def test_binning_params_are_not_served_from_cache(data, empty_dataset_cache):
+    X, y = data
+    regressors.PrebinnedLGBMRegressor(**PARAMS).fit(X, y)
+
+    params = {**PARAMS, "max_bin": 63}
+    predictions = regressors.PrebinnedLGBMRegressor(**params).fit(X, y).predict(X)
+    expected = lgb.LGBMRegressor(**params).fit(X, y).predict(X)
+
+    assert empty_dataset_cache.hits == 0
+    np.testing.assert_array_equal(predictions, expected)
+
+
+def make_series_data(n_series: int = 4, n_timepoints: int = 100):
+    rng = np.random.default_rng(1)
+    index = pd.MultiIndex.from_product(
+        [range(n_series), range(n_timepoints)], names=["series", "timepoint"]
+    )
+    X = pd.DataFrame(rng.normal(size=(len(index), 3)), index=index, columns=list("abc"))
+    y = X["a"] - X["b"] + rng.normal(scale=0.5, size=len(X))
+
+    return X, y.to_numpy()
+
+
+def test_split_validation_tail_holds_out_the_last_timepoints():
+    X, y = make_series_data()
+
+    X_train, y_train, X_valid, y_valid = regressors.split_validation_tail(X, y, 24)
+
+    assert X_train.index.get_level_values("timepoint").max() == 75
+    assert set(X_valid.index.get_level_values("timepoint")) == set(range(76, 100))
+    assert (len(X_train), len(X_valid)) == (4 * 76, 4 * 24)
+    is_valid = X.index.get_level_values("timepoint") >= 76
+    np.testing.assert_array_equal(y_train, y[~is_valid])
+    np.testing.assert_array_equal(y_valid, y[is_valid])
+
+
+@pytest.mark.parametrize("validation_size", [100, 200])
+def test_split_validation_tail_requires_training_timepoints(validation_size):
+    X, y = make_series_data()
+
+    with pytest.raises(ValueError, match="Not enough timepoints"):
+        regressors.split_validation_tail(X, y, validation_size)
+
+
+def test_split_validation_tail_requires_timepoints():
+    X, y = make_series_data()
+
+    with pytest.raises(ValueError, match="indexed by"):
+        regressors.split_validation_tail(X.reset_index(drop=True), y, 24)
+
+
+def test_record_best_iterations(empty_dataset_cache):
+    X, y = make_series_data()
+    params = {
+        **PARAMS,
+        "n_estimators": 500,
+        "early_stopping_rounds": 5,
+        "validation_size": 24,
+    }
+
+    with regressors.record_best_iterations() as best_iterations:
+        models = [
+            regressors.PrebinnedLGBMRegressor(**params).fit(X, y),
+            regressors.PrebinnedLGBMRegressor(**{**params, "learning_rate": 0.3}).fit(
+                X, y
+            ),
+            # Fits without early stopping don't record their best iteration.
+            regressors.PrebinnedLGBMRegressor(**PARAMS).fit(X, y),
+        ]
+    regressors.PrebinnedLGBMRegressor(**params).fit(X, y)
+
+    assert best_iterations == [models[0].best_iteration_, models[1].best_iteration_]
+    assert all(0 < best_iteration < 500 for best_iteration in best_iterations)
+    assert models[0].booster_.current_iteration() < 500
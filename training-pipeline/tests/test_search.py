@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from training_pipeline import search
+
+
+# Grid of 12 points whose score is the sum of the positions of its values.
+PARAMETERS = {
+    "a": {"values": [0, 1, 2, 3]},
+    "b": {"values": [0, 1, 2]},
+}
+
+
+def score(config: dict) -> float:
+    return float(config["a"] + config["b"])
+
+
+def make_evaluate(scores=score, evaluations=None):
+    def evaluate(configs: list, rung: int) -> list:
+        if evaluations is not None:
+            evaluations.append((rung, configs))
+
+        return [scores(config) for config in configs]
+
+    return evaluate
+
+
+def to_point(config: dict) -> tuple:
+    return config["a"], config["b"]
+
+
+@pytest.mark.parametrize("proposer_name", ["random", "bayes"])
+def test_proposer_runs_out_of_candidates(proposer_name):
+    proposer = search.get_proposer(proposer_name, PARAMETERS, seed=0)
+
+    configs = proposer.propose(5)
+    for config in configs:
+        proposer.observe(config, score(config))
+    configs += proposer.propose(20)
+
+    assert len({to_point(config) for config in configs}) == 12
+    assert proposer.propose(1) == []
+
+
+def test_bayes_proposer_ignores_non_finite_scores():
+    proposer = search.BayesianProposer(PARAMETERS, seed=0, n_initial=4)
+    configs = proposer.propose(6)
+    for config in configs[:4]:
+        proposer.observe(config, score(config))
+    for config in configs[4:]:
+        proposer.observe(config, np.inf)
+
+    assert len(proposer.propose(3)) == 3
+
+
+def test_bayes_proposer_exploits_the_observed_scores():
+    proposer = search.BayesianProposer(PARAMETERS, seed=0, n_initial=4)
+    observed_points = [(a, b) for a in [2, 3] for b in [0, 1, 2]] + [(0, 2), (1, 2)]
+    for point in observed_points:
+        config = proposer._to_config(point)
+        proposer.proposed.add(point)
+        proposer.observe(config, score(config))
+
+    (config,) = proposer.propose(1)
+
+    # The candidates left are (0, 0), (0, 1), (1, 0) and (1, 1).
+    assert config == {"a": 0, "b": 0}
+
+
+def test_successive_halving_promotes_the_best_configs():
+    evaluations = []
+    proposer = search.RandomProposer(PARAMETERS, seed=0)
+
+    trials = search.successive_halving(
+        make_evaluate(evaluations=evaluations),
+        proposer,
+        n_configs=9,
+        n_rungs=3,
+        eta=3,
+    )
+
+    assert [(rung, len(configs)) for rung, configs in evaluations] == [
+        (0, 9),
+        (1, 3),
+        (2, 1),
+    ]
+    assert len(trials) == 13
+    for (_, configs), (_, promoted) in zip(evaluations, evaluations[1:]):
+        best_scores = sorted(score(config) for config in configs)[: len(promoted)]
+        assert sorted(score(config) for config in promoted) == best_scores
+
+
+def test_successive_halving_never_promotes_non_finite_scores():
+    evaluations = []
+    proposer = search.RandomProposer(PARAMETERS, seed=0)
+
+    search.successive_halving(
+        make_evaluate(lambda config: np.inf, evaluations=evaluations),
+        proposer,
+        n_configs=9,
+        n_rungs=3,
+    )
+
+    assert [rung for rung, _ in evaluations] == [0]
+
+
+@pytest.mark.parametrize("proposer_name", ["random", "bayes"])
+@pytest.mark.parametrize(
+    "n_configs, expected_evaluations",
+    [
+        # The brackets start 8, 3 and 1 configs on the rungs 0, 1 and 2.
+        (8, [(0, 8), (1, 2), (2, 1), (1, 3), (2, 1), (2, 1)]),
+        # The first bracket proposes the whole grid, thus the next ones have nothing left to evaluate.
+        (12, [(0, 12), (1, 4), (2, 1)]),
+        (50, [(0, 12), (1, 4), (2, 1)]),
+    ],
+)
+def test_hyperband_evaluates_every_bracket(
+    proposer_name, n_configs, expected_evaluations
+):
+    evaluations = []
+    proposer = search.get_proposer(proposer_name, PARAMETERS, seed=0)
+
+    trials = search.hyperband(
+        make_evaluate(evaluations=evaluations),
+        proposer,
+        n_configs=n_configs,
+        n_rungs=3,
+        eta=3,
+    )
+
+    assert [(rung, len(configs)) for rung, configs in evaluations] == (
+        expected_evaluations
+    )
+    assert len(trials) == sum(n for _, n in expected_evaluations)
+    assert len({to_point(trial["config"]) for trial in trials}) == 12
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from training_pipeline import sharding
+from training_pipeline.models import build_model
+from training_pipeline.train import compute_forecast_exogenous_variables
+
+
+FH = 24
+CONFIG = {
+    "forecaster__estimator__n_estimators": 20,
+    "forecaster_transformers__window_summarizer__lag_feature__lag": [1, 2, 24],
+}
+
+
+@pytest.fixture(scope="module")
+def data(training_data):
+    y_train, y_test, X_train, X_test = training_data
+    y = pd.concat([y_train, y_test]).sort_index()
+    X = pd.concat([X_train, X_test]).sort_index()
+
+    return y, X, compute_forecast_exogenous_variables(X_test, FH)
+
+
+def select_series(data: pd.DataFrame, level: str, value) -> pd.DataFrame:
+    return data[data.index.get_level_values(level) == value]
+
+
+@pytest.mark.parametrize("shard_by", ["area", "consumer_type"])
+def test_every_shard_matches_a_model_fitted_on_its_series(data, shard_by):
+    y, X, X_forecast = data
+    fh = np.arange(FH) + 1
+    model = build_model(dict(CONFIG), shard_by=shard_by, n_jobs=1)
+    model.fit(y, X=X, fh=fh)
+
+    y_pred = model.predict(X=X_forecast)
+
+    groups = y.index.get_level_values(shard_by).unique()
+    assert sorted(model.forecasters_.keys()) == sorted(groups)
+    assert y_pred.index.equals(X_forecast.index)
+    for group in groups:
+        expected = (
+            build_model(dict(CONFIG))
+            .set_params(forecaster__estimator__n_jobs=1)
+            .fit(
+                select_series(y, shard_by, group),
+                X=select_series(X, shard_by, group),
+                fh=fh,
+            )
+            .predict(X=select_series(X_forecast, shard_by, group))
+        )
+        pd.testing.assert_frame_equal(select_series(y_pred, shard_by, group), expected)
+
+
+def test_consumer_type_clusters_group_whole_consumer_types(data):
+    y = data[0]
+
+    groups = sharding.cluster_consumer_types(y, n_clusters=2)
+
+    assert set(groups.keys()) == set(y.index.droplevel(-1).unique())
+    assert len(set(groups.values())) == 2
+    for consumer_type in y.index.get_level_values("consumer_type").unique():
+        assert len({g for (_, c), g in groups.items() if c == consumer_type}) == 1
+
+
+def test_predict_without_exogenous_variables_is_rejected(data):
+    y, X, _ = data
+    model = build_model(dict(CONFIG), shard_by="area", n_jobs=1)
+    model.fit(y, X=X, fh=np.arange(FH) + 1)
+
+    with pytest.raises(ValueError, match="X is required"):
+        model.predict()
@@ -0,0 +1,228 @@
+import threading
+from types import SimpleNamespace
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+
+from training_pipeline import train
+from training_pipeline.models import build_model
+
+
+FH = 24
+N_ESTIMATORS = 20
+CONFIG_HASH = "config-hash"
+
+
+def select_until(data: pd.DataFrame, end: pd.Period) -> pd.DataFrame:
+    return data[data.index.get_level_values("datetime_utc") <= end]
+
+
+@pytest.fixture(scope="module")
+def fitted_model(training_data):
+    """Model fitted on all the training split except its last 2 days."""
+
+    y_train, _, X_train, _ = training_data
+    cutoff = y_train.index.get_level_values("datetime_utc").max() - 48
+    model = build_model(
+        {
+            "forecaster__estimator__n_estimators": N_ESTIMATORS,
+            "forecaster_transformers__window_summarizer__lag_feature__lag": [1, 2, 24],
+        }
+    )
+    model.fit(
+        select_until(y_train, cutoff),
+        X=select_until(X_train, cutoff),
+        fh=np.arange(FH) + 1,
+    )
+
+    return model
+
+
+@pytest.fixture
+def previous_production_model(monkeypatch, fitted_model):
+    """Serve the fitted model as the production model of the previous run."""
+
+    train_metadata = {
+        "model_version": 3,
+        "refresh": {
+            "mode": "full",
+            "n_incremental_refreshes": 0,
+            "config_hash": CONFIG_HASH,
+        },
+        "results": {"test": {}},
+    }
+    monkeypatch.setattr(train.utils, "load_json", lambda file_name: train_metadata)
+    monkeypatch.setattr(
+        train, "load_model_from_model_registry", lambda model_version: fitted_model
+    )
+
+    return train_metadata
+
+
+def load_refreshable_model(y_train, **kwargs):
+    kwargs = {
+        "config_hash": CONFIG_HASH,
+        "full_retrain_every": 24,
+        "max_n_trees": 1000,
+        "refresh_n_estimators": 10,
+        **kwargs,
+    }
+
+    return train.load_refreshable_model(y_train, **kwargs)
+
+
+def test_previous_model_is_refreshed(training_data, previous_production_model):
+    model, train_metadata = load_refreshable_model(training_data[0])
+
+    assert model is not None
+    assert train_metadata is previous_production_model
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"config_hash": "other-config-hash"},
+        {"full_retrain_every": 0},
+        {"max_n_trees": N_ESTIMATORS + 19},
+    ],
+)
+def test_full_retrain_is_forced(training_data, previous_production_model, kwargs):
+    assert load_refreshable_model(training_data[0], **kwargs) == (None, None)
+
+
+def test_model_that_saw_the_data_after_y_is_not_refreshed(training_data, fitted_model):
+    y_train = training_data[0]
+    cutoff = fitted_model.cutoff[0]
+
+    assert train.can_refresh_model(fitted_model, y_train)
+    assert not train.can_refresh_model(fitted_model, select_until(y_train, cutoff - 1))
+
+
+def test_model_without_window_history_is_not_refreshed(training_data, fitted_model):
+    y_train = training_data[0]
+    window_length = fitted_model.forecaster_.window_length_
+    first_timepoint = fitted_model.cutoff[0] - window_length + 2
+
+    assert not train.can_refresh_model(
+        fitted_model,
+        y_train[y_train.index.get_level_values("datetime_utc") >= first_timepoint],
+    )
+
+
+def test_refresh_trains_only_on_the_new_hours(monkeypatch, training_data, fitted_model):
+    y_train, _, X_train, _ = training_data
+    cutoff = fitted_model.cutoff[0]
+    n_series = y_train.index.droplevel("datetime_utc").nunique()
+    fit = lgb.LGBMRegressor.fit
+    n_samples = []
+
+    def record_fit(self, X, y, **kwargs):
+        n_samples.append(len(X))
+
+        return fit(self, X, y, **kwargs)
+
+    monkeypatch.setattr(lgb.LGBMRegressor, "fit", record_fit)
+
+    refreshed_model = train.refresh_model(
+        fitted_model, y_train, X_train, n_estimators=5
+    )
+
+    assert n_samples == [n_series * 48]
+    assert refreshed_model.cutoff[0] == cutoff + 48
+    assert (
+        refreshed_model.forecaster_.estimator_.booster_.num_trees() == N_ESTIMATORS + 5
+    )
+    # The previous model is left untouched.
+    assert fitted_model.cutoff[0] == cutoff
+    assert fitted_model.forecaster_.estimator_.booster_.num_trees() == N_ESTIMATORS
+
+
+def test_refresh_without_new_hours_keeps_the_model(training_data, fitted_model):
+    y_train, _, X_train, _ = training_data
+    cutoff = fitted_model.cutoff[0]
+
+    refreshed_model = train.refresh_model(
+        fitted_model, select_until(y_train, cutoff), select_until(X_train, cutoff)
+    )
+
+    assert refreshed_model.cutoff[0] == cutoff
+    assert refreshed_model.forecaster_.estimator_.booster_.num_trees() == N_ESTIMATORS
+
+
+class HopsworksProject:
+    """
+    Fake Hopsworks project whose model upload waits for the wandb artifact to be committed,
+    thus publish_best_model() only completes if both uploads overlap.
+    """
+
+    def __init__(self, model_version: int, timeout: float = 10):
+        self.model_version = model_version
+        self.timeout = timeout
+
+        self.upload_started = threading.Event()
+        self.artifact_committed = threading.Event()
+        self.tags = []
+
+    def get_model_registry(self):
+        return SimpleNamespace(python=SimpleNamespace(create_model=self.create_model))
+
+    def create_model(self, name: str, metrics: dict):
+        def save(model_dir: str):
+            self.upload_started.set()
+            assert self.artifact_committed.wait(
+                self.timeout
+            ), "The model was uploaded to Hopsworks before the wandb artifact was committed."
+
+        return SimpleNamespace(save=save, version=self.model_version)
+
+    def get_feature_store(self):
+        return SimpleNamespace(get_feature_view=self.get_feature_view)
+
+    def get_feature_view(self, name: str, version: int):
+        return SimpleNamespace(
+            add_tag=lambda name, value: self.tags.append(("feature_view", value)),
+            add_training_dataset_tag=lambda training_dataset_version, name, value: self.tags.append(
+                (f"training_dataset_{training_dataset_version}", value)
+            ),
+        )
+
+    def wait_for_artifact(self):
+        assert self.upload_started.wait(
+            self.timeout
+        ), "The wandb artifact was committed before the model was uploaded to Hopsworks."
+        self.artifact_committed.set()
+
+
+def test_best_model_is_published_to_both_registries_concurrently(monkeypatch, tmp_path):
+    project = HopsworksProject(model_version=7)
+    monkeypatch.setattr(train.hopsworks, "login", lambda **kwargs: project)
+    for key in ["FS_API_KEY", "FS_PROJECT_NAME", "WANDB_ENTITY", "WANDB_PROJECT"]:
+        monkeypatch.setitem(train.SETTINGS, key, key.lower())
+    artifact = SimpleNamespace(
+        metadata={"results": {"test": {"MAPE": 0.1}}},
+        version="v3",
+        type="model",
+        _name="best_model",
+        name="best_model:v3",
+        wait=project.wait_for_artifact,
+    )
+    logged_artifacts = []
+    run = SimpleNamespace(log_artifact=logged_artifacts.append, finish=lambda: None)
+
+    model_version = train.publish_best_model(
+        run,
+        artifact,
+        tmp_path,
+        feature_view_version=1,
+        training_dataset_version=2,
+    )
+
+    assert model_version == 7
+    assert logged_artifacts == [artifact]
+    assert sorted(target for target, _ in project.tags) == [
+        "feature_view",
+        "training_dataset_2",
+    ]
+    assert all(tag["version"] == "v3" for _, tag in project.tags)
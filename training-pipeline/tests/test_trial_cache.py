@@ -0,0 +1,101 @@
+import pytest
+
+from training_pipeline import hyperparameter_tuning, trial_cache
+from training_pipeline.trial_cache import TrialCache
+
+
+FH = 24
+CV_SCHEME = {"splitter": "expanding_window", "strategy": "refit", "k": 3}
+CONFIG = {
+    "forecaster__estimator__learning_rate": 0.1,
+    "forecaster__estimator__n_jobs": 4,
+    "forecaster_transformers__window_summarizer__n_jobs": 1,
+}
+RESULTS = {"validation": {"MAPE": 0.1, "RMSPE": 0.2}}
+
+
+def build_key(training_data, config=CONFIG, **kwargs) -> str:
+    y_train, _, X_train, _ = training_data
+    kwargs = {"fh": FH, "cv_scheme": CV_SCHEME, **kwargs}
+
+    return trial_cache.build_key(config, y_train, X_train, **kwargs)
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    """Replace the process wide trial cache with an empty one for the duration of the test."""
+
+    cache = TrialCache(tmp_path / "trial_cache.sqlite")
+    monkeypatch.setattr(trial_cache, "_TRIAL_CACHE", cache)
+
+    return cache
+
+
+def test_resource_params_are_not_part_of_the_key(training_data):
+    config = {
+        **CONFIG,
+        "forecaster__estimator__n_jobs": 1,
+        "forecaster_transformers__window_summarizer__n_jobs": 8,
+    }
+
+    assert build_key(training_data, config) == build_key(training_data)
+    assert trial_cache.normalize_config(config) == {
+        "forecaster__estimator__learning_rate": 0.1,
+        "precision": trial_cache.PRECISION,
+    }
+
+
+def test_precision_is_part_of_the_key(monkeypatch, training_data):
+    key = build_key(training_data)
+    monkeypatch.setattr(trial_cache, "PRECISION", "float32")
+
+    assert build_key(training_data) != key
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"config": {**CONFIG, "forecaster__estimator__learning_rate": 0.15}},
+        {"fh": 48},
+        {"cv_scheme": {**CV_SCHEME, "k": 2}},
+    ],
+)
+def test_results_changing_inputs_are_part_of_the_key(training_data, kwargs):
+    assert build_key(training_data, **kwargs) != build_key(training_data)
+
+
+def test_training_data_is_part_of_the_key(training_data):
+    y_train, _, X_train, _ = training_data
+    key = build_key(training_data)
+
+    assert (
+        trial_cache.build_key(CONFIG, y_train.iloc[1:], X_train, FH, CV_SCHEME) != key
+    )
+    assert trial_cache.build_key(CONFIG, y_train, None, FH, CV_SCHEME) != key
+
+
+def test_results_are_persisted(cache):
+    assert cache.get("key") is None
+
+    cache.put("key", CONFIG, RESULTS)
+
+    assert cache.get("key") == RESULTS
+    assert TrialCache(cache.path).get("key") == RESULTS
+    assert len(cache) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cached_trial_is_not_refit(monkeypatch, training_data, cache):
+    y_train, _, X_train, _ = training_data
+    cache.put(build_key(training_data), CONFIG, RESULTS)
+
+    def train_model_cv(*args, **kwargs):
+        raise AssertionError("The cached trial was refit.")
+
+    monkeypatch.setattr(hyperparameter_tuning, "train_model_cv", train_model_cv)
+
+    results = hyperparameter_tuning.evaluate_config(
+        CONFIG, y_train, X_train, fh=FH, k=3
+    )
+
+    assert results == RESULTS
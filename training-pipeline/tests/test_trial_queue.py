@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from training_pipeline.trial_queue import Heartbeat, TrialQueue
+
+
+QUEUE_NAME = "queue"
+CONFIGS = [{"learning_rate": 0.1}, {"learning_rate": 0.15}]
+LEASE_S = 0.2
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = TrialQueue(tmp_path / "trial_queue.sqlite", lease_s=LEASE_S, max_attempts=2)
+    queue.create(QUEUE_NAME, CONFIGS, metadata={"fh": 24})
+
+    return queue
+
+
+def get_trial(queue: TrialQueue, trial_id: int) -> dict:
+    trials = queue.get_trials(QUEUE_NAME).set_index("id")
+
+    return trials.loc[trial_id].to_dict()
+
+
+def test_trials_are_claimed_once_in_submission_order(queue):
+    claims = [queue.claim(QUEUE_NAME, worker) for worker in ["a", "b", "c"]]
+
+    assert [claim[1] if claim else None for claim in claims] == [*CONFIGS, None]
+    assert queue.get_metadata(QUEUE_NAME) == {"fh": 24}
+    assert queue.get_last_name() == QUEUE_NAME
+
+
+def test_queue_is_done_when_every_trial_is_finished_or_failed(queue):
+    first_id, _ = queue.claim(QUEUE_NAME, "a")
+    second_id, _ = queue.claim(QUEUE_NAME, "b")
+    queue.complete(first_id, "a", {"validation": {"MAPE": 0.1}})
+
+    assert not queue.is_done(QUEUE_NAME)
+
+    queue.fail(second_id, "b", "Out of memory.")
+
+    assert queue.is_done(QUEUE_NAME)
+    trials = queue.get_trials(QUEUE_NAME)
+    assert trials["status"].tolist() == ["finished", "failed"]
+    assert trials["results"].tolist() == [{"validation": {"MAPE": 0.1}}, None]
+    assert trials["error"].tolist() == [None, "Out of memory."]
+
+
+def test_expired_lease_is_claimed_again(queue):
+    trial_id, _ = queue.claim(QUEUE_NAME, "crashed")
+    queue.claim(QUEUE_NAME, "other")
+    time.sleep(LEASE_S * 1.5)
+
+    assert queue.claim(QUEUE_NAME, "retry") == (trial_id, CONFIGS[0])
+    assert get_trial(queue, trial_id)["worker"] == "retry"
+    assert get_trial(queue, trial_id)["attempts"] == 2
+
+
+def test_heartbeat_keeps_the_lease(queue):
+    trial_id, _ = queue.claim(QUEUE_NAME, "a")
+    other_trial_id, _ = queue.claim(QUEUE_NAME, "b")
+
+    with Heartbeat(queue, trial_id, "a"):
+        time.sleep(LEASE_S * 2)
+        claim = queue.claim(QUEUE_NAME, "c")
+
+    # Only the trial without heartbeat is claimed again.
+    assert claim == (other_trial_id, CONFIGS[1])
+
+
+def test_trial_fails_after_max_attempts(queue):
+    for worker in ["a", "b"]:
+        trial_id, _ = queue.claim(QUEUE_NAME, worker)
+        time.sleep(LEASE_S * 1.5)
+
+    # The second trial is claimed, as the first one has used all its attempts.
+    assert queue.claim(QUEUE_NAME, "c")[1] == CONFIGS[1]
+    trial = get_trial(queue, trial_id)
+    assert trial["status"] == "failed"
+    assert trial["error"] == "Lease expired too many times."
+
+
+def test_result_of_a_lost_lease_is_dropped(queue):
+    trial_id, _ = queue.claim(QUEUE_NAME, "slow")
+    time.sleep(LEASE_S * 1.5)
+    queue.claim(QUEUE_NAME, "fast")
+
+    assert not queue.heartbeat(trial_id, "slow")
+
+    queue.complete(trial_id, "slow", {"validation": {"MAPE": 1.0}})
+    assert get_trial(queue, trial_id)["status"] == "running"
+
+    queue.complete(trial_id, "fast", {"validation": {"MAPE": 0.1}})
+    trial = get_trial(queue, trial_id)
+    assert (trial["status"], trial["worker"]) == ("finished", "fast")
+    assert trial["results"] == {"validation": {"MAPE": 0.1}}
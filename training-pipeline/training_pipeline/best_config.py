@@ -5,6 +5,8 @@ import wandb
 from typing import Optional
 
 from training_pipeline import utils
+from training_pipeline.configs import gridsearch as gridsearch_configs
+from training_pipeline.hyperparameter_tuning import get_score
 from training_pipeline.settings import SETTINGS, OUTPUT_DIR
 
 logger = utils.get_logger(__name__)
@@ -21,7 +23,8 @@ def upload(sweep_id: Optional[str] = None):
     """Upload the best config from the given sweep to the "best_experiment" wandb Artifact.
 
     Args:
-        sweep_id (Optional[str], optional): Sweep ID to look for the best config. If None, it will look for the last sweep in the cached last_sweep_metadata.json file. Defaults to None.
+        sweep_id (Optional[str], optional): Sweep ID to look for the best config. If None, it will look for the last sweep in the cached last_sweep_metadata.json file.
+            If the last hyperparameter optimization was a multi-fidelity search, which doesn't run a sweep, its best config is read from the same file. Defaults to None.
     """
 
     if sweep_id is None:
@@ -30,11 +33,18 @@ def upload(sweep_id: Optional[str] = None):
 
         logger.info(f"Loading sweep_id from last_sweep_metadata.json with {sweep_id=}")
 
+        if sweep_id is None:
+            upload_from_search(last_sweep_metadata)
+
+            return
+
     api = wandb.Api()
     sweep = api.sweep(
         f"{SETTINGS['WANDB_ENTITY']}/{SETTINGS['WANDB_PROJECT']}/{sweep_id}"
     )
-    best_run = sweep.best_run()
+    best_run = get_best_run(
+        sweep.runs, metric=gridsearch_configs.sweep_configs["metric"]
+    )
 
     with utils.init_wandb_run(
         name="best_experiment",
@@ -54,20 +64,68 @@ def upload(sweep_id: Optional[str] = None):
             f"Best run = {best_run.name} with results {dict(run.summary['validation'])}"
         )
 
-        config_path = OUTPUT_DIR / "best_config.json"
-        with open(config_path, "w") as f:
-            json.dump(best_config, f, indent=4)
+        log_best_config(run, best_config, dict(run.summary["validation"]))
+
+        run.finish()
+
+
+def get_best_run(runs, metric: dict):
+    """Get the best run of a sweep that finished its evaluation.
+    The trials skipped or killed by the time budget are logged without validation results, therefore they are ignored.
+    """
+
+    finished_runs = [run for run in runs if "validation" in run.summary]
+    if len(finished_runs) == 0:
+        raise RuntimeError("No run of the sweep finished its evaluation.")
+
+    return min(
+        finished_runs,
+        key=lambda run: get_score(
+            {"validation": dict(run.summary["validation"])}, metric
+        ),
+    )
+
+
+def upload_from_search(search_metadata: dict):
+    """Upload the best config of a multi-fidelity or queue search to the "best_experiment" wandb Artifact."""
 
-        artifact = wandb.Artifact(
-            name="best_config",
-            type="model",
-            metadata={"results": {"validation": dict(run.summary["validation"])}},
+    with utils.init_wandb_run(
+        name="best_experiment",
+        job_type="hpo",
+        group="train",
+        add_timestamp_to_name=True,
+    ) as run:
+        best_config = search_metadata["best_config"]
+        validation_results = search_metadata["best_results"]["validation"]
+
+        search_name = search_metadata.get("search_id") or search_metadata.get(
+            "queue_name"
         )
-        artifact.add_file(str(config_path))
-        run.log_artifact(artifact)
+        logger.info(f"Best config of search {search_name}:")
+        logger.info(best_config)
+        logger.info(f"Best config results {validation_results}")
+
+        run.config.update(best_config)
+        log_best_config(run, best_config, validation_results)
 
         run.finish()
 
 
+def log_best_config(run, best_config: dict, validation_results: dict):
+    """Save the best config to disk and log it as the "best_config" wandb Artifact."""
+
+    config_path = OUTPUT_DIR / "best_config.json"
+    with open(config_path, "w") as f:
+        json.dump(best_config, f, indent=4)
+
+    artifact = wandb.Artifact(
+        name="best_config",
+        type="model",
+        metadata={"results": {"validation": validation_results}},
+    )
+    artifact.add_file(str(config_path))
+    run.log_artifact(artifact)
+
+
 if __name__ == "__main__":
     fire.Fire(upload)
@@ -0,0 +1,230 @@
+import multiprocessing
+import time
+import weakref
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import pandas as pd
+
+from training_pipeline.settings import SETTINGS
+
+
+# Maximum number of DataFrame arguments kept by the trial worker between trials.
+MAX_SHARED_ARGUMENTS = 4
+
+
+class TrialTimeoutError(Exception):
+    """Raised when a trial didn't finish within its timeout."""
+
+
+class TimeBudget:
+    """
+    Wall-clock budget of a hyperparameter optimization run and timeout of its trials.
+
+    The deadline is an absolute timestamp, therefore the budget is shared by all the processes it is sent to.
+    Trials run with run() are executed in a long-lived worker process, which is killed and replaced only when the
+    trial timeout or the deadline is reached, whichever comes first. Thus, the imports and the in-memory caches of
+    the worker, e.g. the feature & LightGBM dataset caches, are reused by the following trials.
+
+    Args:
+        budget_s: Total wall-clock time of the run. None means unlimited.
+        trial_timeout_s: Maximum wall-clock time of a single trial. None means unlimited.
+    """
+
+    def __init__(
+        self, budget_s: Optional[float] = None, trial_timeout_s: Optional[float] = None
+    ):
+        self.budget_s = budget_s
+        self.trial_timeout_s = trial_timeout_s
+
+        self.deadline = time.time() + budget_s if budget_s else None
+
+        self._worker = None
+
+    def __getstate__(self) -> dict:
+        # Every process the budget is sent to starts its own worker.
+        state = self.__dict__.copy()
+        state["_worker"] = None
+
+        return state
+
+    @property
+    def is_limited(self) -> bool:
+        return self.deadline is not None or self.trial_timeout_s is not None
+
+    def is_exhausted(self) -> bool:
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def get_trial_timeout(self) -> Optional[float]:
+        """Time left for a trial started now. None means unlimited."""
+
+        timeouts = []
+        if self.trial_timeout_s is not None:
+            timeouts.append(self.trial_timeout_s)
+        if self.deadline is not None:
+            timeouts.append(max(0.0, self.deadline - time.time()))
+
+        return min(timeouts) if len(timeouts) > 0 else None
+
+    def run(self, func: Callable, *args, **kwargs):
+        """
+        Run func(*args, **kwargs) within the trial timeout.
+
+        If the budget is unlimited, func runs in the current process. Otherwise, it runs in the trial worker process,
+        which is killed on timeout. NOTE: In that case, func and its arguments must be picklable. The DataFrame
+        arguments are sent to the worker only the first time they are used, thus they must not be modified in place
+        between trials.
+
+        Raises: TrialTimeoutError if func didn't finish in time.
+        """
+
+        if not self.is_limited:
+            return func(*args, **kwargs)
+
+        timeout = self.get_trial_timeout()
+        if self._worker is None:
+            self._worker = TrialWorker()
+        worker = self._worker
+
+        try:
+            worker.submit(func, args, kwargs)
+            if not worker.connection.poll(timeout):
+                self.close()
+
+                raise TrialTimeoutError(
+                    f"The trial didn't finish within {timeout:.0f} s."
+                )
+            succeeded, result = worker.connection.recv()
+        except (EOFError, BrokenPipeError):
+            self.close()
+            succeeded, result = False, RuntimeError(
+                f"The trial process died with exit code {worker.process.exitcode}."
+            )
+
+        if not succeeded:
+            raise result
+
+        return result
+
+    def close(self):
+        """Stop the trial worker, if any. A new one is started by the next run()."""
+
+        if self._worker is not None:
+            self._worker.stop()
+            self._worker = None
+
+
+class TrialWorker:
+    """
+    Spawned process that runs the trials sent by submit() one after another.
+
+    The DataFrame arguments are sent once and referenced by their id in the following trials. The worker keeps
+    the MAX_SHARED_ARGUMENTS most recently used ones.
+    """
+
+    def __init__(self):
+        context = multiprocessing.get_context("spawn")
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=_serve_trials, args=(child_connection,), daemon=False
+        )
+        self.process.start()
+        child_connection.close()
+
+        # The shared arguments are referenced, so their ids aren't reused while the worker holds them.
+        self._shared_arguments = OrderedDict()
+        self._finalizer = weakref.finalize(
+            self, _stop_process, self.process, self.connection
+        )
+
+    def submit(self, func: Callable, args: tuple, kwargs: dict):
+        new_arguments = {}
+
+        def share(value):
+            if not isinstance(value, pd.DataFrame):
+                return value
+
+            key = id(value)
+            if key not in self._shared_arguments:
+                new_arguments[key] = value
+            self._shared_arguments[key] = value
+            self._shared_arguments.move_to_end(key)
+
+            return _SharedArgument(key)
+
+        args = tuple(share(value) for value in args)
+        kwargs = {name: share(value) for name, value in kwargs.items()}
+
+        dropped_keys = []
+        while len(self._shared_arguments) > max(
+            MAX_SHARED_ARGUMENTS, len(new_arguments)
+        ):
+            key, _ = self._shared_arguments.popitem(last=False)
+            dropped_keys.append(key)
+
+        self.connection.send((func, args, kwargs, new_arguments, dropped_keys))
+
+    def stop(self):
+        self._finalizer()
+
+
+class _SharedArgument:
+    """Reference to an argument already sent to the trial worker."""
+
+    def __init__(self, key: int):
+        self.key = key
+
+
+def _serve_trials(connection):
+    shared_arguments = {}
+    while True:
+        try:
+            func, args, kwargs, new_arguments, dropped_keys = connection.recv()
+        except EOFError:
+            break
+
+        for key in dropped_keys:
+            shared_arguments.pop(key, None)
+        shared_arguments.update(new_arguments)
+
+        def resolve(value):
+            if isinstance(value, _SharedArgument):
+                return shared_arguments[value.key]
+
+            return value
+
+        try:
+            result = (
+                True,
+                func(
+                    *(resolve(value) for value in args),
+                    **{name: resolve(value) for name, value in kwargs.items()},
+                ),
+            )
+        except Exception as e:
+            result = (False, e)
+        connection.send(result)
+
+
+def _stop_process(process, connection):
+    connection.close()
+    if process.is_alive():
+        process.kill()
+    process.join()
+
+
+def get_time_budget(
+    budget_s: Optional[float] = None, trial_timeout_s: Optional[float] = None
+) -> TimeBudget:
+    """Start a time budget. The parameters left to None are read from the HPO_TIME_BUDGET_S & HPO_TRIAL_TIMEOUT_S settings."""
+
+    budget_s = budget_s or _get_optional_float("HPO_TIME_BUDGET_S")
+    trial_timeout_s = trial_timeout_s or _get_optional_float("HPO_TRIAL_TIMEOUT_S")
+
+    return TimeBudget(budget_s=budget_s, trial_timeout_s=trial_timeout_s)
+
+
+def _get_optional_float(key: str) -> Optional[float]:
+    value = SETTINGS.get(key)
+
+    return float(value) if value else None
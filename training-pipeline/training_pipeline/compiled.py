@@ -0,0 +1,779 @@
+import hashlib
+import json
+import re
+import tempfile
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+
+# Version of the model bundle layout. Bump it on every breaking change of the saved files.
+SCHEMA_VERSION = 2
+
+# LightGBM treats every value within this threshold as zero.
+K_ZERO_THRESHOLD = 1e-35
+
+# Objectives whose raw score is the prediction.
+IDENTITY_OBJECTIVES = ("regression", "regression_l1", "huber", "fair", "quantile")
+
+MISSING_TYPES = {"None": 0, "Zero": 1, "NaN": 2}
+
+CALENDAR_FEATURES = {
+    "hour_of_day": lambda periods: periods.hour,
+    "day_of_week": lambda periods: periods.dayofweek,
+    "day_of_month": lambda periods: periods.day,
+    "day_of_year": lambda periods: periods.dayofyear,
+    "month_of_year": lambda periods: periods.month,
+}
+
+
+class CompiledTreeEnsemble:
+    """LightGBM tree ensemble flattened into arrays and evaluated vectorized over rows and trees.
+
+    Internal nodes are stored in global arrays. A child is either the index of another internal node or,
+    if negative, the encoded index -(leaf + 1) of a leaf value.
+    """
+
+    def __init__(
+        self,
+        roots: np.ndarray,
+        split_feature: np.ndarray,
+        threshold: np.ndarray,
+        default_left: np.ndarray,
+        missing_type: np.ndarray,
+        left_child: np.ndarray,
+        right_child: np.ndarray,
+        leaf_value: np.ndarray,
+    ):
+        self.roots = roots
+        self.split_feature = split_feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.missing_type = missing_type
+        self.left_child = left_child
+        self.right_child = right_child
+        self.leaf_value = leaf_value
+
+    @classmethod
+    def from_booster(cls, booster) -> "CompiledTreeEnsemble":
+        """Flatten a lightgbm.Booster into arrays."""
+
+        model = booster.dump_model()
+        if model["objective"].split(" ")[0] not in IDENTITY_OBJECTIVES:
+            raise ValueError(f"Unsupported objective: {model['objective']}")
+
+        nodes = {
+            "split_feature": [],
+            "threshold": [],
+            "default_left": [],
+            "missing_type": [],
+            "left_child": [],
+            "right_child": [],
+        }
+        leaf_value = []
+
+        def flatten(node: dict) -> int:
+            if "leaf_value" in node:
+                leaf_value.append(node["leaf_value"])
+
+                return -len(leaf_value)
+
+            if node["decision_type"] != "<=":
+                raise ValueError("Only numerical splits can be compiled.")
+
+            node_index = len(nodes["split_feature"])
+            nodes["split_feature"].append(node["split_feature"])
+            nodes["threshold"].append(node["threshold"])
+            nodes["default_left"].append(node["default_left"])
+            nodes["missing_type"].append(MISSING_TYPES[node["missing_type"]])
+            nodes["left_child"].append(0)
+            nodes["right_child"].append(0)
+            nodes["left_child"][node_index] = flatten(node["left_child"])
+            nodes["right_child"][node_index] = flatten(node["right_child"])
+
+            return node_index
+
+        roots = [flatten(tree["tree_structure"]) for tree in model["tree_info"]]
+
+        return cls(
+            roots=np.array(roots, dtype=np.int32),
+            split_feature=np.array(nodes["split_feature"], dtype=np.int32),
+            threshold=np.array(nodes["threshold"], dtype=np.float64),
+            default_left=np.array(nodes["default_left"], dtype=bool),
+            missing_type=np.array(nodes["missing_type"], dtype=np.int8),
+            left_child=np.array(nodes["left_child"], dtype=np.int32),
+            right_child=np.array(nodes["right_child"], dtype=np.int32),
+            leaf_value=np.array(leaf_value, dtype=np.float64),
+        )
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Predict all the rows of X at once. It follows the decision rules of LightGBM for numerical splits."""
+
+        X = np.asarray(X, dtype=np.float64)
+        n_rows = X.shape[0]
+        node = np.tile(self.roots, (n_rows, 1))
+
+        active_rows, active_trees = np.nonzero(node >= 0)
+        while len(active_rows) > 0:
+            active_nodes = node[active_rows, active_trees]
+            values = X[active_rows, self.split_feature[active_nodes]]
+            missing_type = self.missing_type[active_nodes]
+
+            is_nan = np.isnan(values)
+            values = np.where(
+                is_nan & (missing_type != MISSING_TYPES["NaN"]), 0.0, values
+            )
+            is_missing = (
+                (missing_type == MISSING_TYPES["Zero"])
+                & (np.abs(values) <= K_ZERO_THRESHOLD)
+            ) | ((missing_type == MISSING_TYPES["NaN"]) & is_nan)
+            go_left = np.where(
+                is_missing,
+                self.default_left[active_nodes],
+                values <= self.threshold[active_nodes],
+            )
+
+            next_nodes = np.where(
+                go_left, self.left_child[active_nodes], self.right_child[active_nodes]
+            )
+            node[active_rows, active_trees] = next_nodes
+
+            still_active = next_nodes >= 0
+            active_rows = active_rows[still_active]
+            active_trees = active_trees[still_active]
+
+        leaf_values = self.leaf_value[-node - 1]
+
+        # Sum the trees sequentially, in the same order as LightGBM.
+        return np.cumsum(leaf_values, axis=1)[:, -1]
+
+    def to_arrays(self) -> dict:
+        return {
+            "roots": self.roots,
+            "split_feature": self.split_feature,
+            "threshold": self.threshold,
+            "default_left": self.default_left,
+            "missing_type": self.missing_type,
+            "left_child": self.left_child,
+            "right_child": self.right_child,
+            "leaf_value": self.leaf_value,
+        }
+
+
+class CompiledForecaster:
+    """
+    Recursive forecaster built from a compiled tree ensemble and a feature recipe.
+
+    Every step of the recursive forecast computes the features of all the series with NumPy and evaluates
+    the trees with a single vectorized call. The lags are read from a buffer of the history & the forecasts, and
+    the sum, mean & std windows from running prefix sums, thus every step costs O(1) per series & feature.
+    Loading & predicting requires only NumPy and pandas, thus keep this module free of sktime & settings imports.
+
+    Args:
+        ensemble: Compiled LightGBM trees or any fitted regressor with a predict(X) method.
+        recipe: Feature recipe. It holds the target name, the index names, the history length, the precision
+            of the target & of the features and the ordered list of features consumed by the trees.
+        series: Array of shape (n_series, n_levels) with the (area, consumer_type) keys of every series.
+        history: Array of shape (n_series, history_length) with the last observations of every series.
+        cutoff: Ordinal of the last observed hour.
+        booster_model: LightGBM model in its text format. It is saved in the bundle to be reloaded with lightgbm.
+        bundle_dir: Directory of the model bundle the forecaster was loaded from, if any.
+    """
+
+    def __init__(
+        self,
+        ensemble: CompiledTreeEnsemble,
+        recipe: dict,
+        series: np.ndarray,
+        history: np.ndarray,
+        cutoff: int,
+        booster_model: Optional[str] = None,
+        bundle_dir: Optional[Path] = None,
+    ):
+        self.ensemble = ensemble
+        self.recipe = recipe
+        self.series = series
+        self.history = history
+        self.cutoff = cutoff
+        self.booster_model = booster_model
+        self.bundle_dir = bundle_dir
+
+    @property
+    def history_length(self) -> int:
+        return self.recipe["history_length"]
+
+    def select(self, indices: np.ndarray) -> "CompiledForecaster":
+        """Restrict the forecaster to the series at the given indices. The trees & the recipe are shared, not copied."""
+
+        return CompiledForecaster(
+            ensemble=self.ensemble,
+            recipe=self.recipe,
+            series=self.series[indices],
+            history=self.history[indices],
+            cutoff=self.cutoff,
+            booster_model=self.booster_model,
+        )
+
+    def predict(self, fh: int = 24, y: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Forecast the next fh hours of every series.
+
+        Args:
+            fh: Forecast horizon.
+            y: Optional observations used as history instead of the ones stored at export time.
+
+        Returns: Forecasts indexed by area, consumer_type & datetime_utc.
+        """
+
+        if y is not None:
+            series, history, cutoff = extract_history(y, self.history_length)
+        else:
+            series, history, cutoff = self.series, self.history, self.cutoff
+
+        return _forecast({None: self}, series, history, cutoff, fh=fh)[None]
+
+    def _compute_features(
+        self,
+        buffer: np.ndarray,
+        moments: "RunningMoments",
+        position: int,
+        series: np.ndarray,
+        period: pd.PeriodIndex,
+        exogenous: Optional[dict] = None,
+    ) -> np.ndarray:
+        """
+        Compute the features of all the series for the target at the given buffer position.
+        The index & calendar features don't depend on the forecasts, thus they are cached in exogenous,
+        which is shared by all the forecasters that run the same step.
+        """
+
+        if exogenous is None:
+            exogenous = {}
+
+        n_series = buffer.shape[0]
+        # NOTE: The features are stored in the precision the model was trained with, as the sktime pipeline does.
+        features = np.empty(
+            (n_series, len(self.recipe["features"])),
+            dtype=self.recipe.get("dtype", "float64"),
+        )
+        for column, feature in enumerate(self.recipe["features"]):
+            kind = feature["kind"]
+            if kind == "lag":
+                features[:, column] = buffer[:, position - feature["lag"]]
+            elif kind == "window":
+                end = position - feature["lag"] + 1
+                start = end - feature["window"]
+                if feature["summarizer"] in RunningMoments.SUMMARIZERS:
+                    features[:, column] = moments.summarize(
+                        start, end, feature["summarizer"]
+                    )
+                else:
+                    features[:, column] = summarize(
+                        buffer[:, start:end], feature["summarizer"]
+                    )
+            elif kind == "index":
+                key = ("index", feature["level"])
+                if key not in exogenous:
+                    exogenous[key] = series[:, feature["level"]]
+                features[:, column] = exogenous[key]
+            elif kind == "calendar":
+                key = ("calendar", feature["name"])
+                if key not in exogenous:
+                    exogenous[key] = CALENDAR_FEATURES[feature["name"]](period)[0]
+                features[:, column] = exogenous[key]
+            else:
+                raise ValueError(f"Unknown feature kind: {kind}")
+
+        return features
+
+    def save(self, bundle_dir: Union[str, Path]):
+        """
+        Save the compiled forecaster as a versioned model bundle:
+        - manifest.json: schema version, feature recipe, cutoff & the SHA-256 checksum of every file;
+        - booster.txt: the LightGBM model in its text format, if available;
+        - arrays/*.npy: the tree & history arrays, stored uncompressed to be memory-mapped.
+        """
+
+        bundle_dir = Path(bundle_dir)
+        arrays_dir = bundle_dir / "arrays"
+        arrays_dir.mkdir(parents=True, exist_ok=True)
+
+        arrays = {
+            "series": self.series,
+            "history": self.history,
+            **{f"ensemble_{k}": v for k, v in self.ensemble.to_arrays().items()},
+        }
+        files = {}
+        for name, array in arrays.items():
+            file_name = f"arrays/{name}.npy"
+            np.save(
+                bundle_dir / file_name, np.ascontiguousarray(array), allow_pickle=False
+            )
+            files[file_name] = _hash_file(bundle_dir / file_name)
+        if self.booster_model is not None:
+            (bundle_dir / "booster.txt").write_text(self.booster_model)
+            files["booster.txt"] = _hash_file(bundle_dir / "booster.txt")
+
+        manifest = {
+            "schema_version": SCHEMA_VERSION,
+            "recipe": self.recipe,
+            "cutoff": self.cutoff,
+            "files": files,
+            "checksum": _hash_manifest_files(files),
+        }
+        with open(bundle_dir / "manifest.json", "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    @classmethod
+    def load(
+        cls,
+        bundle_dir: Union[str, Path],
+        mmap_mode: Optional[str] = "r",
+        verify_checksum: bool = True,
+    ) -> "CompiledForecaster":
+        """
+        Load a model bundle saved with save().
+
+        Args:
+            bundle_dir: Directory of the bundle.
+            mmap_mode: Memory-map mode of the arrays. With the default read-only mode the arrays are not copied in memory.
+            verify_checksum: Whether to check the files against the checksums of the manifest.
+
+        Returns: The compiled forecaster.
+        """
+
+        bundle_dir = Path(bundle_dir)
+        with open(bundle_dir / "manifest.json", "r") as f:
+            manifest = json.load(f)
+        if manifest.get("schema_version") != SCHEMA_VERSION:
+            raise ValueError(
+                f"Unsupported model bundle schema version: {manifest.get('schema_version')}"
+            )
+
+        files = manifest["files"]
+        if verify_checksum:
+            if _hash_manifest_files(files) != manifest["checksum"]:
+                raise ValueError(
+                    f"The manifest of the model bundle {bundle_dir} is corrupted."
+                )
+            for file_name, checksum in files.items():
+                if _hash_file(bundle_dir / file_name) != checksum:
+                    raise ValueError(
+                        f"Checksum mismatch for {file_name} of the model bundle {bundle_dir}."
+                    )
+
+        arrays = {
+            Path(file_name).stem: np.load(
+                bundle_dir / file_name, mmap_mode=mmap_mode, allow_pickle=False
+            )
+            for file_name in files
+            if file_name.endswith(".npy")
+        }
+        ensemble = CompiledTreeEnsemble(
+            **{
+                name[len("ensemble_") :]: array
+                for name, array in arrays.items()
+                if name.startswith("ensemble_")
+            }
+        )
+
+        # NOTE: The booster text isn't needed to predict, thus it isn't read to keep the loading fast.
+        # Load it with lightgbm.Booster(model_file=bundle_dir / "booster.txt") when needed.
+        return cls(
+            ensemble=ensemble,
+            recipe=manifest["recipe"],
+            series=arrays["series"],
+            history=arrays["history"],
+            cutoff=manifest["cutoff"],
+            bundle_dir=bundle_dir,
+        )
+
+
+def predict_sharded(
+    forecaster: CompiledForecaster,
+    fh: int = 24,
+    n_jobs: int = 1,
+    tmp_dir: Optional[Union[str, Path]] = None,
+) -> pd.DataFrame:
+    """
+    Forecast the series of the forecaster, sharded across a pool of worker processes.
+
+    The series are split into n_jobs contiguous shards. Every worker memory-maps the model bundle once, therefore
+    the trees are shared by the workers through the page cache instead of being copied into each of them.
+    If the forecaster wasn't loaded from a model bundle, it is saved to a temporary one within tmp_dir first.
+
+    Returns: The forecasts of every series, in the same order as forecaster.predict().
+    """
+
+    n_shards = min(n_jobs, len(forecaster.series))
+    if n_shards <= 1:
+        return forecaster.predict(fh=fh)
+
+    shards = np.array_split(np.arange(len(forecaster.series)), n_shards)
+    if forecaster.bundle_dir is not None:
+        return _predict_shards(forecaster.bundle_dir, shards, fh=fh)
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as bundle_root_dir:
+        bundle_dir = Path(bundle_root_dir) / "best_model_bundle"
+        forecaster.save(bundle_dir)
+
+        return _predict_shards(bundle_dir, shards, fh=fh)
+
+
+def _predict_shards(
+    bundle_dir: Path, shards: List[np.ndarray], fh: int
+) -> pd.DataFrame:
+    predictions = Parallel(n_jobs=len(shards))(
+        delayed(_predict_shard)(bundle_dir, shard, fh) for shard in shards
+    )
+
+    # The shards are contiguous ranges of the sorted series, thus concatenating them keeps the index order.
+    return pd.concat(predictions)
+
+
+def _predict_shard(
+    bundle_dir: Path, series_indices: np.ndarray, fh: int
+) -> pd.DataFrame:
+    # The checksums were verified when the bundle was downloaded or saved.
+    forecaster = CompiledForecaster.load(bundle_dir, verify_checksum=False)
+
+    return forecaster.select(series_indices).predict(fh=fh)
+
+
+def predict_many(
+    forecasters: Dict[Hashable, CompiledForecaster],
+    y: Optional[pd.DataFrame] = None,
+    fh: int = 24,
+    n_jobs: int = 1,
+) -> Dict[Hashable, pd.DataFrame]:
+    """
+    Forecast the same series with several forecasters in a single pass, e.g. a champion model and its challengers.
+
+    The lookback window of every series is shared by all the forecasters and every forecaster reads the trailing
+    part it needs. It is extracted from y once, for the longest history of the forecasters, or, if y is None,
+    it is the history stored in the first forecaster, thus the first forecaster predicts the same as with predict(). The recursive steps of all the forecasters run in lockstep
+    and share the index & calendar features, therefore every extra forecaster costs only its lag & window features
+    and one call of its regressor per step. With n_jobs > 1 the series are sharded across a pool of worker processes.
+
+    Args:
+        forecasters: Forecasters keyed by any hashable, e.g. the model version.
+        y: Optional observations used as the history of every forecaster instead of the one stored in the first forecaster.
+        fh: Forecast horizon.
+        n_jobs: Number of worker processes the series are sharded across.
+
+    Returns: The forecasts of every forecaster, under the same key.
+    """
+
+    if len(forecasters) == 0:
+        return {}
+
+    recipes = [forecaster.recipe for forecaster in forecasters.values()]
+    for key in ("target", "index_names", "freq"):
+        if len({json.dumps(recipe[key]) for recipe in recipes}) > 1:
+            raise ValueError(
+                f"The forecasters must share the same {key} to be run together."
+            )
+
+    history_length = max(
+        forecaster.history_length for forecaster in forecasters.values()
+    )
+    if y is not None:
+        series, history, cutoff = extract_history(y, history_length)
+    else:
+        first_forecaster = next(iter(forecasters.values()))
+        series, history, cutoff = (
+            first_forecaster.series,
+            first_forecaster.history,
+            first_forecaster.cutoff,
+        )
+        if history.shape[1] < history_length:
+            raise ValueError(
+                f"The forecasters need {history_length} hours of history, "
+                f"but the first forecaster stores only {history.shape[1]}."
+            )
+
+    n_shards = min(n_jobs, len(series))
+    if n_shards <= 1:
+        return _forecast(forecasters, series, history, cutoff, fh=fh)
+
+    shards = np.array_split(np.arange(len(series)), n_shards)
+    predictions = Parallel(n_jobs=n_shards)(
+        delayed(_forecast)(forecasters, series[shard], history[shard], cutoff, fh)
+        for shard in shards
+    )
+
+    return {
+        key: pd.concat([shard[key] for shard in predictions]) for key in forecasters
+    }
+
+
+def _forecast(
+    forecasters: Dict[Hashable, CompiledForecaster],
+    series: np.ndarray,
+    history: np.ndarray,
+    cutoff: int,
+    fh: int,
+) -> Dict[Hashable, pd.DataFrame]:
+    """Run the recursive forecast of every forecaster on the same series, one step of all of them at a time."""
+
+    n_series = len(series)
+    history_length = history.shape[1]
+    recipe = next(iter(forecasters.values())).recipe
+
+    states = {}
+    for key, forecaster in forecasters.items():
+        # NOTE: The forecasts are rounded to the precision of the target after every step, as the sktime reduction does.
+        buffer = np.empty(
+            (n_series, forecaster.history_length + fh),
+            dtype=forecaster.recipe.get("target_dtype", "float64"),
+        )
+        # NOTE: The sktime reduction fills the missing observations of the window with zeros.
+        buffer[:, : forecaster.history_length] = np.nan_to_num(
+            history[:, history_length - forecaster.history_length :], nan=0.0
+        )
+        moments = RunningMoments(buffer, n_observed=forecaster.history_length)
+        states[key] = (forecaster, buffer, moments)
+
+    freq = recipe["freq"]
+    periods = pd.period_range(
+        start=pd.Period(ordinal=cutoff + 1, freq=freq), periods=fh, freq=freq
+    )
+    for step in range(fh):
+        exogenous = {}
+        for forecaster, buffer, moments in states.values():
+            position = forecaster.history_length + step
+            features = forecaster._compute_features(
+                buffer, moments, position, series, periods[step : step + 1], exogenous
+            )
+            buffer[:, position] = forecaster.ensemble.predict(features)
+            moments.append(buffer[:, position], position)
+
+    index = pd.MultiIndex.from_arrays(
+        [np.repeat(series[:, level], fh) for level in range(series.shape[1])]
+        + [np.tile(periods, n_series)],
+        names=recipe["index_names"],
+    )
+
+    return {
+        key: pd.DataFrame(
+            {recipe["target"]: buffer[:, forecaster.history_length :].ravel()},
+            index=index,
+        )
+        for key, (forecaster, buffer, _) in states.items()
+    }
+
+
+class RunningMoments:
+    """
+    Prefix sums of the values & squared values of every series of a forecast buffer.
+
+    The sum, mean & std of any window are computed from the difference of two prefix sums, and appending a forecast
+    updates them in O(1). The values are shifted by the mean of the observed history of their series, which keeps
+    the variance numerically stable.
+
+    Args:
+        buffer: Array of shape (n_series, n_timepoints) with the observed history in its first n_observed columns.
+        n_observed: Number of observed timepoints.
+    """
+
+    SUMMARIZERS = ("sum", "mean", "std")
+
+    def __init__(self, buffer: np.ndarray, n_observed: int):
+        n_series, n_timepoints = buffer.shape
+        # The moments are accumulated in float64 whatever the precision of the buffer.
+        observed = buffer[:, :n_observed].astype(np.float64)
+        self.shift = observed.mean(axis=1)
+
+        centered = observed - self.shift[:, np.newaxis]
+        self.sums = np.zeros((n_series, n_timepoints + 1), dtype=np.float64)
+        self.squared_sums = np.zeros((n_series, n_timepoints + 1), dtype=np.float64)
+        self.sums[:, 1 : n_observed + 1] = np.cumsum(centered, axis=1)
+        self.squared_sums[:, 1 : n_observed + 1] = np.cumsum(centered**2, axis=1)
+
+    def append(self, values: np.ndarray, position: int):
+        """Add the values of every series at the given buffer position."""
+
+        centered = values - self.shift
+        self.sums[:, position + 1] = self.sums[:, position] + centered
+        self.squared_sums[:, position + 1] = (
+            self.squared_sums[:, position] + centered**2
+        )
+
+    def summarize(self, start: int, end: int, summarizer: str) -> np.ndarray:
+        """Summarize the window [start, end) of every series."""
+
+        n = end - start
+        centered_sum = self.sums[:, end] - self.sums[:, start]
+        if summarizer == "sum":
+            return centered_sum + n * self.shift
+
+        centered_mean = centered_sum / n
+        if summarizer == "mean":
+            return centered_mean + self.shift
+        elif summarizer == "std":
+            squared_sum = self.squared_sums[:, end] - self.squared_sums[:, start]
+            variance = (squared_sum - n * centered_mean**2) / (n - 1)
+
+            return np.sqrt(np.maximum(variance, 0.0))
+
+        raise ValueError(f"Unsupported summarizer: {summarizer}")
+
+
+def _hash_file(path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+
+def _hash_manifest_files(files: dict) -> str:
+    serialized_files = json.dumps(files, sort_keys=True)
+
+    return hashlib.sha256(serialized_files.encode()).hexdigest()
+
+
+def summarize(window: np.ndarray, summarizer: str) -> np.ndarray:
+    """Summarize every row of the window the same way as the pandas rolling functions."""
+
+    if summarizer == "mean":
+        return window.mean(axis=1)
+    elif summarizer == "std":
+        return window.std(axis=1, ddof=1)
+    elif summarizer == "sum":
+        return window.sum(axis=1)
+    elif summarizer == "min":
+        return window.min(axis=1)
+    elif summarizer == "max":
+        return window.max(axis=1)
+
+    raise ValueError(f"Unsupported summarizer: {summarizer}")
+
+
+def extract_history(y: pd.DataFrame, history_length: int):
+    """Extract the last history_length observations of every series of y into a dense array.
+
+    Returns: The series keys, the history array and the ordinal of the cutoff.
+    """
+
+    y = y.sort_index()
+    timepoints = y.index.get_level_values(-1)
+    cutoff = timepoints.max()
+    start = cutoff - history_length + 1
+    y = y[timepoints >= start]
+
+    values = y.iloc[:, 0].unstack(level=-1)
+    values = values.reindex(columns=pd.period_range(start, cutoff, freq=cutoff.freq))
+
+    return (
+        np.array(values.index.tolist()),
+        values.to_numpy(dtype=np.float64),
+        cutoff.ordinal,
+    )
+
+
+def compile_model(model, compile_trees: bool = True) -> CompiledForecaster:
+    """
+    Compile a fitted forecasting pipeline built with models.build_model().
+
+    Args:
+        model: Fitted sktime ForecastingPipeline of AttachAreaConsumerType, DateTimeFeatures & a recursive
+            LightGBM reduction forecaster with WindowSummarizer features.
+        compile_trees: Whether to flatten the trees into arrays. If False, the fitted LightGBM regressor itself
+            is called once per step, which skips the compilation of the trees when the model is used only once.
+
+    Returns: The compiled forecaster holding the trees, the feature recipe and the latest history of every series.
+    """
+
+    if not hasattr(model, "forecaster_"):
+        raise ValueError(f"Can't compile a model of type {type(model).__name__}.")
+
+    reducer = model.forecaster_
+    if reducer.strategy != "recursive" or reducer.pooling != "global":
+        raise ValueError("Only global recursive reduction forecasters can be compiled.")
+
+    booster = reducer.estimator_.booster_
+    feature_names = booster.feature_name()
+    target, window_features = _get_window_features(reducer.transformers_)
+    index_names = list(reducer._y.index.names)
+
+    features = []
+    for name in feature_names:
+        if name in window_features:
+            features.append(window_features[name])
+        elif name.endswith("_exog") and name[: -len("_exog")] in index_names:
+            features.append(
+                {"kind": "index", "level": index_names.index(name[: -len("_exog")])}
+            )
+        elif name in CALENDAR_FEATURES:
+            features.append({"kind": "calendar", "name": name})
+        else:
+            raise ValueError(f"Can't compile the feature {name}.")
+
+    history_length = int(reducer.window_length_)
+    recipe = {
+        "target": target,
+        "index_names": index_names,
+        "freq": reducer._y.index.get_level_values(-1).freqstr,
+        "history_length": history_length,
+        "dtype": getattr(reducer.transformers_[0], "dtype", None) or "float64",
+        "target_dtype": reducer._y.iloc[:, 0].dtype.name,
+        "feature_names": feature_names,
+        "features": features,
+    }
+    series, history, cutoff = extract_history(reducer._y, history_length)
+
+    if not compile_trees:
+        return CompiledForecaster(
+            ensemble=reducer.estimator_,
+            recipe=recipe,
+            series=series,
+            history=history,
+            cutoff=cutoff,
+        )
+
+    return CompiledForecaster(
+        ensemble=CompiledTreeEnsemble.from_booster(booster),
+        recipe=recipe,
+        series=series,
+        history=history,
+        cutoff=cutoff,
+        booster_model=booster.model_to_string(),
+    )
+
+
+def _get_window_features(transformers: List) -> tuple:
+    """Map the names of the WindowSummarizer features to their recipe."""
+
+    if len(transformers) != 1:
+        raise ValueError("Only a single WindowSummarizer can be compiled.")
+
+    window_summarizer = transformers[0]
+    if window_summarizer.truncate == "bfill":
+        raise ValueError("Backfilled window features can't be compiled.")
+
+    target = window_summarizer._target_cols[0]
+    window_features = {}
+    for _, row in window_summarizer._func_dict.iterrows():
+        summarizer = row["summarizer"]
+        lag, window = (int(v) for v in row["window"])
+        if summarizer == "lag":
+            name = f"{target}_lag_{lag}"
+            window_features[name] = {"kind": "lag", "lag": lag}
+        else:
+            if not isinstance(summarizer, str) or not re.fullmatch(
+                r"[a-z]+", summarizer
+            ):
+                raise ValueError(f"Can't compile the summarizer {summarizer}.")
+            name = f"{target}_{summarizer}_{lag}_{window}"
+            window_features[name] = {
+                "kind": "window",
+                "summarizer": summarizer,
+                "lag": lag,
+                "window": window,
+            }
+
+    return target, window_features
@@ -1 +1 @@
-from training_pipeline.configs import gridsearch
+from training_pipeline.configs import gridsearch, multi_fidelity
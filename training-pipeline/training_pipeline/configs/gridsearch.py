@@ -1,11 +1,14 @@
 # NOTE: In a production environment, we would move this to a YAML file and load it from there.
-#       Also, we would use random or bayesian search + early stopping to speed up the process.
+#       Also, we would use random or bayesian search to speed up the process.
+# NOTE: Every fit is early stopped on its last 24 hours, therefore n_estimators is only the maximum number of trees.
+#       It isn't searched, as the grid points that differ only by a cap above the best iteration are identical fits.
 sweep_configs = {
     "method": "grid",
     "metric": {"name": "validation.MAPE", "goal": "minimize"},
     "parameters": {
-        "forecaster__estimator__n_jobs": {"values": [-1]},
-        "forecaster__estimator__n_estimators": {"values": [1000, 2000, 2500]},
+        "forecaster__estimator__n_estimators": {"values": [2500]},
+        "forecaster__estimator__early_stopping_rounds": {"values": [50]},
+        "forecaster__estimator__validation_size": {"values": [24]},
         "forecaster__estimator__learning_rate": {"values": [0.1, 0.15]},
         "forecaster__estimator__max_depth": {"values": [-1, 5]},
         "forecaster__estimator__reg_lambda": {"values": [0, 0.01, 0.015]},
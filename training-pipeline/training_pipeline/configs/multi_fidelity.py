@@ -0,0 +1,20 @@
+from training_pipeline.configs import gridsearch
+
+# NOTE: The search space is the same as the one of the grid search.
+#       The cheap rungs evaluate the configs on fewer CV folds, a shorter history and fewer trees.
+#       Only the best 1 / eta configs of every rung are promoted to the next one. The last rung is the full evaluation.
+#       The hyperband brackets propose 8 + ceil(8 / eta) + ceil(8 / eta ** 2) = 12 configs, i.e. the whole grid.
+search_configs = {
+    "method": "hyperband",
+    "proposer": "bayes",
+    "seed": 42,
+    "n_configs": 8,
+    "eta": 3,
+    "metric": {"name": "validation.MAPE", "goal": "minimize"},
+    "rungs": [
+        {"k": 1, "history_fraction": 0.5, "max_n_estimators": 500},
+        {"k": 2, "history_fraction": 0.75, "max_n_estimators": 1000},
+        {"k": 3, "history_fraction": 1.0, "max_n_estimators": None},
+    ],
+    "parameters": gridsearch.sweep_configs["parameters"],
+}
@@ -5,8 +5,9 @@ import wandb
 
 from sktime.forecasting.model_selection import temporal_train_test_split
 
+from training_pipeline import profiling
 from training_pipeline.utils import init_wandb_run
-from training_pipeline.settings import SETTINGS
+from training_pipeline.settings import SETTINGS, PRECISION
 
 
 def load_dataset_from_feature_store(
@@ -34,9 +35,10 @@ def load_dataset_from_feature_store(
         feature_view = fs.get_feature_view(
             name="energy_consumption_denmark_view", version=feature_view_version
         )
-        data, _ = feature_view.get_training_data(
-            training_dataset_version=training_dataset_version
-        )
+        with profiling.get_profiler().stage("load"):
+            data, _ = feature_view.get_training_data(
+                training_dataset_version=training_dataset_version
+            )
 
         fv_metadata = feature_view.to_dict()
         fv_metadata["query"] = fv_metadata["query"].to_string()
@@ -61,7 +63,8 @@ def load_dataset_from_feature_store(
     ) as run:
         run.use_artifact("energy_consumption_denmark_feature_view:latest")
 
-        y_train, y_test, X_train, X_test = prepare_data(data, fh=fh)
+        with profiling.get_profiler().stage("split"):
+            y_train, y_test, X_train, X_test = prepare_data(data, fh=fh)
 
         for split in ["train", "test"]:
             split_X = locals()[f"X_{split}"]
@@ -91,13 +94,16 @@ def load_dataset_from_feature_store(
 
 
 def prepare_data(
-    data: pd.DataFrame, target: str = "energy_consumption", fh: int = 24
+    data: pd.DataFrame,
+    target: str = "energy_consumption",
+    fh: int = 24,
+    precision: str = PRECISION,
 ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
     Structure the data for training:
     - Set the index as is required by sktime.
     - Prepare exogenous variables.
-    - Prepare the time series to be forecasted.
+    - Prepare the time series to be forecasted in the given floating point precision.
     - Split the data into train and test sets.
     """
 
@@ -108,7 +114,7 @@ def prepare_data(
     # Prepare exogenous variables.
     X = data.drop(columns=[target])
     # Prepare the time series to be forecasted.
-    y = data[[target]]
+    y = data[[target]].astype(precision)
 
     y_train, y_test, X_train, X_test = temporal_train_test_split(y, X, test_size=fh)
 
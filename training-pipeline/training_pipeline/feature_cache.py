@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Union
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from training_pipeline import utils
+from training_pipeline.settings import SETTINGS
+
+
+logger = utils.get_logger(__name__)
+
+
+class FeatureCache:
+    """
+    Memoizes feature matrices computed from a time series with an in-memory LRU and an optional on-disk spill.
+
+    Entries are keyed by (data hash, window config, cutoff). Because the lag & window features are causal,
+    the features of a longer history are valid for any prefix of it. Thus, a lookup that misses the exact key
+    is served as a slice of a cached entry whose source data contains the requested data.
+
+    Args:
+        max_items: Maximum number of entries kept in memory.
+        spill_dir: If set, every entry is also persisted to this directory, so evicted entries
+            and entries computed by other processes can be reused.
+    """
+
+    def __init__(
+        self, max_items: int = 8, spill_dir: Optional[Union[str, Path]] = None
+    ):
+        self.max_items = max_items
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        if self.spill_dir is not None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, data: pd.DataFrame, config: dict) -> Optional[pd.DataFrame]:
+        """
+        Get the features of the given data.
+
+        Args:
+            data: Time series the features are computed from.
+            config: Window config used to compute the features.
+
+        Returns: The cached features aligned with the index of data or None if they are not cached.
+        """
+
+        config_hash = hash_config(config)
+        key = build_key(data, config_hash)
+
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._load_from_disk(key)
+        if entry is not None:
+            self._touch(key, entry)
+            self.hits += 1
+
+            return entry["features"]
+
+        for candidate_key, candidate in self._iter_candidates(config_hash):
+            features = _slice_features(candidate, data)
+            if features is not None:
+                self._touch(candidate_key, candidate)
+                self.hits += 1
+
+                return features
+
+        self.misses += 1
+
+        return None
+
+    def put(self, data: pd.DataFrame, config: dict, features: pd.DataFrame):
+        """
+        Cache the features computed from the given data.
+
+        Args:
+            data: Time series the features are computed from.
+            config: Window config used to compute the features.
+            features: Features aligned with the index of data.
+        """
+
+        key = build_key(data, hash_config(config))
+        entry = {"source": data, "features": features}
+        self._touch(key, entry)
+
+        if self.spill_dir is not None:
+            path = self._get_spill_path(key)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            joblib.dump(entry, tmp_path)
+            os.replace(tmp_path, path)
+
+    def clear(self):
+        """Drop all the in-memory entries. The spilled entries are kept on disk."""
+
+        self._entries.clear()
+
+    def _touch(self, key: str, entry: dict):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_items:
+            self._entries.popitem(last=False)
+
+    def _iter_candidates(self, config_hash: str):
+        """Iterate over the entries computed with the same config, the longest histories first."""
+
+        candidates = {
+            key: entry
+            for key, entry in self._entries.items()
+            if key.startswith(config_hash)
+        }
+        if self.spill_dir is not None:
+            for path in self.spill_dir.glob(f"{config_hash}-*.joblib"):
+                if path.stem not in candidates:
+                    candidates[path.stem] = None
+
+        for key in sorted(candidates, key=_get_key_cutoff, reverse=True):
+            entry = candidates[key]
+            if entry is None:
+                entry = self._load_from_disk(key)
+            if entry is not None:
+                yield key, entry
+
+    def _load_from_disk(self, key: str) -> Optional[dict]:
+        if self.spill_dir is None:
+            return None
+
+        path = self._get_spill_path(key)
+        if not path.exists():
+            return None
+
+        try:
+            return joblib.load(path)
+        except Exception:
+            logger.warning(f"Could not load the spilled features from {path}.")
+
+            return None
+
+    def _get_spill_path(self, key: str) -> Path:
+        return self.spill_dir / f"{key}.joblib"
+
+
+def hash_config(config: dict) -> str:
+    """Hash a window config in a deterministic way."""
+
+    serialized_config = json.dumps(config, sort_keys=True, default=str)
+
+    return hashlib.sha1(serialized_config.encode()).hexdigest()[:16]
+
+
+def hash_dataframe(data: Union[pd.DataFrame, pd.Series]) -> str:
+    """Hash the content of a dataframe, including its index."""
+
+    hashed_rows = pd.util.hash_pandas_object(data, index=True).values
+
+    return hashlib.sha1(hashed_rows.tobytes()).hexdigest()[:16]
+
+
+def build_key(data: pd.DataFrame, config_hash: str) -> str:
+    """Build the cache key of the features computed from the given data and config."""
+
+    cutoff = data.index.get_level_values(-1).max()
+    if isinstance(cutoff, pd.Period):
+        cutoff = cutoff.ordinal
+
+    return f"{config_hash}-{hash_dataframe(data)}-{cutoff}"
+
+
+def _get_key_cutoff(key: str):
+    cutoff = key.rsplit("-", 1)[-1]
+    try:
+        return int(cutoff)
+    except ValueError:
+        return cutoff
+
+
+def _slice_features(entry: dict, data: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """Slice the cached features if data is contained in the cached source data, otherwise return None."""
+
+    source = entry["source"]
+    if len(source) < len(data) or not source.columns.equals(data.columns):
+        return None
+
+    positions = source.index.get_indexer(data.index)
+    if (positions == -1).any():
+        return None
+
+    source_values = source.to_numpy()[positions]
+    if not np.array_equal(source_values, data.to_numpy(), equal_nan=True):
+        return None
+
+    return entry["features"].iloc[positions]
+
+
+_FEATURE_CACHE = None
+
+
+def get_feature_cache() -> FeatureCache:
+    """Get the feature cache shared by the whole process. It is configured through the settings."""
+
+    global _FEATURE_CACHE
+
+    if _FEATURE_CACHE is None:
+        _FEATURE_CACHE = FeatureCache(
+            max_items=int(SETTINGS.get("FEATURE_CACHE_MAX_ITEMS", 8)),
+            spill_dir=SETTINGS.get("FEATURE_CACHE_DIR") or None,
+        )
+
+    return _FEATURE_CACHE
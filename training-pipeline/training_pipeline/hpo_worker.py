@@ -0,0 +1,65 @@
+from typing import Optional
+
+import fire
+
+from training_pipeline import budget, trial_queue, utils
+from training_pipeline.data import load_dataset_from_feature_store
+from training_pipeline.hyperparameter_tuning import run_queue_worker, split_cpu_budget
+
+
+logger = utils.get_logger(__name__)
+
+
+def work(
+    queue_name: Optional[str] = None,
+    cpu_budget: Optional[int] = None,
+    time_budget_s: Optional[float] = None,
+    trial_timeout_s: Optional[float] = None,
+) -> dict:
+    """Pull and run the trials of a hyperparameter optimization queue started with hyperparameter_tuning.run(method="queue").
+
+    Start it on any number of nodes that share the queue database (the HPO_QUEUE_PATH setting) to speed up the search.
+
+    Args:
+        queue_name (Optional[str], optional): Name of the queue. If none, the last created queue is used. Defaults to None.
+        cpu_budget (Optional[int], optional): Number of cores used by the worker.
+            If none, it is read from the HPO_CPU_BUDGET setting, which defaults to all the cores. Defaults to None.
+        time_budget_s (Optional[float], optional): Wall-clock budget of the worker.
+            If none, it is read from the HPO_TIME_BUDGET_S setting. Defaults to None.
+        trial_timeout_s (Optional[float], optional): Trials running longer than this are killed.
+            If none, it is read from the HPO_TRIAL_TIMEOUT_S setting. Defaults to None.
+
+    Returns:
+        dict: Dictionary containing metadata about the trials run by the worker.
+    """
+
+    queue = trial_queue.get_trial_queue()
+    if queue_name is None:
+        queue_name = queue.get_last_name()
+        if queue_name is None:
+            raise ValueError("No trial queue was created yet.")
+    queue_metadata = queue.get_metadata(queue_name)
+    logger.info(f"Working on {queue_name} with {queue_metadata=}")
+
+    y_train, _, X_train, _ = load_dataset_from_feature_store(
+        feature_view_version=queue_metadata["feature_view_version"],
+        training_dataset_version=queue_metadata["training_dataset_version"],
+        fh=queue_metadata["fh"],
+    )
+    _, n_jobs = split_cpu_budget(n_parallel_trials=1, cpu_budget=cpu_budget)
+    n_trials = run_queue_worker(
+        queue_name,
+        y_train,
+        X_train,
+        fh=queue_metadata["fh"],
+        n_jobs=n_jobs,
+        time_budget=budget.get_time_budget(
+            budget_s=time_budget_s, trial_timeout_s=trial_timeout_s
+        ),
+    )
+
+    return {"queue_name": queue_name, "n_trials": n_trials}
+
+
+if __name__ == "__main__":
+    fire.Fire(work)
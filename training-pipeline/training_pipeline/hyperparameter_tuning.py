@@ -1,20 +1,31 @@
+import os
+import time
 from functools import partial
-from typing import Optional
+from typing import Optional, Tuple
 
 import fire
 import numpy as np
 import pandas as pd
 import wandb
+from joblib import Parallel, delayed
 
 from matplotlib import pyplot as plt
-from sktime.forecasting.model_evaluation import evaluate as cv_evaluate
 from sktime.forecasting.model_selection import ExpandingWindowSplitter
-from sktime.performance_metrics.forecasting import MeanAbsolutePercentageError
 from sktime.utils.plotting import plot_windows
 
-from training_pipeline import utils
+from training_pipeline import (
+    budget,
+    regressors,
+    search,
+    transformers,
+    trial_cache,
+    trial_queue,
+    utils,
+)
 from training_pipeline.configs import gridsearch as gridsearch_configs
+from training_pipeline.configs import multi_fidelity as multi_fidelity_configs
 from training_pipeline.data import load_dataset_from_feature_store
+from training_pipeline.metrics import compute_metrics, compute_slice_metrics
 from training_pipeline.models import build_model
 from training_pipeline.utils import init_wandb_run
 from training_pipeline.settings import SETTINGS, OUTPUT_DIR
@@ -27,6 +38,11 @@ def run(
     fh: int = 24,
     feature_view_version: Optional[int] = None,
     training_dataset_version: Optional[int] = None,
+    n_parallel_trials: Optional[int] = None,
+    cpu_budget: Optional[int] = None,
+    method: Optional[str] = None,
+    time_budget_s: Optional[float] = None,
+    trial_timeout_s: Optional[float] = None,
 ) -> dict:
     """Run hyperparameter optimization search.
 
@@ -36,6 +52,19 @@ def run(
              If none, it will try to load the version from the cached feature_view_metadata.json file. Defaults to None.
         training_dataset_version (Optional[int], optional): feature store - feature view - training dataset version.
             If none, it will try to load the version from the cached feature_view_metadata.json file. Defaults to None.
+        n_parallel_trials (Optional[int], optional): Number of trials run concurrently in worker processes.
+            If none, it is read from the HPO_PARALLEL_TRIALS setting. Defaults to None.
+        cpu_budget (Optional[int], optional): Total number of cores shared by the concurrent trials.
+            If none, it is read from the HPO_CPU_BUDGET setting, which defaults to all the cores. Defaults to None.
+        method (Optional[str], optional): "grid" runs the W&B grid sweep. "successive_halving" or "hyperband" run the
+            multi-fidelity search configured in configs/multi_fidelity.py and store its best config in the metadata.
+            "queue" puts the grid in a trial queue that local workers and the workers of other nodes
+            (see hpo_worker.py) pull from, and stores its best config in the metadata.
+            If none, it is read from the HPO_METHOD setting, which defaults to "grid". Defaults to None.
+        time_budget_s (Optional[float], optional): Wall-clock budget of the whole search. No trial is started after it
+            runs out and the running ones are killed. If none, it is read from the HPO_TIME_BUDGET_S setting. Defaults to None.
+        trial_timeout_s (Optional[float], optional): Trials running longer than this are killed.
+            If none, it is read from the HPO_TRIAL_TIMEOUT_S setting. Defaults to None.
 
     Returns:
         dict: Dictionary containing metadata about the hyperparameter optimization run.
@@ -53,34 +82,201 @@ def run(
         fh=fh,
     )
 
-    sweep_id = run_hyperparameter_optimization(y_train, X_train, fh=fh)
+    time_budget = budget.get_time_budget(
+        budget_s=time_budget_s, trial_timeout_s=trial_timeout_s
+    )
+    method = method or SETTINGS.get("HPO_METHOD", "grid")
+    if method == "grid":
+        sweep_id, cut_trials = run_hyperparameter_optimization(
+            y_train,
+            X_train,
+            fh=fh,
+            n_parallel_trials=n_parallel_trials,
+            cpu_budget=cpu_budget,
+            time_budget=time_budget,
+        )
+        metadata = {"sweep_id": sweep_id, "cut_trials": cut_trials}
+    elif method == "queue":
+        # NOTE: The queue search doesn't run a W&B sweep. best_config.upload() reads its best config from the metadata.
+        metadata = run_queue_search(
+            y_train,
+            X_train,
+            fh=fh,
+            n_parallel_trials=n_parallel_trials,
+            cpu_budget=cpu_budget,
+            time_budget=time_budget,
+            dataset_metadata={
+                "feature_view_version": feature_view_version,
+                "training_dataset_version": training_dataset_version,
+            },
+        )
+        metadata["sweep_id"] = None
+    else:
+        # NOTE: The multi-fidelity search doesn't run a W&B sweep. best_config.upload() reads its best config from the metadata.
+        metadata = run_multi_fidelity_search(
+            y_train,
+            X_train,
+            fh=fh,
+            method=method,
+            n_parallel_trials=n_parallel_trials,
+            cpu_budget=cpu_budget,
+            time_budget=time_budget,
+        )
+        metadata["sweep_id"] = None
+    time_budget.close()
 
-    metadata = {"sweep_id": sweep_id}
     utils.save_json(metadata, file_name="last_sweep_metadata.json")
 
     return metadata
 
 
 def run_hyperparameter_optimization(
-    y_train: pd.DataFrame, X_train: pd.DataFrame, fh: int
-):
-    """Runs hyperparameter optimization search using W&B sweeps."""
+    y_train: pd.DataFrame,
+    X_train: pd.DataFrame,
+    fh: int,
+    n_parallel_trials: Optional[int] = None,
+    cpu_budget: Optional[int] = None,
+    time_budget: Optional[budget.TimeBudget] = None,
+) -> Tuple[str, list]:
+    """Runs hyperparameter optimization search using W&B sweeps.
+
+    The trials are run by n_parallel_trials W&B agents in worker processes, which pull the trials of the same sweep.
+    The CPU budget is split evenly between them through the number of LightGBM threads of every trial.
+
+    The best config is the one of the best finished trial, which best_config.upload() reads from the sweep.
+
+    Returns: The sweep id and the trials cut short by the time budget.
+    """
 
+    time_budget = time_budget or budget.TimeBudget()
+    n_parallel_trials, n_jobs = split_cpu_budget(
+        n_parallel_trials=n_parallel_trials, cpu_budget=cpu_budget
+    )
     sweep_id = wandb.sweep(
         sweep=gridsearch_configs.sweep_configs, project=SETTINGS["WANDB_PROJECT"]
     )
+    logger.info(
+        f"Running sweep {sweep_id} with {n_parallel_trials} parallel trials of {n_jobs} LightGBM threads each."
+    )
+
+    if n_parallel_trials == 1:
+        agents_trials = [
+            run_agent(
+                sweep_id,
+                y_train=y_train,
+                X_train=X_train,
+                fh=fh,
+                n_jobs=n_jobs,
+                time_budget=time_budget,
+            )
+        ]
+    else:
+        agents_trials = Parallel(n_jobs=n_parallel_trials)(
+            delayed(run_agent)(
+                sweep_id,
+                y_train=y_train,
+                X_train=X_train,
+                fh=fh,
+                n_jobs=n_jobs,
+                time_budget=time_budget,
+            )
+            for _ in range(n_parallel_trials)
+        )
+
+    trials = [trial for agent_trials in agents_trials for trial in agent_trials]
+    cut_trials = [trial for trial in trials if trial["status"] != "finished"]
+    if len(cut_trials) == len(trials):
+        raise RuntimeError(f"No trial of sweep {sweep_id} finished in time.")
+    if len(cut_trials) > 0:
+        logger.warning(
+            f"{len(cut_trials)}/{len(trials)} trials were cut short by the time budget."
+        )
+
+    return sweep_id, cut_trials
 
-    wandb.agent(
-        project=SETTINGS["WANDB_PROJECT"],
-        sweep_id=sweep_id,
-        function=partial(run_sweep, y_train=y_train, X_train=X_train, fh=fh),
+
+def split_cpu_budget(
+    n_parallel_trials: Optional[int] = None, cpu_budget: Optional[int] = None
+) -> Tuple[int, int]:
+    """Split the CPU budget between the concurrent trials, their parallel CV folds (the CV_N_JOBS setting)
+    and the LightGBM threads of every fold.
+
+    Returns: The number of parallel trials and the number of LightGBM threads per fold.
+    """
+
+    cpu_budget = cpu_budget or int(SETTINGS.get("HPO_CPU_BUDGET", os.cpu_count()))
+    n_parallel_trials = n_parallel_trials or int(SETTINGS.get("HPO_PARALLEL_TRIALS", 1))
+    n_parallel_trials = max(1, min(n_parallel_trials, cpu_budget))
+    cv_n_jobs = int(SETTINGS.get("CV_N_JOBS", 1))
+    n_jobs = max(1, cpu_budget // (n_parallel_trials * cv_n_jobs))
+
+    return n_parallel_trials, n_jobs
+
+
+def run_agent(
+    sweep_id: str,
+    y_train: pd.DataFrame,
+    X_train: pd.DataFrame,
+    fh: int,
+    n_jobs: int,
+    time_budget: Optional[budget.TimeBudget] = None,
+) -> list:
+    """Run a W&B agent that pulls and runs the trials of the sweep until it is finished or the time budget runs out.
+
+    Returns: The name, config & status of every trial run by the agent.
+    """
+
+    time_budget = time_budget or budget.TimeBudget()
+    trials = []
+    function = partial(
+        run_sweep,
+        y_train=y_train,
+        X_train=X_train,
+        fh=fh,
+        n_jobs=n_jobs,
+        time_budget=time_budget,
+        trials=trials,
     )
 
-    return sweep_id
+    if not time_budget.is_limited:
+        wandb.agent(
+            project=SETTINGS["WANDB_PROJECT"], sweep_id=sweep_id, function=function
+        )
+
+        return trials
+
+    # Pull the trials one by one to stop pulling as soon as the budget runs out.
+    while not time_budget.is_exhausted():
+        n_trials = len(trials)
+        wandb.agent(
+            project=SETTINGS["WANDB_PROJECT"],
+            sweep_id=sweep_id,
+            function=function,
+            count=1,
+        )
+        if len(trials) == n_trials:
+            # The sweep has no trials left.
+            break
+
+    return trials
+
+
+def run_sweep(
+    y_train: pd.DataFrame,
+    X_train: pd.DataFrame,
+    fh: int,
+    n_jobs: int = -1,
+    time_budget: Optional[budget.TimeBudget] = None,
+    trials: Optional[list] = None,
+):
+    """Runs a single hyperparameter optimization step (train + CV eval) using W&B sweeps.
 
+    With a limited time budget, the step runs in a child process that is killed when it times out.
+    The name, config & status of the step are appended to trials.
+    """
 
-def run_sweep(y_train: pd.DataFrame, X_train: pd.DataFrame, fh: int):
-    """Runs a single hyperparameter optimization step (train + CV eval) using W&B sweeps."""
+    time_budget = time_budget or budget.TimeBudget()
+    trials = trials if trials is not None else []
 
     with init_wandb_run(
         name="experiment", job_type="hpo", group="train", add_timestamp_to_name=True
@@ -89,10 +285,42 @@ def run_sweep(y_train: pd.DataFrame, X_train: pd.DataFrame, fh: int):
 
         config = wandb.config
         config = dict(config)
-        model = build_model(config)
+        # NOTE: The number of threads depends on the machine, therefore it is not part of the sweep config.
+        config["forecaster__estimator__n_jobs"] = n_jobs
+
+        if time_budget.is_exhausted():
+            logger.warning(f"Skipping trial {run.name}: the time budget ran out.")
+            trials.append({"name": run.name, "config": config, "status": "skipped"})
+            wandb.log({"status": "skipped"})
+            run.finish()
+
+            return
+
+        try:
+            results = time_budget.run(evaluate_config, config, y_train, X_train, fh=fh)
+        except budget.TrialTimeoutError as e:
+            logger.warning(f"Trial {run.name} was killed: {e}")
+            trials.append({"name": run.name, "config": config, "status": "timed_out"})
+            wandb.log({"status": "timed_out"})
+            run.finish()
 
-        model, results = train_model_cv(model, y_train, X_train, fh=fh)
+            return
+
+        trials.append({"name": run.name, "config": config, "status": "finished"})
         wandb.log(results)
+        if "best_iteration" in results["validation"]:
+            # Store the number of trees found by early stopping next to the config, so the best config can reuse it.
+            config["forecaster__estimator__best_iteration"] = results["validation"][
+                "best_iteration"
+            ]
+            run.config.update(
+                {
+                    "forecaster__estimator__best_iteration": config[
+                        "forecaster__estimator__best_iteration"
+                    ]
+                },
+                allow_val_change=True,
+            )
 
         metadata = {
             "experiment": {"name": run.name, "fh": fh},
@@ -109,10 +337,402 @@ def run_sweep(y_train: pd.DataFrame, X_train: pd.DataFrame, fh: int):
         run.finish()
 
 
+def run_multi_fidelity_search(
+    y_train: pd.DataFrame,
+    X_train: pd.DataFrame,
+    fh: int,
+    method: Optional[str] = None,
+    n_parallel_trials: Optional[int] = None,
+    cpu_budget: Optional[int] = None,
+    search_configs: Optional[dict] = None,
+    time_budget: Optional[budget.TimeBudget] = None,
+) -> dict:
+    """Runs a successive halving or hyperband search where the cheap rungs evaluate the configs on fewer CV folds,
+    a shorter history and fewer trees. Every evaluation is logged as a W&B run of the search group.
+
+    When the time budget runs out, the remaining evaluations are skipped and the best config found so far is returned:
+    the best one on the last rung or, if no config reached it, the best one on the highest rung reached.
+
+    Returns: The search id, the best config, its validation results and the trials cut short by the time budget.
+    """
+
+    time_budget = time_budget or budget.TimeBudget()
+    search_configs = search_configs or multi_fidelity_configs.search_configs
+    method = method or search_configs["method"]
+    if method not in search.METHODS:
+        raise ValueError(
+            f"Unknown search method {method}. Supported methods: {['grid', *search.METHODS]}"
+        )
+
+    n_parallel_trials, n_jobs = split_cpu_budget(
+        n_parallel_trials=n_parallel_trials, cpu_budget=cpu_budget
+    )
+    proposer = search.get_proposer(
+        search_configs["proposer"],
+        search_configs["parameters"],
+        seed=search_configs["seed"],
+    )
+    rungs = search_configs["rungs"]
+    search_id = f"{method}_{pd.Timestamp.now().strftime('%Y-%m-%d_%H-%M-%S')}"
+    logger.info(
+        f"Running search {search_id} with {n_parallel_trials} parallel trials of {n_jobs} LightGBM threads each."
+    )
+
+    evaluations = []
+
+    def evaluate(configs: list, rung: int) -> list:
+        if time_budget.is_exhausted():
+            rung_results = [{"status": "skipped"} for _ in configs]
+        else:
+            rung_results = Parallel(n_jobs=n_parallel_trials)(
+                delayed(run_trial)(
+                    config,
+                    y_train,
+                    X_train,
+                    fh=fh,
+                    fidelity=rungs[rung],
+                    n_jobs=n_jobs,
+                    search_id=search_id,
+                    time_budget=time_budget,
+                )
+                for config in configs
+            )
+        scores = [
+            get_score(results, search_configs["metric"])
+            if results["status"] == "finished"
+            else np.inf
+            for results in rung_results
+        ]
+        for config, results, score in zip(configs, rung_results, scores):
+            evaluations.append(
+                {"config": config, "rung": rung, "results": results, "score": score}
+            )
+
+        return scores
+
+    search.METHODS[method](
+        evaluate,
+        proposer,
+        n_configs=search_configs["n_configs"],
+        n_rungs=len(rungs),
+        eta=search_configs["eta"],
+    )
+
+    finished_evaluations = [
+        evaluation
+        for evaluation in evaluations
+        if evaluation["results"]["status"] == "finished"
+    ]
+    if len(finished_evaluations) == 0:
+        raise RuntimeError(f"No trial of search {search_id} finished in time.")
+    best_rung = max(evaluation["rung"] for evaluation in finished_evaluations)
+    if best_rung < len(rungs) - 1:
+        logger.warning(
+            f"No config reached the last rung within the time budget. Using the best config of rung {best_rung}."
+        )
+    best_evaluation = min(
+        (
+            evaluation
+            for evaluation in finished_evaluations
+            if evaluation["rung"] == best_rung
+        ),
+        key=lambda evaluation: evaluation["score"],
+    )
+    best_config = dict(best_evaluation["config"])
+    if "best_iteration" in best_evaluation["results"]["validation"]:
+        best_config["forecaster__estimator__best_iteration"] = best_evaluation[
+            "results"
+        ]["validation"]["best_iteration"]
+    cut_trials = [
+        {
+            "config": evaluation["config"],
+            "rung": evaluation["rung"],
+            "status": evaluation["results"]["status"],
+        }
+        for evaluation in evaluations
+        if evaluation["results"]["status"] != "finished"
+    ]
+    logger.info(
+        f"Search {search_id} evaluated {len(finished_evaluations)}/{len(evaluations)} trials, "
+        f"{len(cut_trials)} were cut short by the time budget."
+    )
+
+    return {
+        "search_id": search_id,
+        "n_trials": len(evaluations),
+        "best_config": best_config,
+        "best_rung": best_rung,
+        "best_results": best_evaluation["results"],
+        "cut_trials": cut_trials,
+    }
+
+
+def run_trial(
+    config: dict,
+    y_train: pd.DataFrame,
+    X_train: pd.DataFrame,
+    fh: int,
+    fidelity: dict,
+    n_jobs: int = -1,
+    search_id: Optional[str] = None,
+    time_budget: Optional[budget.TimeBudget] = None,
+) -> dict:
+    """Runs a single evaluation (train + CV eval) of the multi-fidelity search at the given fidelity.
+
+    Returns: The validation results and the status of the evaluation: "finished" or, if it was killed, "timed_out".
+    """
+
+    time_budget = time_budget or budget.TimeBudget()
+
+    with init_wandb_run(
+        name="experiment",
+        job_type="hpo",
+        group="train",
+        add_timestamp_to_name=True,
+        reinit=True,
+    ) as run:
+        run.use_artifact("split_train:latest")
+        run.config.update({**config, "fidelity": fidelity, "search_id": search_id})
+
+        trial_config = dict(config)
+        trial_config["forecaster__estimator__n_jobs"] = n_jobs
+        if fidelity.get("max_n_estimators") is not None:
+            trial_config["forecaster__estimator__n_estimators"] = min(
+                trial_config.get(
+                    "forecaster__estimator__n_estimators", fidelity["max_n_estimators"]
+                ),
+                fidelity["max_n_estimators"],
+            )
+        y, X = truncate_history(
+            y_train,
+            X_train,
+            fraction=fidelity.get("history_fraction", 1.0),
+            min_length=fh * 10,
+        )
+
+        try:
+            results = time_budget.run(
+                evaluate_config, trial_config, y, X, fh=fh, k=fidelity.get("k", 3)
+            )
+        except budget.TrialTimeoutError as e:
+            logger.warning(f"Trial {run.name} was killed: {e}")
+            results = {"status": "timed_out"}
+            wandb.log(results)
+        else:
+            wandb.log(results)
+            results = {**results, "status": "finished"}
+
+        run.finish()
+
+    return results
+
+
+def run_queue_search(
+    y_train: pd.DataFrame,
+    X_train: pd.DataFrame,
+    fh: int,
+    n_parallel_trials: Optional[int] = None,
+    cpu_budget: Optional[int] = None,
+    time_budget: Optional[budget.TimeBudget] = None,
+    dataset_metadata: Optional[dict] = None,
+) -> dict:
+    """Runs the grid search through a trial queue.
+
+    Every config of the grid is queued. The trials are pulled by n_parallel_trials local workers and by any number of
+    workers started on other nodes with hpo_worker.py. The function returns when every trial is finished or failed.
+
+    Returns: The queue name, the best config, its validation results and the trials that didn't finish.
+    """
+
+    time_budget = time_budget or budget.TimeBudget()
+    n_parallel_trials, n_jobs = split_cpu_budget(
+        n_parallel_trials=n_parallel_trials, cpu_budget=cpu_budget
+    )
+    queue = trial_queue.get_trial_queue()
+    queue_name = f"queue_{pd.Timestamp.now().strftime('%Y-%m-%d_%H-%M-%S')}"
+    configs = search.expand_grid(gridsearch_configs.sweep_configs["parameters"])
+    queue.create(queue_name, configs, metadata={"fh": fh, **(dataset_metadata or {})})
+    logger.info(
+        f"Queued {len(configs)} trials in {queue_name}. Running {n_parallel_trials} local workers "
+        f"of {n_jobs} LightGBM threads each."
+    )
+
+    Parallel(n_jobs=n_parallel_trials)(
+        delayed(run_queue_worker)(
+            queue_name,
+            y_train,
+            X_train,
+            fh=fh,
+            n_jobs=n_jobs,
+            time_budget=time_budget,
+        )
+        for _ in range(n_parallel_trials)
+    )
+
+    trials = queue.get_trials(queue_name)
+    finished_trials = trials[trials["status"] == "finished"]
+    if len(finished_trials) == 0:
+        raise RuntimeError(f"No trial of {queue_name} finished.")
+    metric = gridsearch_configs.sweep_configs["metric"]
+    scores = finished_trials["results"].map(lambda results: get_score(results, metric))
+    best_trial = finished_trials.loc[scores.idxmin()]
+    best_config = dict(best_trial["config"])
+    if "best_iteration" in best_trial["results"]["validation"]:
+        best_config["forecaster__estimator__best_iteration"] = best_trial["results"][
+            "validation"
+        ]["best_iteration"]
+
+    cut_trials = [
+        {"config": trial["config"], "status": trial["status"], "error": trial["error"]}
+        for _, trial in trials[trials["status"] != "finished"].iterrows()
+    ]
+    logger.info(
+        f"{len(finished_trials)}/{len(trials)} trials of {queue_name} finished on "
+        f"{trials['worker'].nunique()} workers."
+    )
+
+    return {
+        "queue_name": queue_name,
+        "n_trials": len(trials),
+        "best_config": best_config,
+        "best_results": best_trial["results"],
+        "cut_trials": cut_trials,
+    }
+
+
+def run_queue_worker(
+    queue_name: str,
+    y_train: pd.DataFrame,
+    X_train: pd.DataFrame,
+    fh: int,
+    n_jobs: int = -1,
+    time_budget: Optional[budget.TimeBudget] = None,
+    poll_interval_s: float = 10,
+) -> int:
+    """
+    Pull and run the trials of the queue until all of them are finished or failed, or the time budget runs out.
+
+    While the other workers are running the last trials, the worker keeps polling the queue to take over
+    the trials of the workers that crash.
+
+    Returns: The number of trials run by the worker.
+    """
+
+    time_budget = time_budget or budget.TimeBudget()
+    queue = trial_queue.get_trial_queue()
+    worker = trial_queue.get_worker_id()
+    fidelity = {"k": 3, "history_fraction": 1.0, "max_n_estimators": None}
+
+    n_trials = 0
+    while not time_budget.is_exhausted():
+        claimed_trial = queue.claim(queue_name, worker)
+        if claimed_trial is None:
+            if queue.is_done(queue_name):
+                break
+
+            time.sleep(poll_interval_s)
+            continue
+
+        trial_id, config = claimed_trial
+        try:
+            with trial_queue.Heartbeat(queue, trial_id, worker):
+                results = run_trial(
+                    config,
+                    y_train,
+                    X_train,
+                    fh=fh,
+                    fidelity=fidelity,
+                    n_jobs=n_jobs,
+                    search_id=queue_name,
+                    time_budget=time_budget,
+                )
+        except Exception as e:
+            logger.exception(f"Trial {trial_id} failed.")
+            queue.fail(trial_id, worker, error=repr(e))
+        else:
+            if results["status"] == "finished":
+                queue.complete(trial_id, worker, results=results)
+            else:
+                queue.fail(trial_id, worker, error=results["status"])
+        n_trials += 1
+
+    logger.info(f"Worker {worker} ran {n_trials} trials of {queue_name}.")
+
+    return n_trials
+
+
+def get_score(results: dict, metric: dict) -> float:
+    """Get the score of the results to minimize given a W&B-like metric specification."""
+
+    value = results
+    for key in metric["name"].split("."):
+        value = value[key]
+
+    return value if metric.get("goal", "minimize") == "minimize" else -value
+
+
+def truncate_history(
+    y: pd.DataFrame, X: pd.DataFrame, fraction: float, min_length: int
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Keep only the most recent fraction of the timepoints, but at least min_length of them."""
+
+    timepoints = y.index.get_level_values(-1).unique().sort_values()
+    length = max(min_length, int(len(timepoints) * fraction))
+    if length >= len(timepoints):
+        return y, X
+
+    start = timepoints[-length]
+    y = y[y.index.get_level_values(-1) >= start]
+    X = X[X.index.get_level_values(-1) >= start]
+
+    return y, X
+
+
+def evaluate_config(
+    config: dict, y_train: pd.DataFrame, X_train: pd.DataFrame, fh: int, k: int = 3
+) -> dict:
+    """Build the model of the config and evaluate it with cross-validation,
+    unless the results of the same trial are already stored in the trial cache."""
+
+    cache = trial_cache.get_trial_cache()
+    if cache is not None:
+        key = trial_cache.build_key(
+            config,
+            y_train,
+            X_train,
+            fh=fh,
+            cv_scheme={"splitter": "expanding_window", "strategy": "refit", "k": k},
+        )
+        results = cache.get(key)
+        if results is not None:
+            logger.info(
+                f"Loaded the trial results from the trial cache: {results['validation']}"
+            )
+
+            return results
+
+    model = build_model(dict(config), prebinned=True)
+    _, results = train_model_cv(model, y_train, X_train, fh=fh, k=k)
+
+    if cache is not None:
+        cache.put(key, config, results)
+
+    return results
+
+
 def train_model_cv(
-    model, y_train: pd.DataFrame, X_train: pd.DataFrame, fh: int, k: int = 3
+    model,
+    y_train: pd.DataFrame,
+    X_train: pd.DataFrame,
+    fh: int,
+    k: int = 3,
+    n_jobs: Optional[int] = None,
 ):
-    """Train and evaluate the given model using cross-validation."""
+    """Train and evaluate the given model using cross-validation.
+
+    The folds are independent, therefore they are fit in n_jobs worker processes. If None, n_jobs is read from
+    the CV_N_JOBS setting, which defaults to 1, i.e. the folds are fit one after another in the current process.
+    """
 
     data_length = len(y_train.index.get_level_values(-1).unique())
     assert data_length >= fh * 10, "Not enough data to perform a 3 fold CV."
@@ -122,37 +742,127 @@ def train_model_cv(
     cv = ExpandingWindowSplitter(
         step_length=cv_step_length, fh=np.arange(fh) + 1, initial_window=initial_window
     )
-    render_cv_scheme(cv, y_train)
-
-    results = cv_evaluate(
-        forecaster=model,
-        y=y_train,
-        X=X_train,
-        cv=cv,
-        strategy="refit",
-        scoring=MeanAbsolutePercentageError(symmetric=False),
-        error_score="raise",
-        return_data=False,
-    )
-
-    results = results.rename(
-        columns={
-            "test_MeanAbsolutePercentageError": "MAPE",
-            "fit_time": "fit_time",
-            "pred_time": "prediction_time",
-        }
-    )
-    mean_results = results[["MAPE", "fit_time", "prediction_time"]].mean(axis=0)
+    if wandb.run is not None:
+        # NOTE: The trials killed on timeout run in a child process without a W&B run.
+        render_cv_scheme(cv, y_train)
+    warm_feature_cache(model, y_train)
+
+    results = evaluate_folds(model, y_train, X_train, cv=cv, n_jobs=n_jobs)
+    best_iterations = [
+        best_iteration
+        for fold_best_iterations in results["best_iterations"]
+        for best_iteration in fold_best_iterations
+    ]
+    mean_results = results[
+        ["MAPE", "RMSPE", "worst_slice_MAPE", "fit_time", "prediction_time"]
+    ].mean(axis=0)
     mean_results = mean_results.to_dict()
+    if len(best_iterations) > 0:
+        # NOTE: Only the early stopped fits record their best iteration.
+        mean_results["best_iteration"] = int(round(np.mean(best_iterations)))
     results = {"validation": mean_results}
 
     logger.info(f"Validation MAPE: {results['validation']['MAPE']:.2f}")
+    logger.info(f"Validation RMSPE: {results['validation']['RMSPE']:.2f}")
     logger.info(f"Mean fit time: {results['validation']['fit_time']:.2f} s")
     logger.info(f"Mean predict time: {results['validation']['prediction_time']:.2f} s")
+    if "best_iteration" in results["validation"]:
+        logger.info(f"Mean best iteration: {results['validation']['best_iteration']}")
 
     return model, results
 
 
+def evaluate_folds(
+    model,
+    y_train: pd.DataFrame,
+    X_train: pd.DataFrame,
+    cv,
+    n_jobs: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Fit and evaluate a clone of the model on every fold of the CV scheme with the "refit" strategy.
+
+    With n_jobs > 1, the folds run in worker processes. The numeric arrays of the whole y_train & X_train are
+    memory-mapped by joblib and shared by all the folds instead of being pickled for every fold. Only the fold
+    positions are sent to the workers, which slice their data themselves.
+    NOTE: The in-memory feature cache is not shared with the workers. Set FEATURE_CACHE_DIR to share it through disk.
+
+    Returns: One row of metrics per fold, in the order of the folds.
+    """
+
+    n_jobs = n_jobs or int(SETTINGS.get("CV_N_JOBS", 1))
+    folds = list(cv.split(y_train))
+    if n_jobs == 1:
+        fold_results = [
+            evaluate_fold(model, y_train, X_train, train, test, fh=cv.fh)
+            for train, test in folds
+        ]
+    else:
+        fold_results = Parallel(n_jobs=min(n_jobs, len(folds)), mmap_mode="r")(
+            delayed(evaluate_fold)(model, y_train, X_train, train, test, fh=cv.fh)
+            for train, test in folds
+        )
+
+    return pd.DataFrame(fold_results)
+
+
+def evaluate_fold(
+    model,
+    y: pd.DataFrame,
+    X: pd.DataFrame,
+    train: np.ndarray,
+    test: np.ndarray,
+    fh,
+) -> dict:
+    """Fit a clone of the model on the train positions of y & X and evaluate it on the test positions."""
+
+    y_train, y_test = y.iloc[train], y.iloc[test]
+    # For X_test, select the train & test values, as sktime does, for the transformers that need the history.
+    X_train = X.iloc[train].sort_index()
+    X_test = X.iloc[np.append(train, test)].sort_index()
+
+    with regressors.record_best_iterations() as best_iterations:
+        start_fit = time.perf_counter()
+        forecaster = model.clone()
+        forecaster.fit(y_train, X=X_train, fh=fh)
+        fit_time = time.perf_counter() - start_fit
+
+    start_prediction = time.perf_counter()
+    y_pred = forecaster.predict(fh=fh, X=X_test)
+    prediction_time = time.perf_counter() - start_prediction
+
+    return {
+        **compute_fold_metrics(y_test, y_pred),
+        "fit_time": fit_time,
+        "prediction_time": prediction_time,
+        "len_train_window": len(y_train),
+        "cutoff": forecaster.cutoff[0],
+        "best_iterations": list(best_iterations),
+    }
+
+
+def compute_fold_metrics(y_test: pd.DataFrame, y_pred: pd.DataFrame) -> dict:
+    """Compute the MAPE, the RMSPE and the MAPE of the worst (area, consumer_type) slice of a CV fold."""
+
+    fold_metrics = compute_metrics(y_test, y_pred, metrics=["MAPE", "RMSPE"])
+    slices = compute_slice_metrics(
+        y_test, y_pred, by=["area", "consumer_type"], metrics=["MAPE"]
+    )
+    fold_metrics["worst_slice_MAPE"] = slices["MAPE"].max()
+
+    return fold_metrics
+
+
+def warm_feature_cache(model, y_train: pd.DataFrame):
+    """Compute the window features over the whole training set only once.
+    Every CV fold & HPO trial with the same window config will be served a slice of them from the feature cache.
+    """
+
+    for transformer in model.get_params().get("forecaster__transformers") or []:
+        if isinstance(transformer, transformers.CachedWindowSummarizer):
+            transformer.clone().fit_transform(y_train)
+
+
 def render_cv_scheme(cv, y_train: pd.DataFrame) -> str:
     """Render the CV scheme used for training and log it to W&B."""
 
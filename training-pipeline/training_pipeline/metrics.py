@@ -0,0 +1,146 @@
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+EPS = np.finfo(np.float64).eps
+
+# Every metric is defined by its per point error term and by the function that reduces the mean of the terms.
+METRICS: Dict[str, Tuple[Callable, Callable]] = {
+    "MAPE": (
+        lambda y_true, y_pred: np.abs(y_true - y_pred)
+        / np.maximum(np.abs(y_true), EPS),
+        lambda mean: mean,
+    ),
+    "RMSPE": (
+        lambda y_true, y_pred: ((y_true - y_pred) / np.maximum(np.abs(y_true), EPS))
+        ** 2,
+        np.sqrt,
+    ),
+    "SMAPE": (
+        lambda y_true, y_pred: 2
+        * np.abs(y_true - y_pred)
+        / np.maximum(np.abs(y_true) + np.abs(y_pred), EPS),
+        lambda mean: mean,
+    ),
+    "MAE": (lambda y_true, y_pred: np.abs(y_true - y_pred), lambda mean: mean),
+    "RMSE": (lambda y_true, y_pred: (y_true - y_pred) ** 2, np.sqrt),
+    "bias": (lambda y_true, y_pred: y_pred - y_true, lambda mean: mean),
+}
+DEFAULT_METRICS = ("RMSPE", "MAPE")
+
+
+def compute_metrics(
+    y_true: Union[pd.DataFrame, pd.Series],
+    y_pred: Union[pd.DataFrame, pd.Series],
+    metrics: Sequence[str] = DEFAULT_METRICS,
+) -> Dict[str, float]:
+    """
+    Compute the given metrics over all the data points. They match the sktime metrics with symmetric=False.
+
+    Args:
+        y_true: Ground truth indexed the same way as y_pred.
+        y_pred: Predictions.
+        metrics: Names of the metrics to compute. See METRICS for the supported ones.
+
+    Returns: Dictionary mapping every metric to its value.
+    """
+
+    y_true_values, y_pred_values = _align(y_true, y_pred)
+    results = {}
+    for name in metrics:
+        error, reduce = _get_metric(name)
+        results[name] = float(reduce(error(y_true_values, y_pred_values).mean()))
+
+    return results
+
+
+def compute_slice_metrics(
+    y_true: Union[pd.DataFrame, pd.Series],
+    y_pred: Union[pd.DataFrame, pd.Series],
+    by: Sequence[str] = ("area", "consumer_type"),
+    metrics: Sequence[str] = DEFAULT_METRICS,
+) -> pd.DataFrame:
+    """
+    Compute the given metrics for every slice of the data in a single vectorized pass.
+
+    Args:
+        y_true: Ground truth indexed the same way as y_pred.
+        y_pred: Predictions.
+        by: Index levels that define the slices.
+        metrics: Names of the metrics to compute. See METRICS for the supported ones.
+
+    Returns: Dataframe with one row per slice, sorted by the slice keys, with the by columns followed by the metrics.
+    """
+
+    by = list(by)
+    y_true_values, y_pred_values = _align(y_true, y_pred)
+    codes, slices = _factorize_levels(y_true.index, by)
+    counts = np.bincount(codes, minlength=len(slices))
+
+    for name in metrics:
+        error, reduce = _get_metric(name)
+        sums = np.bincount(
+            codes,
+            weights=error(y_true_values, y_pred_values),
+            minlength=len(slices),
+        )
+        slices[name] = reduce(sums / counts)
+
+    return slices
+
+
+def _factorize_levels(
+    index: pd.Index, by: List[str]
+) -> Tuple[np.ndarray, pd.DataFrame]:
+    """Map every row of the index to the code of its slice.
+
+    Returns: The slice code of every row and the sorted slice keys as a dataframe.
+    """
+
+    level_codes = []
+    level_uniques = []
+    for name in by:
+        codes, uniques = pd.factorize(index.get_level_values(name), sort=True)
+        level_codes.append(codes)
+        level_uniques.append(uniques)
+
+    shape = tuple(len(uniques) for uniques in level_uniques)
+    flat_codes = np.ravel_multi_index(level_codes, shape)
+    flat_slices, codes = np.unique(flat_codes, return_inverse=True)
+    slice_codes = np.unravel_index(flat_slices, shape)
+    slices = pd.DataFrame(
+        {
+            name: uniques[codes_]
+            for name, uniques, codes_ in zip(by, level_uniques, slice_codes)
+        }
+    )
+
+    return codes, slices
+
+
+def _get_metric(name: str) -> Tuple[Callable, Callable]:
+    metric = METRICS.get(name)
+    if metric is None:
+        raise ValueError(f"Unknown metric {name}. Supported metrics: {list(METRICS)}")
+
+    return metric
+
+
+def _align(
+    y_true: Union[pd.DataFrame, pd.Series], y_pred: Union[pd.DataFrame, pd.Series]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Align the predictions to the index of the ground truth and return both as flat float64 arrays."""
+
+    if isinstance(y_true, pd.DataFrame):
+        y_true = y_true.iloc[:, 0]
+    if isinstance(y_pred, pd.DataFrame):
+        y_pred = y_pred.iloc[:, 0]
+    if not y_pred.index.equals(y_true.index):
+        y_pred = y_pred.reindex(y_true.index)
+
+    return (
+        y_true.to_numpy(dtype=np.float64),
+        y_pred.to_numpy(dtype=np.float64),
+    )
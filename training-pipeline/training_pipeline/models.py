@@ -1,14 +1,24 @@
+import os
+from typing import Dict, Hashable, Optional, Union
+
 import lightgbm as lgb
+from joblib import effective_n_jobs
 
 from sktime.forecasting.compose import make_reduction, ForecastingPipeline
 from sktime.forecasting.naive import NaiveForecaster
 from sktime.transformations.series.date import DateTimeFeatures
-from sktime.transformations.series.summarize import WindowSummarizer
 
-from training_pipeline import transformers
+from training_pipeline import regressors, sharding, transformers
+from training_pipeline.settings import PRECISION
 
 
-def build_model(config: dict):
+def build_model(
+    config: dict,
+    shard_by: Optional[Union[str, Dict[tuple, Hashable]]] = None,
+    n_jobs: int = -1,
+    precision: str = PRECISION,
+    prebinned: bool = False,
+):
     """
     Build an Sktime model using the given config.
 
@@ -16,8 +26,29 @@ def build_model(config: dict):
     - lag: list(range(1, 72 + 1))
     - mean: [[1, 24], [1, 48], [1, 72]]
     - std: [[1, 24], [1, 48], [1, 72]]
+
+    If shard_by is given, one model is trained per group of series in parallel worker processes
+    (see sharding.ShardedForecaster for the supported groupings), otherwise a single global model is trained.
+    n_jobs is the number of worker processes used for sharded training. The LightGBM threads of every shard
+    are lowered to max(1, cpu_count // n_jobs) to not oversubscribe the cores.
+    With precision="float32" the exogenous variables and the window features are kept in float32 end-to-end,
+    which halves the memory of the feature matrix passed to LightGBM.
+    If the config contains the best iteration found by early stopping during the hyperparameter optimization,
+    the model is built with that many trees and without early stopping, as it is refit on all the data.
+    With prebinned=True the regressor is a regressors.PrebinnedLGBMRegressor, which reuses the binned LightGBM
+    dataset between fits and supports early stopping. It mirrors the internals of LGBMModel.fit() of lightgbm 3.3.x,
+    so it is only used by the hyperparameter optimization, where many fits share the same data. The models that
+    are published are always built with the stock lightgbm.LGBMRegressor.
     """
 
+    best_iteration = config.pop("forecaster__estimator__best_iteration", None)
+    if best_iteration is not None:
+        config["forecaster__estimator__n_estimators"] = int(best_iteration)
+    if best_iteration is not None or not prebinned:
+        # Early stopping is implemented only by the prebinned regressor.
+        config.pop("forecaster__estimator__early_stopping_rounds", None)
+        config.pop("forecaster__estimator__validation_size", None)
+
     lag = config.pop(
         "forecaster_transformers__window_summarizer__lag_feature__lag",
         list(range(1, 72 + 1)),
@@ -30,13 +61,19 @@ def build_model(config: dict):
         "forecaster_transformers__window_summarizer__lag_feature__std",
         [[1, 24], [1, 48], [1, 72]],
     )
-    n_jobs = config.pop("forecaster_transformers__window_summarizer__n_jobs", 1)
-    window_summarizer = WindowSummarizer(
+    window_summarizer_n_jobs = config.pop(
+        "forecaster_transformers__window_summarizer__n_jobs", 1
+    )
+    window_summarizer = transformers.CachedWindowSummarizer(
         **{"lag_feature": {"lag": lag, "mean": mean, "std": std}},
-        n_jobs=n_jobs,
+        n_jobs=window_summarizer_n_jobs,
+        dtype=precision if precision != "float64" else None,
     )
 
-    regressor = lgb.LGBMRegressor()
+    if prebinned:
+        regressor = regressors.PrebinnedLGBMRegressor()
+    else:
+        regressor = lgb.LGBMRegressor()
     forecaster = make_reduction(
         regressor,
         transformers=[window_summarizer],
@@ -45,21 +82,30 @@ def build_model(config: dict):
         window_length=None,
     )
 
-    pipe = ForecastingPipeline(
-        steps=[
-            ("attach_area_and_consumer_type", transformers.AttachAreaConsumerType()),
-            (
-                "daily_season",
-                DateTimeFeatures(
-                    manual_selection=["day_of_week", "hour_of_day"],
-                    keep_original_columns=True,
-                ),
+    steps = [
+        ("attach_area_and_consumer_type", transformers.AttachAreaConsumerType()),
+        (
+            "daily_season",
+            DateTimeFeatures(
+                manual_selection=["day_of_week", "hour_of_day"],
+                keep_original_columns=True,
             ),
-            ("forecaster", forecaster),
-        ]
-    )
+        ),
+    ]
+    if precision != "float64":
+        steps.append(("cast_exogenous", transformers.CastColumns(dtype=precision)))
+    steps.append(("forecaster", forecaster))
+    pipe = ForecastingPipeline(steps=steps)
     pipe = pipe.set_params(**config)
 
+    if shard_by is not None:
+        n_shard_workers = effective_n_jobs(n_jobs)
+        pipe = pipe.set_params(
+            forecaster__estimator__n_jobs=max(1, os.cpu_count() // n_shard_workers)
+        )
+
+        return sharding.ShardedForecaster(pipe, group_by=shard_by, n_jobs=n_jobs)
+
     return pipe
 
 
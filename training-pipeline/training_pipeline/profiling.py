@@ -0,0 +1,209 @@
+import functools
+import resource
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+import wandb
+
+from training_pipeline import utils
+from training_pipeline.settings import SETTINGS, OUTPUT_DIR
+
+
+logger = utils.get_logger(__name__)
+
+
+class StageProfiler:
+    """
+    Records the wall time, the CPU time and the peak RSS of every stage of a run.
+
+    Use stage() as a context manager or track() as a decorator. Every call is recorded in execution order.
+    NOTE: Don't nest the stages, as every stage resets the peak RSS.
+
+    Args:
+        regression_threshold: Relative wall time increase, compared to the previous profile,
+            above which a stage is reported as a regression.
+        min_wall_time_s: Stages faster than this are never reported as regressions, as their timings are too noisy.
+    """
+
+    def __init__(self, regression_threshold: float = 0.2, min_wall_time_s: float = 1.0):
+        self.regression_threshold = regression_threshold
+        self.min_wall_time_s = min_wall_time_s
+
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name: str):
+        _reset_peak_rss()
+        start_wall_time = time.perf_counter()
+        start_cpu_time = _get_cpu_time()
+        try:
+            yield
+        finally:
+            self.stages.append(
+                {
+                    "stage": name,
+                    "wall_time_s": time.perf_counter() - start_wall_time,
+                    "cpu_time_s": _get_cpu_time() - start_cpu_time,
+                    "peak_rss_mb": _get_peak_rss_mb(),
+                }
+            )
+            logger.info(
+                f"Stage {name} took {self.stages[-1]['wall_time_s']:.2f} s wall time, "
+                f"{self.stages[-1]['cpu_time_s']:.2f} s CPU time "
+                f"with a peak RSS of {self.stages[-1]['peak_rss_mb']:.0f} MB."
+            )
+
+    def track(self, name: Optional[str] = None):
+        """Decorator that records every call of the decorated function as a stage."""
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name or func.__name__):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def reset(self):
+        self.stages = []
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            self.stages,
+            columns=["stage", "wall_time_s", "cpu_time_s", "peak_rss_mb"],
+        )
+
+    def compare(self, previous_profile: Optional[dict]) -> list:
+        """
+        Compare the wall time of the stages with the ones of a previous profile.
+
+        Returns: The stages whose wall time increased by more than the regression threshold.
+        """
+
+        if previous_profile is None:
+            return []
+
+        previous_wall_times = {
+            stage["stage"]: stage["wall_time_s"] for stage in previous_profile["stages"]
+        }
+        regressions = []
+        for stage in self.stages:
+            previous_wall_time = previous_wall_times.get(stage["stage"])
+            if not previous_wall_time or stage["wall_time_s"] < self.min_wall_time_s:
+                continue
+
+            relative_change = stage["wall_time_s"] / previous_wall_time - 1
+            if relative_change > self.regression_threshold:
+                regressions.append(
+                    {
+                        "stage": stage["stage"],
+                        "wall_time_s": stage["wall_time_s"],
+                        "previous_wall_time_s": previous_wall_time,
+                        "relative_change": relative_change,
+                    }
+                )
+
+        return regressions
+
+    def save(
+        self, file_name: str = "train_profile.json", save_dir: Path = OUTPUT_DIR
+    ) -> dict:
+        """
+        Save the profile as JSON, next to the regressions compared to the previously saved profile.
+
+        Returns: The saved profile.
+        """
+
+        previous_profile = None
+        if (Path(save_dir) / file_name).exists():
+            previous_profile = utils.load_json(file_name, save_dir=save_dir)
+
+        regressions = self.compare(previous_profile)
+        for regression in regressions:
+            logger.warning(
+                f"Stage {regression['stage']} regressed by {regression['relative_change']:.0%}: "
+                f"{regression['previous_wall_time_s']:.2f} s -> {regression['wall_time_s']:.2f} s."
+            )
+
+        profile = {
+            "stages": self.stages,
+            "total_wall_time_s": sum(stage["wall_time_s"] for stage in self.stages),
+            "regressions": regressions,
+        }
+        utils.save_json(profile, file_name=file_name, save_dir=save_dir)
+
+        return profile
+
+    def log_to_wandb(self, prefix: str = "profile"):
+        """Log the stages recorded so far to the active wandb run."""
+
+        wandb.log(
+            {
+                prefix: {
+                    stage["stage"]: {k: v for k, v in stage.items() if k != "stage"}
+                    for stage in self.stages
+                },
+                f"{prefix}.stages": wandb.Table(dataframe=self.to_dataframe()),
+            }
+        )
+
+
+def _get_cpu_time() -> float:
+    """CPU time of the current process and of its terminated child processes."""
+
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    return (
+        self_usage.ru_utime
+        + self_usage.ru_stime
+        + children_usage.ru_utime
+        + children_usage.ru_stime
+    )
+
+
+def _reset_peak_rss():
+    """Reset the peak RSS of the process on Linux. Elsewhere, the peak RSS is measured since the process started."""
+
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _get_peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    # NOTE: ru_maxrss is in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+_PROFILER = None
+
+
+def get_profiler() -> StageProfiler:
+    """Get the stage profiler shared by the whole process. It is configured through the settings."""
+
+    global _PROFILER
+
+    if _PROFILER is None:
+        _PROFILER = StageProfiler(
+            regression_threshold=float(
+                SETTINGS.get("PROFILE_REGRESSION_THRESHOLD", 0.2)
+            ),
+            min_wall_time_s=float(SETTINGS.get("PROFILE_MIN_WALL_TIME_S", 1.0)),
+        )
+
+    return _PROFILER
@@ -0,0 +1,236 @@
+import hashlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+from training_pipeline import feature_cache
+from training_pipeline.settings import SETTINGS
+
+
+# Parameters that are used only by the boosting process. Changing them doesn't change how the features are binned.
+BOOSTING_ONLY_PARAMS = {
+    "boosting_type",
+    "class_weight",
+    "colsample_bytree",
+    "early_stopping_round",
+    "early_stopping_rounds",
+    "importance_type",
+    "learning_rate",
+    "max_depth",
+    "metric",
+    "min_child_weight",
+    "min_split_gain",
+    "n_estimators",
+    "n_jobs",
+    "num_leaves",
+    "objective",
+    "reg_alpha",
+    "reg_lambda",
+    "silent",
+    "subsample",
+    "subsample_freq",
+    "verbose",
+}
+
+
+# Number of the most recent timepoints held out as validation set when early stopping is enabled.
+DEFAULT_VALIDATION_SIZE = 24
+
+
+class DatasetCache:
+    """In-memory LRU of constructed (binned) LightGBM datasets."""
+
+    def __init__(self, max_items: int = 4):
+        self.max_items = max_items
+
+        self._datasets = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[lgb.Dataset]:
+        dataset = self._datasets.get(key)
+        if dataset is None:
+            self.misses += 1
+
+            return None
+
+        self._datasets.move_to_end(key)
+        self.hits += 1
+
+        return dataset
+
+    def put(self, key: str, dataset: lgb.Dataset):
+        if self.max_items <= 0:
+            return
+
+        self._datasets[key] = dataset
+        self._datasets.move_to_end(key)
+        while len(self._datasets) > self.max_items:
+            self._datasets.popitem(last=False)
+
+    def clear(self):
+        self._datasets.clear()
+
+
+_DATASET_CACHE = None
+
+
+def get_dataset_cache() -> DatasetCache:
+    """Get the LightGBM dataset cache shared by the whole process. It is configured through the settings."""
+
+    global _DATASET_CACHE
+
+    if _DATASET_CACHE is None:
+        _DATASET_CACHE = DatasetCache(
+            max_items=int(SETTINGS.get("LGBM_DATASET_CACHE_MAX_ITEMS", 4))
+        )
+
+    return _DATASET_CACHE
+
+
+class PrebinnedLGBMRegressor(lgb.LGBMRegressor):
+    """
+    LGBMRegressor that reuses the binned training dataset between fits.
+
+    The lgb.Dataset of a (X, y) pair is constructed only once and reused by every fit on the same data
+    whose parameters don't change the binning (e.g. every HPO trial on a given CV fold).
+    Fits with extra arguments (weights, eval sets, init models, etc.) fall back to the default behaviour.
+
+    Early stopping is enabled by setting the early_stopping_rounds parameter. Then, the last validation_size
+    timepoints of X (default DEFAULT_VALIDATION_SIZE) are held out as validation set and n_estimators becomes
+    the maximum number of trees. The predictions use the best iteration.
+
+    NOTE: It sets the private attributes of LGBMModel the same way as LGBMModel.fit() of lightgbm 3.3.x does.
+    Because of that coupling, it is only used by the hyperparameter optimization (see models.build_model()).
+    tests/test_regressors.py checks that its predictions stay identical to the ones of lightgbm.LGBMRegressor.
+    """
+
+    def fit(self, X, y, **kwargs):
+        if len(kwargs) > 0 or callable(self.objective):
+            return super().fit(X, y, **kwargs)
+
+        params = self._get_train_params()
+        validation_size = params.pop("validation_size", DEFAULT_VALIDATION_SIZE)
+        early_stopping_rounds = params.pop(
+            "early_stopping_rounds", params.pop("early_stopping_round", None)
+        )
+
+        if early_stopping_rounds:
+            X, y, X_valid, y_valid = split_validation_tail(X, y, validation_size)
+        train_set = self._get_train_set(X, y, params)
+
+        valid_sets = []
+        callbacks = []
+        if early_stopping_rounds:
+            valid_sets.append(
+                lgb.Dataset(X_valid, label=y_valid, reference=train_set, params=params)
+            )
+            callbacks.append(lgb.early_stopping(early_stopping_rounds, verbose=False))
+
+        self._objective = params["objective"]
+        self._n_features = train_set.num_feature()
+        self._n_features_in = self._n_features
+
+        self._Booster = lgb.train(
+            params=params,
+            train_set=train_set,
+            num_boost_round=self.n_estimators,
+            valid_sets=valid_sets,
+            callbacks=callbacks,
+        )
+        self._evals_result = None
+        self._best_iteration = (
+            self._Booster.best_iteration if early_stopping_rounds else None
+        )
+        self._best_score = self._Booster.best_score
+        self.fitted_ = True
+
+        self._Booster.free_dataset()
+
+        if early_stopping_rounds and _BEST_ITERATIONS is not None:
+            _BEST_ITERATIONS.append(self._best_iteration)
+
+        return self
+
+    def _get_train_set(self, X, y, params: dict) -> lgb.Dataset:
+        dataset_params = {
+            k: v for k, v in params.items() if k not in BOOSTING_ONLY_PARAMS
+        }
+        key = _hash_dataset(X, y, dataset_params)
+
+        cache = get_dataset_cache()
+        train_set = cache.get(key)
+        if train_set is None:
+            train_set = lgb.Dataset(X, label=y, params=params).construct()
+            cache.put(key, train_set)
+
+        return train_set
+
+    def _get_train_params(self) -> dict:
+        """Map the sklearn parameters to the native LightGBM parameters the same way as LGBMModel.fit()."""
+
+        params = self.get_params()
+        for param in ["silent", "importance_type", "n_estimators", "class_weight"]:
+            params.pop(param, None)
+        if not any(
+            alias in params for alias in ["verbose", "verbosity", "verbose_eval"]
+        ):
+            params["verbose"] = -1
+        if isinstance(params["random_state"], np.random.RandomState):
+            params["random_state"] = params["random_state"].randint(
+                np.iinfo(np.int32).max
+            )
+        params["objective"] = self.objective or "regression"
+
+        return params
+
+
+def split_validation_tail(X: pd.DataFrame, y: np.ndarray, validation_size: int):
+    """Split the rows of the last validation_size timepoints of X from the rest of the rows."""
+
+    if not isinstance(X, pd.DataFrame) or not isinstance(X.index, pd.MultiIndex):
+        raise ValueError("Early stopping requires X indexed by (series, timepoint).")
+
+    timepoints = X.index.get_level_values(-1)
+    unique_timepoints = timepoints.unique().sort_values()
+    if len(unique_timepoints) <= validation_size:
+        raise ValueError(
+            f"Not enough timepoints to hold out {validation_size} of them for early stopping."
+        )
+
+    is_valid = timepoints >= unique_timepoints[-validation_size]
+    y = np.asarray(y)
+
+    return X[~is_valid], y[~is_valid], X[is_valid], y[is_valid]
+
+
+_BEST_ITERATIONS = None
+
+
+@contextmanager
+def record_best_iterations():
+    """Collect the best iteration of every early stopped fit of the process within the context."""
+
+    global _BEST_ITERATIONS
+
+    _BEST_ITERATIONS = []
+    try:
+        yield _BEST_ITERATIONS
+    finally:
+        _BEST_ITERATIONS = None
+
+
+def _hash_dataset(X, y, dataset_params: dict) -> str:
+    if isinstance(X, pd.DataFrame):
+        X_hash = feature_cache.hash_dataframe(X)
+        dataset_params = {**dataset_params, "feature_names": X.columns.tolist()}
+    else:
+        X_hash = hashlib.sha1(np.ascontiguousarray(X).tobytes()).hexdigest()
+    y_hash = hashlib.sha1(np.ascontiguousarray(y).tobytes()).hexdigest()
+    params_hash = feature_cache.hash_config(dataset_params)
+
+    return f"{params_hash}-{X_hash}-{y_hash[:16]}"
@@ -0,0 +1,171 @@
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, OrderedDict as OrderedDictType
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import wandb
+from joblib import Parallel, delayed
+from sktime.utils.plotting import plot_series
+
+from training_pipeline import utils
+from training_pipeline.settings import SETTINGS, OUTPUT_DIR
+
+
+logger = utils.get_logger(__name__)
+
+POLICIES = ("all", "worst", "random")
+
+
+def render(
+    timeseries: OrderedDictType[str, pd.DataFrame],
+    prefix: Optional[str] = None,
+    delete_from_disk: bool = True,
+    slices: Optional[pd.DataFrame] = None,
+    policy: Optional[str] = None,
+    k: Optional[int] = None,
+    n_jobs: Optional[int] = None,
+    upload_batch_size: Optional[int] = None,
+    seed: int = 42,
+):
+    """
+    Render the timeseries as a single plot per (area, consumer_type), save them to disk and upload them to wandb.
+
+    The plots are drawn in worker processes with the non-interactive Agg backend (set when the settings are imported)
+    and uploaded to wandb in batches. The parameters left to None are read from the settings.
+
+    Args:
+        timeseries: Mapping from the name of every split to its time series.
+        prefix: wandb key and output subdirectory of the plots.
+        delete_from_disk: Whether to delete the plots from disk after uploading them.
+        slices: Per slice metrics with the area, consumer_type & MAPE columns. Required by the "worst" policy.
+        policy: Which slices to render:
+            - "all": every slice;
+            - "worst": the k slices with the highest MAPE;
+            - "random": a random sample of k slices.
+        k: Number of slices rendered by the "worst" & "random" policies.
+        n_jobs: Number of worker processes.
+        upload_batch_size: Number of plots uploaded with a single wandb.log() call.
+        seed: Random seed of the "random" policy.
+    """
+
+    policy = policy or SETTINGS.get("RENDER_POLICY", "all")
+    k = k or int(SETTINGS.get("RENDER_TOP_K", 10))
+    n_jobs = n_jobs or int(SETTINGS.get("RENDER_N_JOBS", -1))
+    upload_batch_size = upload_batch_size or int(
+        SETTINGS.get("RENDER_UPLOAD_BATCH_SIZE", 50)
+    )
+
+    grouped_timeseries = group_timeseries(timeseries)
+    selected_groups = select_slices(
+        list(grouped_timeseries.keys()), policy=policy, k=k, slices=slices, seed=seed
+    )
+    logger.info(
+        f"Rendering {len(selected_groups)}/{len(grouped_timeseries)} slices with {policy=}."
+    )
+
+    output_dir = OUTPUT_DIR / prefix if prefix else OUTPUT_DIR
+    output_dir.mkdir(parents=True, exist_ok=True)
+    image_save_paths = Parallel(n_jobs=n_jobs)(
+        delayed(render_slice)(
+            group_name,
+            grouped_timeseries[group_name],
+            output_dir / f"{group_name[0]}_{group_name[1]}.png",
+        )
+        for group_name in selected_groups
+    )
+
+    for start in range(0, len(image_save_paths), upload_batch_size):
+        batch = image_save_paths[start : start + upload_batch_size]
+        images = [wandb.Image(image_save_path) for image_save_path in batch]
+        if prefix:
+            wandb.log({prefix: images})
+        else:
+            wandb.log({"images": images})
+
+        if delete_from_disk:
+            for image_save_path in batch:
+                os.remove(image_save_path)
+
+
+def group_timeseries(
+    timeseries: OrderedDictType[str, pd.DataFrame]
+) -> OrderedDictType[tuple, dict]:
+    """Group the splits of the timeseries by (area, consumer_type)."""
+
+    grouped_timeseries = OrderedDict()
+    for split, df in timeseries.items():
+        df = df.reset_index(level=[0, 1])
+        groups = df.groupby(["area", "consumer_type"])
+        for group_name, split_group_values in groups:
+            group_values = grouped_timeseries.get(group_name, {})
+
+            grouped_timeseries[group_name] = {
+                f"{split}": split_group_values["energy_consumption"],
+                **group_values,
+            }
+
+    return grouped_timeseries
+
+
+def select_slices(
+    group_names: List[tuple],
+    policy: str = "all",
+    k: int = 10,
+    slices: Optional[pd.DataFrame] = None,
+    seed: int = 42,
+) -> List[tuple]:
+    """
+    Select the (area, consumer_type) slices to render.
+
+    Args:
+        group_names: All the (area, consumer_type) slices.
+        policy: One of "all", "worst" or "random". See render() for details.
+        k: Number of slices selected by the "worst" & "random" policies.
+        slices: Per slice metrics with the area, consumer_type & MAPE columns.
+        seed: Random seed of the "random" policy.
+
+    Returns: The selected slices.
+    """
+
+    assert policy in POLICIES, f"policy must be one of {POLICIES}, got {policy}."
+
+    if policy == "worst" and slices is None:
+        logger.warning(
+            "No slice metrics are available for the 'worst' policy. Falling back to the 'random' policy."
+        )
+        policy = "random"
+
+    if policy == "all" or len(group_names) <= k:
+        return group_names
+    elif policy == "worst":
+        worst_slices = slices.nlargest(k, "MAPE")
+        available_group_names = set(group_names)
+
+        return [
+            group_name
+            for group_name in zip(worst_slices["area"], worst_slices["consumer_type"])
+            if group_name in available_group_names
+        ]
+    else:
+        rng = np.random.default_rng(seed)
+        positions = np.sort(rng.choice(len(group_names), size=k, replace=False))
+
+        return [group_names[position] for position in positions]
+
+
+def render_slice(
+    group_name: tuple, group_values_dict: dict, image_save_path: Path
+) -> str:
+    """Plot the splits of a single slice and save the image to disk."""
+
+    fig, ax = plot_series(*group_values_dict.values(), labels=group_values_dict.keys())
+    fig.suptitle(f"Area: {group_name[0]} - Consumer type: {group_name[1]}")
+
+    # save matplotlib image
+    plt.savefig(image_save_path)
+    plt.close(fig)
+
+    return str(image_save_path)
@@ -0,0 +1,256 @@
+import itertools
+import math
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+from scipy.stats import norm
+from sklearn.gaussian_process import GaussianProcessRegressor
+from sklearn.gaussian_process.kernels import Matern, WhiteKernel
+
+from training_pipeline import utils
+
+
+logger = utils.get_logger(__name__)
+
+
+class RandomProposer:
+    """
+    Proposes configs sampled uniformly, without replacement, from the grid of a W&B sweep-like search space.
+
+    Args:
+        parameters: Mapping from every parameter to its {"values": [...]} specification.
+        seed: Random seed that makes the proposals reproducible.
+    """
+
+    def __init__(self, parameters: Dict[str, dict], seed: int = 42):
+        self.parameters = parameters
+        self.seed = seed
+
+        self.names = list(parameters.keys())
+        self.values = [parameters[name]["values"] for name in self.names]
+        # Every grid point is identified by the position of its value within every parameter.
+        self.grid = list(itertools.product(*(range(len(v)) for v in self.values)))
+        self.rng = np.random.default_rng(seed)
+
+        self.proposed = set()
+        self.observations = {}
+
+    def propose(self, n: int) -> List[dict]:
+        """Propose up to n configs that were not proposed yet."""
+
+        candidates = self._get_candidates()
+        n = min(n, len(candidates))
+        if n == 0:
+            return []
+
+        positions = self._select(candidates, n)
+
+        points = [candidates[position] for position in positions]
+        self.proposed.update(points)
+
+        return [self._to_config(point) for point in points]
+
+    def observe(self, config: dict, score: float, rung: int = 0):
+        """Record the score of a config evaluated at the given rung. Lower scores are better.
+        Non-finite scores (e.g. of the trials cut by a timeout) are recorded but never fitted by a surrogate.
+        """
+
+        self.observations.setdefault(rung, {})[self._to_point(config)] = score
+
+    def _select(self, candidates: List[tuple], n: int) -> List[int]:
+        return list(self.rng.choice(len(candidates), size=n, replace=False))
+
+    def _get_candidates(self) -> List[tuple]:
+        return [point for point in self.grid if point not in self.proposed]
+
+    def _to_config(self, point: tuple) -> dict:
+        return {
+            name: values[position]
+            for name, values, position in zip(self.names, self.values, point)
+        }
+
+    def _to_point(self, config: dict) -> tuple:
+        return tuple(
+            values.index(config[name]) for name, values in zip(self.names, self.values)
+        )
+
+
+class BayesianProposer(RandomProposer):
+    """
+    Proposes the configs that maximize the expected improvement of a Gaussian process fitted on the observed scores.
+
+    The surrogate is fitted on the highest rung with at least n_initial finite observations, as the scores of different
+    rungs are not comparable. Until then, the configs are sampled randomly.
+
+    Args:
+        parameters: Mapping from every parameter to its {"values": [...]} specification.
+        seed: Random seed that makes the proposals reproducible.
+        n_initial: Minimum number of observations of a rung to fit the surrogate on it.
+        xi: Exploration margin of the expected improvement.
+    """
+
+    def __init__(
+        self,
+        parameters: Dict[str, dict],
+        seed: int = 42,
+        n_initial: int = 4,
+        xi: float = 0.01,
+    ):
+        super().__init__(parameters, seed=seed)
+
+        self.n_initial = n_initial
+        self.xi = xi
+
+    def _select(self, candidates: List[tuple], n: int) -> List[int]:
+        finite_observations = {
+            rung: {
+                point: score
+                for point, score in observations.items()
+                if np.isfinite(score)
+            }
+            for rung, observations in self.observations.items()
+        }
+        rungs = [
+            rung
+            for rung, observations in finite_observations.items()
+            if len(observations) >= self.n_initial
+        ]
+        if len(rungs) == 0:
+            return super()._select(candidates, n)
+
+        observations = finite_observations[max(rungs)]
+        X = self._encode(list(observations.keys()))
+        y = np.array(list(observations.values()))
+        y_mean, y_std = y.mean(), max(y.std(), 1e-12)
+
+        surrogate = GaussianProcessRegressor(
+            kernel=Matern(nu=2.5) + WhiteKernel(),
+            normalize_y=False,
+            random_state=self.seed,
+        )
+        surrogate.fit(X, (y - y_mean) / y_std)
+
+        mean, std = surrogate.predict(self._encode(candidates), return_std=True)
+        std = np.maximum(std, 1e-12)
+        improvement = ((y.min() - y_mean) / y_std) - mean - self.xi
+        z = improvement / std
+        expected_improvement = improvement * norm.cdf(z) + std * norm.pdf(z)
+
+        return list(np.argsort(-expected_improvement, kind="stable")[:n])
+
+    def _encode(self, points: Sequence[tuple]) -> np.ndarray:
+        """Encode every value by its position within the values of its parameter, scaled to [0, 1]."""
+
+        scale = np.array([max(len(values) - 1, 1) for values in self.values])
+
+        return np.array(points, dtype=np.float64).reshape(len(points), -1) / scale
+
+
+def expand_grid(parameters: Dict[str, dict]) -> List[dict]:
+    """List every config of the grid of a W&B sweep-like search space, in the order of the parameters."""
+
+    names = list(parameters.keys())
+    values = [parameters[name]["values"] for name in names]
+
+    return [dict(zip(names, point)) for point in itertools.product(*values)]
+
+
+PROPOSERS = {"random": RandomProposer, "bayes": BayesianProposer}
+
+
+def get_proposer(name: str, parameters: Dict[str, dict], seed: int = 42):
+    if name not in PROPOSERS:
+        raise ValueError(
+            f"Unknown proposer {name}. Supported proposers: {list(PROPOSERS)}"
+        )
+
+    return PROPOSERS[name](parameters, seed=seed)
+
+
+def successive_halving(
+    evaluate: Callable[[List[dict], int], List[float]],
+    proposer: RandomProposer,
+    n_configs: int,
+    n_rungs: int,
+    eta: int = 3,
+    start_rung: int = 0,
+) -> List[dict]:
+    """
+    Evaluate n_configs proposed configs on the cheapest rung and promote the best 1 / eta of them to the next rung,
+    until the last rung is reached.
+
+    Args:
+        evaluate: Function that scores a list of configs at a given rung. Lower scores are better.
+        proposer: Proposes the configs and records their scores.
+        n_configs: Number of configs evaluated on the first rung.
+        n_rungs: Total number of rungs. The last one is the full evaluation.
+        eta: Fraction of the configs promoted to the next rung.
+        start_rung: Rung on which the configs are first evaluated.
+
+    Returns: The trials of every rung as {"config", "rung", "score"} dictionaries.
+    """
+
+    trials = []
+    configs = proposer.propose(n_configs)
+    for rung in range(start_rung, n_rungs):
+        if len(configs) == 0:
+            break
+
+        scores = evaluate(configs, rung)
+        for config, score in zip(configs, scores):
+            proposer.observe(config, score, rung=rung)
+            trials.append({"config": config, "rung": rung, "score": score})
+        logger.info(
+            f"Rung {rung}: evaluated {len(configs)} configs with a best score of {min(scores):.4f}."
+        )
+
+        # NOTE: The configs without a finite score (e.g. cut by a timeout) are never promoted.
+        n_promoted = max(1, len(configs) // eta)
+        order = [
+            position
+            for position in np.argsort(scores, kind="stable")
+            if np.isfinite(scores[position])
+        ][:n_promoted]
+        configs = [configs[position] for position in order]
+
+    return trials
+
+
+def hyperband(
+    evaluate: Callable[[List[dict], int], List[float]],
+    proposer: RandomProposer,
+    n_configs: int,
+    n_rungs: int,
+    eta: int = 3,
+) -> List[dict]:
+    """
+    Run one successive halving bracket per rung, from the most aggressive one, which starts n_configs configs
+    on the cheapest rung, to the most conservative one, which evaluates n_configs / eta ** (n_rungs - 1) configs
+    directly on the last rung. The later brackets are proposed with the observations of the earlier ones.
+
+    Returns: The trials of every bracket as {"config", "rung", "score"} dictionaries.
+    """
+
+    # NOTE: The configs are proposed without replacement, thus more than the whole grid can't be evaluated.
+    n_configs = min(n_configs, len(proposer.grid))
+    trials = []
+    for start_rung in range(n_rungs):
+        bracket_n_configs = max(1, math.ceil(n_configs / eta**start_rung))
+        logger.info(
+            f"Starting the bracket of {bracket_n_configs} configs on rung {start_rung}."
+        )
+        trials.extend(
+            successive_halving(
+                evaluate,
+                proposer,
+                n_configs=bracket_n_configs,
+                n_rungs=n_rungs,
+                eta=eta,
+                start_rung=start_rung,
+            )
+        )
+
+    return trials
+
+
+METHODS = {"successive_halving": successive_halving, "hyperband": hyperband}
@@ -50,3 +50,10 @@ OUTPUT_DIR = ML_PIPELINE_ROOT_DIR / "output"
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 SETTINGS = load_env_vars(root_dir=ML_PIPELINE_ROOT_DIR)
+
+# Floating point precision of the time series, features & predictions. Use "float32" to halve the memory footprint.
+PRECISION = SETTINGS.get("PRECISION", "float64")
+assert PRECISION in (
+    "float32",
+    "float64",
+), f"PRECISION must be float32 or float64, got {PRECISION}."
@@ -0,0 +1,164 @@
+from typing import Dict, Hashable, Union
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.cluster import KMeans
+from sktime.forecasting.base import BaseForecaster
+
+from training_pipeline import utils
+
+
+logger = utils.get_logger(__name__)
+
+
+class ShardedForecaster(BaseForecaster):
+    """
+    Router forecaster that partitions the (area, consumer_type) series into groups and fits one clone
+    of the given forecaster per group in parallel worker processes. Predictions are dispatched to the
+    shard that owns each series and concatenated back in index order.
+    If the shards are fitted with exogenous variables, X is also required for predicting.
+
+    Args:
+        forecaster: sktime forecaster cloned for every shard.
+        group_by: How to partition the series:
+            - the name of an index level (e.g. "area" or "consumer_type");
+            - "consumer_type_clusters" to group the consumer types with similar daily profiles;
+            - a dict mapping every (area, consumer_type) series to its group.
+        n_clusters: Number of clusters used by the "consumer_type_clusters" partitioning.
+        n_jobs: Number of worker processes used to fit the shards. models.build_model() lowers the number of
+            threads of the underlying regressor accordingly to avoid oversubscribing the cores.
+    """
+
+    _tags = {
+        "scitype:y": "univariate",
+        "y_inner_mtype": ["pd-multiindex", "pd_multiindex_hier"],
+        "X_inner_mtype": ["pd-multiindex", "pd_multiindex_hier"],
+        "ignores-exogeneous-X": False,
+        "requires-fh-in-fit": False,
+        "handles-missing-data": True,
+    }
+
+    def __init__(
+        self,
+        forecaster,
+        group_by: Union[str, Dict[tuple, Hashable]] = "area",
+        n_clusters: int = 4,
+        n_jobs: int = -1,
+    ):
+        self.forecaster = forecaster
+        self.group_by = group_by
+        self.n_clusters = n_clusters
+        self.n_jobs = n_jobs
+
+        super().__init__()
+
+    def _fit(self, y, X=None, fh=None):
+        if self.group_by == "consumer_type_clusters":
+            self.group_by_ = cluster_consumer_types(y, n_clusters=self.n_clusters)
+        else:
+            self.group_by_ = self.group_by
+
+        y_shards = split_by_shard(y, self._get_shards(y.index))
+        X_shards = split_by_shard(X, self._get_shards(X.index)) if X is not None else {}
+        logger.info(
+            f"Fitting {len(y_shards)} shards with {self.n_jobs=}: {list(y_shards.keys())}"
+        )
+
+        forecasters = Parallel(n_jobs=self.n_jobs)(
+            delayed(_fit_shard)(
+                self.forecaster.clone(), y_shard, X_shards.get(shard), fh
+            )
+            for shard, y_shard in y_shards.items()
+        )
+        self.forecasters_ = dict(zip(y_shards.keys(), forecasters))
+        self.requires_X_ = X is not None
+
+        return self
+
+    def _predict(self, fh, X=None):
+        if X is not None:
+            X_shards = split_by_shard(X, self._get_shards(X.index))
+        elif self.requires_X_:
+            raise ValueError(
+                "The shards were fitted with exogenous variables, thus X is required for predicting. "
+                "Build it with train.compute_forecast_exogenous_variables()."
+            )
+        else:
+            X_shards = {shard: None for shard in self.forecasters_}
+
+        y_pred = []
+        for shard, X_shard in X_shards.items():
+            forecaster = self.forecasters_.get(shard)
+            if forecaster is None:
+                raise ValueError(f"No model was fitted for the shard {shard}.")
+
+            y_pred.append(forecaster.predict(fh=fh, X=X_shard))
+
+        return pd.concat(y_pred).sort_index()
+
+    def _update(self, y, X=None, update_params=True):
+        y_shards = split_by_shard(y, self._get_shards(y.index))
+        X_shards = split_by_shard(X, self._get_shards(X.index)) if X is not None else {}
+        for shard, y_shard in y_shards.items():
+            self.forecasters_[shard].update(
+                y_shard, X=X_shards.get(shard), update_params=update_params
+            )
+
+        return self
+
+    def _get_shards(self, index: pd.MultiIndex) -> np.ndarray:
+        """Compute the shard of every row of the given index."""
+
+        if isinstance(self.group_by_, str):
+            return index.get_level_values(self.group_by_).to_numpy()
+
+        series = index.droplevel(-1)
+        series_shards = {s: self.group_by_[s] for s in series.unique()}
+
+        return series.map(series_shards).to_numpy()
+
+
+def split_by_shard(data: pd.DataFrame, shards: np.ndarray) -> dict:
+    """Split the rows of data by their shard while keeping their order."""
+
+    return {shard: group for shard, group in data.groupby(shards, sort=True)}
+
+
+def cluster_consumer_types(
+    y: pd.DataFrame, n_clusters: int = 4, random_state: int = 42
+) -> Dict[tuple, str]:
+    """
+    Cluster the consumer types by their normalized daily profile.
+
+    Args:
+        y: Time series indexed by area, consumer_type & datetime_utc.
+        n_clusters: Number of clusters.
+        random_state: Random state of the clustering.
+
+    Returns: Mapping from every (area, consumer_type) series to the cluster of its consumer type.
+    """
+
+    hour_of_day = y.index.get_level_values("datetime_utc").hour
+    profiles = (
+        y.iloc[:, 0]
+        .groupby([y.index.get_level_values("consumer_type"), hour_of_day])
+        .mean()
+        .unstack()
+    )
+    profiles = profiles.div(profiles.mean(axis=1), axis=0).fillna(0)
+
+    n_clusters = min(n_clusters, len(profiles))
+    labels = KMeans(
+        n_clusters=n_clusters, random_state=random_state, n_init=10
+    ).fit_predict(profiles.to_numpy())
+    consumer_type_clusters = dict(zip(profiles.index, labels))
+
+    return {
+        (area, consumer_type): f"cluster_{consumer_type_clusters[consumer_type]}"
+        for area, consumer_type in y.index.droplevel(-1).unique()
+    }
+
+
+def _fit_shard(forecaster, y: pd.DataFrame, X: pd.DataFrame, fh):
+    return forecaster.fit(y, X=X, fh=fh)
@@ -1,26 +1,25 @@
+import copy
 import json
+import shutil
 from collections import OrderedDict
-import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import OrderedDict as OrderedDictType, Optional, Tuple
+from typing import Optional, Tuple
 
 import fire
 import hopsworks
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import wandb
-from sktime.performance_metrics.forecasting import (
-    mean_squared_percentage_error,
-    mean_absolute_percentage_error,
-)
-from sktime.utils.plotting import plot_series
+from sklearn.base import clone
+from sktime.forecasting.compose import ForecastingPipeline
 
-
-from training_pipeline import utils
-from training_pipeline.settings import SETTINGS, OUTPUT_DIR
+from training_pipeline import compiled, feature_cache, profiling, utils
+from training_pipeline.settings import SETTINGS, OUTPUT_DIR, PRECISION
 from training_pipeline.data import load_dataset_from_feature_store
+from training_pipeline.metrics import compute_metrics, compute_slice_metrics
 from training_pipeline.models import build_model, build_baseline_model
+from training_pipeline.rendering import render
 
 
 logger = utils.get_logger(__name__)
@@ -30,6 +29,11 @@ def from_best_config(
     fh: int = 24,
     feature_view_version: Optional[int] = None,
     training_dataset_version: Optional[int] = None,
+    refresh_mode: str = "full",
+    full_retrain_every: int = 24,
+    refresh_n_estimators: int = 100,
+    max_n_trees: int = 3000,
+    shard_by: Optional[str] = None,
 ) -> dict:
     """Train and evaluate on the test set the best model found in the hyperparameter optimization run.
     After training and evaluating it uploads the artifacts to wandb & hopsworks model registries.
@@ -40,11 +44,29 @@ def from_best_config(
              If none, it will try to load the version from the cached feature_view_metadata.json file. Defaults to None.
         training_dataset_version (Optional[int], optional): feature store - feature view - training dataset version.
             If none, it will try to load the version from the cached feature_view_metadata.json file. Defaults to None.
+        refresh_mode (str, optional): "full" retrains the model from scratch. "incremental" continues boosting the previous
+            production model on the newly arrived hours and falls back to a full retrain when it is not possible. Defaults to "full".
+        full_retrain_every (int, optional): In the "incremental" mode, a full retrain is forced after this many consecutive
+            incremental refreshes. Defaults to 24.
+        refresh_n_estimators (int, optional): Number of trees added to the previous model by an incremental refresh. Defaults to 100.
+            The previous model is first refreshed on the new training hours and evaluated on the test set, then refreshed on the test set.
+        max_n_trees (int, optional): In the "incremental" mode, a full retrain is forced when a refresh would grow the previous model
+            beyond this many trees. Defaults to 3000.
+        shard_by (Optional[str], optional): If set, train one model per group of series in parallel worker processes.
+            Either "area", "consumer_type" or "consumer_type_clusters". Defaults to None, which trains a single global model.
 
     Returns:
         dict: Dictionary containing metadata about the training experiment.
     """
 
+    assert refresh_mode in (
+        "full",
+        "incremental",
+    ), f"Unsupported refresh mode: {refresh_mode}"
+
+    profiler = profiling.get_profiler()
+    profiler.reset()
+
     feature_view_metadata = utils.load_json("feature_view_metadata.json")
     if feature_view_version is None:
         feature_view_version = feature_view_metadata["feature_view_version"]
@@ -89,23 +111,55 @@ def from_best_config(
             config = json.load(f)
         # Log the config to the experiment.
         run.config.update(config)
+        model_config = dict(config)
+        if shard_by is not None:
+            model_config["shard_by"] = shard_by
+        if PRECISION != "float64":
+            model_config["precision"] = PRECISION
+        config_hash = feature_cache.hash_config(model_config)
+
+        y = pd.concat([y_train, y_test]).sort_index()
+        X = pd.concat([X_train, X_test]).sort_index()
+
+        previous_model = None
+        if refresh_mode == "incremental":
+            previous_model, previous_train_metadata = load_refreshable_model(
+                y_train,
+                config_hash=config_hash,
+                full_retrain_every=full_retrain_every,
+                max_n_trees=max_n_trees,
+                refresh_n_estimators=refresh_n_estimators,
+            )
 
         # # Baseline model
-        baseline_forecaster = build_baseline_model(seasonal_periodicity=fh)
-        baseline_forecaster = train_model(baseline_forecaster, y_train, X_train, fh=fh)
-        _, metrics_baseline = evaluate(baseline_forecaster, y_test, X_test)
+        with profiler.stage("baseline_fit"):
+            baseline_forecaster = build_baseline_model(seasonal_periodicity=fh)
+            baseline_forecaster = train_model(
+                baseline_forecaster, y_train, X_train, fh=fh
+            )
+        with profiler.stage("baseline_evaluate"):
+            _, metrics_baseline = evaluate(baseline_forecaster, y_test, X_test)
         slices = metrics_baseline.pop("slices")
         for k, v in metrics_baseline.items():
             logger.info(f"Baseline test {k}: {v}")
         wandb.log({"test": {"baseline": metrics_baseline}})
         wandb.log({"test.baseline.slices": wandb.Table(dataframe=slices)})
 
-        # Build & train best model.
-        best_model = build_model(config)
-        best_forecaster = train_model(best_model, y_train, X_train, fh=fh)
+        if previous_model is not None:
+            # Continue boosting the previous production model on the training hours it hasn't seen yet.
+            with profiler.stage("refresh"):
+                best_forecaster = refresh_model(
+                    previous_model, y_train, X_train, n_estimators=refresh_n_estimators
+                )
+        else:
+            # Build & train best model.
+            with profiler.stage("model_fit"):
+                best_model = build_model(config, shard_by=shard_by)
+                best_forecaster = train_model(best_model, y_train, X_train, fh=fh)
 
         # Evaluate best model
-        y_pred, metrics = evaluate(best_forecaster, y_test, X_test)
+        with profiler.stage("evaluate"):
+            y_pred, metrics = evaluate(best_forecaster, y_test, X_test)
         slices = metrics.pop("slices")
         for k, v in metrics.items():
             logger.info(f"Model test {k}: {v}")
@@ -114,19 +168,34 @@ def from_best_config(
 
         # Render best model on the test set.
         results = OrderedDict({"y_train": y_train, "y_test": y_test, "y_pred": y_pred})
-        render(results, prefix="images_test")
+        with profiler.stage("render_test"):
+            render(results, prefix="images_test", slices=slices)
+        test_slices = slices
 
         # Update best model with the test set.
-        # NOTE: Method update() is not supported by LightGBM + Sktime. Instead we will retrain the model on the entire dataset.
-        # best_forecaster = best_forecaster.update(y_test, X=X_test)
-        best_forecaster = train_model(
-            model=best_forecaster,
-            y_train=pd.concat([y_train, y_test]).sort_index(),
-            X_train=pd.concat([X_train, X_test]).sort_index(),
-            fh=fh,
-        )
-        X_forecast = compute_forecast_exogenous_variables(X_test, fh)
-        y_forecast = forecast(best_forecaster, X_forecast)
+        if previous_model is not None:
+            with profiler.stage("refit"):
+                best_forecaster = refresh_model(
+                    best_forecaster, y, X, n_estimators=refresh_n_estimators
+                )
+            n_incremental_refreshes = (
+                previous_train_metadata["refresh"]["n_incremental_refreshes"] + 1
+            )
+        else:
+            # NOTE: Method update() is not supported by LightGBM + Sktime. Instead we will retrain the model on the entire dataset.
+            # best_forecaster = best_forecaster.update(y_test, X=X_test)
+            with profiler.stage("refit"):
+                best_forecaster = train_model(
+                    model=best_forecaster,
+                    y_train=y,
+                    X_train=X,
+                    fh=fh,
+                )
+            n_incremental_refreshes = 0
+
+        with profiler.stage("forecast"):
+            X_forecast = compute_forecast_exogenous_variables(X_test, fh)
+            y_forecast = forecast(best_forecaster, X_forecast)
         logger.info(
             f"Forecasted future values for renderin between {y_test.index.get_level_values('datetime_utc').min()} and {y_test.index.get_level_values('datetime_utc').max()}."
         )
@@ -138,11 +207,23 @@ def from_best_config(
             }
         )
         # Render best model future forecasts.
-        render(results, prefix="images_forecast")
+        with profiler.stage("render_forecast"):
+            render(results, prefix="images_forecast", slices=test_slices)
 
         # Save best model.
-        save_model_path = OUTPUT_DIR / "best_model.pkl"
-        utils.save_model(best_forecaster, save_model_path)
+        # NOTE: The model directory is uploaded as it is to both the wandb & Hopsworks model registries.
+        with profiler.stage("save"):
+            model_dir = OUTPUT_DIR / "best_model"
+            if model_dir.exists():
+                shutil.rmtree(model_dir)
+            model_dir.mkdir(parents=True)
+            utils.save_model(best_forecaster, model_dir / "best_model.pkl")
+            export_model_bundle(best_forecaster, model_dir / "best_model_bundle")
+        refresh_metadata = {
+            "mode": "incremental" if n_incremental_refreshes > 0 else "full",
+            "n_incremental_refreshes": n_incremental_refreshes,
+            "config_hash": config_hash,
+        }
         metadata = {
             "experiment": {
                 "fh": fh,
@@ -152,21 +233,32 @@ def from_best_config(
                 "training_end_datetime": training_end_datetime.to_timestamp().isoformat(),
                 "testing_start_datetime": testing_start_datetime.to_timestamp().isoformat(),
                 "testing_end_datetime": testing_end_datetime.to_timestamp().isoformat(),
+                "refresh": refresh_metadata,
+                "precision": PRECISION,
             },
             "results": {"test": metrics},
         }
         artifact = wandb.Artifact(name="best_model", type="model", metadata=metadata)
-        artifact.add_file(str(save_model_path))
-        run.log_artifact(artifact)
-
-        run.finish()
-        artifact.wait()
-
-    model_version = attach_best_model_to_feature_store(
-        feature_view_version, training_dataset_version, artifact
-    )
-
-    metadata = {"model_version": model_version}
+        artifact.add_dir(str(model_dir))
+
+        # NOTE: Publishing finishes the wandb run, thus it is recorded only in train_profile.json.
+        profiler.log_to_wandb()
+
+        with profiler.stage("publish"):
+            model_version = publish_best_model(
+                run,
+                artifact,
+                model_dir,
+                feature_view_version=feature_view_version,
+                training_dataset_version=training_dataset_version,
+            )
+    profiler.save(file_name="train_profile.json")
+
+    metadata = {
+        "model_version": model_version,
+        "refresh": refresh_metadata,
+        "results": {"test": metrics},
+    }
     utils.save_json(metadata, file_name="train_metadata.json")
 
     return metadata
@@ -181,6 +273,130 @@ def train_model(model, y_train: pd.DataFrame, X_train: pd.DataFrame, fh: int):
     return model
 
 
+def load_refreshable_model(
+    y_train: pd.DataFrame,
+    config_hash: str,
+    full_retrain_every: int,
+    max_n_trees: int,
+    refresh_n_estimators: int,
+) -> Tuple[Optional[object], Optional[dict]]:
+    """Load the previous production model if it can be refreshed incrementally on the given data.
+
+    Args:
+        y_train (pd.DataFrame): training split the model will be refreshed on before being evaluated on the test split
+        config_hash (str): hash of the config of the current best model
+        full_retrain_every (int): number of consecutive incremental refreshes after which a full retrain is forced
+        max_n_trees (int): maximum number of trees of a refreshed model
+        refresh_n_estimators (int): number of trees added by every refresh
+
+    Returns:
+        The previous model and its train metadata or (None, None) if a full retrain is required.
+    """
+
+    try:
+        previous_train_metadata = utils.load_json("train_metadata.json")
+    except FileNotFoundError:
+        logger.info("No previous production model found. Running a full retrain.")
+
+        return None, None
+
+    refresh_metadata = previous_train_metadata.get("refresh")
+    if refresh_metadata is None or refresh_metadata["config_hash"] != config_hash:
+        logger.info("The best config has changed. Running a full retrain.")
+
+        return None, None
+    if refresh_metadata["n_incremental_refreshes"] >= full_retrain_every:
+        logger.info(
+            f"Reached {full_retrain_every=} consecutive incremental refreshes. Running a full retrain."
+        )
+
+        return None, None
+
+    model_version = previous_train_metadata["model_version"]
+    previous_model = load_model_from_model_registry(model_version)
+    if not can_refresh_model(previous_model, y_train):
+        logger.info(
+            f"The model with version {model_version} can't be refreshed on the current data. Running a full retrain."
+        )
+
+        return None, None
+    # A refresh adds at most two batches of trees: one on the new training hours and one on the test hours.
+    n_trees = previous_model.forecaster_.estimator_.booster_.num_trees()
+    if n_trees + 2 * refresh_n_estimators > max_n_trees:
+        logger.info(
+            f"The model with version {model_version} has already {n_trees} trees out of {max_n_trees=}. Running a full retrain."
+        )
+
+        return None, None
+
+    logger.info(f"Refreshing incrementally the model with version {model_version}.")
+
+    return previous_model, previous_train_metadata
+
+
+def can_refresh_model(model, y: pd.DataFrame) -> bool:
+    """Check that y holds the history required to compute the features of the hours after the cutoff of the model.
+    As the cutoff must not be after the end of y, the model hasn't seen the hours that follow y (e.g. the test split).
+    """
+
+    # NOTE: Only the single global model can be refreshed.
+    if not isinstance(model, ForecastingPipeline):
+        return False
+
+    cutoff = model.cutoff[0]
+    window_length = model.forecaster_.window_length_
+    timepoints = y.index.get_level_values("datetime_utc")
+
+    return timepoints.min() <= cutoff - window_length + 1 and cutoff <= timepoints.max()
+
+
+def refresh_model(model, y: pd.DataFrame, X: pd.DataFrame, n_estimators: int = 100):
+    """Continue boosting a fitted model on the hours of y that arrived after its cutoff.
+
+    The features of the new hours are computed with the fitted pipeline, then LightGBM trains
+    n_estimators more trees starting from the current booster (init_model).
+    Finally, the cutoff of the forecaster is moved to the end of y.
+
+    Args:
+        model: fitted forecasting pipeline built with build_model()
+        y (pd.DataFrame): time series holding at least the window length of history before the new hours
+        X (pd.DataFrame): exogenous variables aligned with y
+        n_estimators (int, optional): number of trees to add. Defaults to 100.
+
+    Returns:
+        A refreshed copy of the model.
+    """
+
+    model = copy.deepcopy(model)
+    reducer = model.forecaster_
+
+    cutoff = model.cutoff[0]
+    timepoints = y.index.get_level_values("datetime_utc")
+    is_new = timepoints > cutoff
+    if not is_new.any():
+        logger.info(f"No new data after {cutoff}. The model is left as it is.")
+
+        return model
+
+    # The features of the new hours are computed from the previous window_length hours.
+    is_context = timepoints > cutoff - reducer.window_length_
+    y_context = y[is_context]
+    X_context = model._transform(X=X[is_context].copy(), y=y_context)
+    yt, Xt = reducer._transform(y_context, X_context)
+
+    regressor = reducer.estimator_
+    refreshed_regressor = clone(regressor).set_params(n_estimators=n_estimators)
+    refreshed_regressor.fit(Xt, yt.to_numpy().ravel(), init_model=regressor.booster_)
+    reducer.estimator_ = refreshed_regressor
+    logger.info(
+        f"Refreshed the model on {is_new.sum()} new samples with {n_estimators} more trees."
+    )
+
+    model.update(y[is_new], X=X[is_new], update_params=False)
+
+    return model
+
+
 def evaluate(
     forecaster, y_test: pd.DataFrame, X_test: pd.DataFrame
 ) -> Tuple[pd.DataFrame, dict]:
@@ -201,87 +417,17 @@ def evaluate(
     y_pred = forecaster.predict(X=X_test)
 
     # Compute aggregated metrics.
-    results = dict()
-    rmspe = mean_squared_percentage_error(y_test, y_pred, squared=False)
-    results["RMSPE"] = rmspe
-    mape = mean_absolute_percentage_error(y_test, y_pred, symmetric=False)
-    results["MAPE"] = mape
+    results = compute_metrics(y_test, y_pred, metrics=["RMSPE", "MAPE"])
 
     # Compute metrics per slice.
-    y_test_slices = y_test.groupby(["area", "consumer_type"])
-    y_pred_slices = y_pred.groupby(["area", "consumer_type"])
-    slices = pd.DataFrame(columns=["area", "consumer_type", "RMSPE", "MAPE"])
-    for y_test_slice, y_pred_slice in zip(y_test_slices, y_pred_slices):
-        (area_y_test, consumer_type_y_test), y_test_slice_data = y_test_slice
-        (area_y_pred, consumer_type_y_pred), y_pred_slice_data = y_pred_slice
-
-        assert (
-            area_y_test == area_y_pred and consumer_type_y_test == consumer_type_y_pred
-        ), "Slices are not aligned."
-
-        rmspe_slice = mean_squared_percentage_error(
-            y_test_slice_data, y_pred_slice_data, squared=False
-        )
-        mape_slice = mean_absolute_percentage_error(
-            y_test_slice_data, y_pred_slice_data, symmetric=False
-        )
-
-        slice_results = pd.DataFrame(
-            {
-                "area": [area_y_test],
-                "consumer_type": [consumer_type_y_test],
-                "RMSPE": [rmspe_slice],
-                "MAPE": [mape_slice],
-            }
-        )
-        slices = pd.concat([slices, slice_results], ignore_index=True)
-
+    slices = compute_slice_metrics(
+        y_test, y_pred, by=["area", "consumer_type"], metrics=["RMSPE", "MAPE"]
+    )
     results["slices"] = slices
 
     return y_pred, results
 
 
-def render(
-    timeseries: OrderedDictType[str, pd.DataFrame],
-    prefix: Optional[str] = None,
-    delete_from_disk: bool = True,
-):
-    """Render the timeseries as a single plot per (area, consumer_type) and saves them to disk and to wandb."""
-
-    grouped_timeseries = OrderedDict()
-    for split, df in timeseries.items():
-        df = df.reset_index(level=[0, 1])
-        groups = df.groupby(["area", "consumer_type"])
-        for group_name, split_group_values in groups:
-            group_values = grouped_timeseries.get(group_name, {})
-
-            grouped_timeseries[group_name] = {
-                f"{split}": split_group_values["energy_consumption"],
-                **group_values,
-            }
-
-    output_dir = OUTPUT_DIR / prefix if prefix else OUTPUT_DIR
-    output_dir.mkdir(parents=True, exist_ok=True)
-    for group_name, group_values_dict in grouped_timeseries.items():
-        fig, ax = plot_series(
-            *group_values_dict.values(), labels=group_values_dict.keys()
-        )
-        fig.suptitle(f"Area: {group_name[0]} - Consumer type: {group_name[1]}")
-
-        # save matplotlib image
-        image_save_path = str(output_dir / f"{group_name[0]}_{group_name[1]}.png")
-        plt.savefig(image_save_path)
-        plt.close(fig)
-
-        if prefix:
-            wandb.log({prefix: wandb.Image(image_save_path)})
-        else:
-            wandb.log(wandb.Image(image_save_path))
-
-        if delete_from_disk:
-            os.remove(image_save_path)
-
-
 def compute_forecast_exogenous_variables(X_test: pd.DataFrame, fh: int):
     """Computes the exogenous variables for the forecast horizon."""
 
@@ -299,22 +445,116 @@ def forecast(forecaster, X_forecast: pd.DataFrame):
     return forecaster.predict(X=X_forecast)
 
 
-def attach_best_model_to_feature_store(
+def export_model_bundle(model, bundle_dir: Path) -> Optional[Path]:
+    """
+    Compile the forecaster into a versioned model bundle that is memory-mapped & served without sktime.
+
+    Returns: The directory of the bundle or None if the forecaster can't be compiled (e.g. sharded models).
+    """
+
+    try:
+        compiled_model = compiled.compile_model(model)
+    except ValueError as e:
+        logger.info(f"Skipping the model bundle export: {e}")
+
+        return None
+
+    if bundle_dir.exists():
+        shutil.rmtree(bundle_dir)
+    compiled_model.save(bundle_dir)
+    logger.info(f"Saved the model bundle to {bundle_dir}.")
+
+    return bundle_dir
+
+
+def load_model_from_model_registry(model_version: int):
+    """Download the model with the given version from the Hopsworks model registry and load it into memory."""
+
+    project = hopsworks.login(
+        api_key_value=SETTINGS["FS_API_KEY"], project=SETTINGS["FS_PROJECT_NAME"]
+    )
+    mr = project.get_model_registry()
+    model_registry_reference = mr.get_model(name="best_model", version=model_version)
+    model_dir = model_registry_reference.download()
+    model_path = Path(model_dir) / "best_model.pkl"
+
+    return utils.load_model(model_path)
+
+
+def publish_best_model(
+    run,
+    best_model_artifact: wandb.Artifact,
+    model_dir: Path,
     feature_view_version: int,
     training_dataset_version: int,
-    best_model_artifact: wandb.Artifact,
 ) -> int:
-    """Adds the best model artifact to the model registry."""
+    """
+    Publish the local model directory to the wandb & Hopsworks model registries concurrently.
+    When the wandb artifact is committed, its links are attached to the feature view & the training dataset in parallel.
+    NOTE: It finishes the given wandb run.
+
+    Returns: The version of the model in the Hopsworks model registry.
+    """
 
     project = hopsworks.login(
         api_key_value=SETTINGS["FS_API_KEY"], project=SETTINGS["FS_PROJECT_NAME"]
     )
+
+    # One worker for the Hopsworks upload & two for the feature store tags.
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        model_version_future = executor.submit(
+            save_best_model_to_model_registry,
+            project,
+            model_dir,
+            best_model_artifact.metadata["results"]["test"],
+        )
+
+        run.log_artifact(best_model_artifact)
+        run.finish()
+        best_model_artifact.wait()
+        logger.info(
+            f"Uploaded the best model to wandb as version {best_model_artifact.version}."
+        )
+
+        attach_best_model_to_feature_store(
+            project,
+            feature_view_version,
+            training_dataset_version,
+            best_model_artifact,
+            executor=executor,
+        )
+        model_version = model_version_future.result()
+        logger.info(
+            f"Uploaded the best model to the Hopsworks model registry as version {model_version}."
+        )
+
+    return model_version
+
+
+def save_best_model_to_model_registry(project, model_dir: Path, metrics: dict) -> int:
+    """Uploads the local model directory to the Hopsworks model registry."""
+
+    mr = project.get_model_registry()
+    py_model = mr.python.create_model("best_model", metrics=metrics)
+    py_model.save(str(model_dir))
+
+    return py_model.version
+
+
+def attach_best_model_to_feature_store(
+    project,
+    feature_view_version: int,
+    training_dataset_version: int,
+    best_model_artifact: wandb.Artifact,
+    executor: ThreadPoolExecutor,
+):
+    """Attach links to the best model artifact in the feature view and the training dataset of the feature store in parallel."""
+
     fs = project.get_feature_store()
     feature_view = fs.get_feature_view(
         name="energy_consumption_denmark_view", version=feature_view_version
     )
 
-    # Attach links to the best model artifact in the feature view and the training dataset of the feature store.
     fs_tag = {
         "name": "best_model",
         "version": best_model_artifact.version,
@@ -322,21 +562,17 @@ def attach_best_model_to_feature_store(
         "url": f"https://wandb.ai/{SETTINGS['WANDB_ENTITY']}/{SETTINGS['WANDB_PROJECT']}/artifacts/{best_model_artifact.type}/{best_model_artifact._name}/{best_model_artifact.version}/overview",
         "artifact_name": f"{SETTINGS['WANDB_ENTITY']}/{SETTINGS['WANDB_PROJECT']}/{best_model_artifact.name}",
     }
-    feature_view.add_tag(name="wandb", value=fs_tag)
-    feature_view.add_training_dataset_tag(
-        training_dataset_version=training_dataset_version, name="wandb", value=fs_tag
-    )
-
-    # Upload the model to the Hopsworks model registry.
-    best_model_dir = best_model_artifact.download()
-    best_model_path = Path(best_model_dir) / "best_model.pkl"
-    best_model_metrics = best_model_artifact.metadata["results"]["test"]
-
-    mr = project.get_model_registry()
-    py_model = mr.python.create_model("best_model", metrics=best_model_metrics)
-    py_model.save(best_model_path)
-
-    return py_model.version
+    futures = [
+        executor.submit(feature_view.add_tag, name="wandb", value=fs_tag),
+        executor.submit(
+            feature_view.add_training_dataset_tag,
+            training_dataset_version=training_dataset_version,
+            name="wandb",
+            value=fs_tag,
+        ),
+    ]
+    for future in futures:
+        future.result()
 
 
 if __name__ == "__main__":
@@ -1,5 +1,10 @@
+from typing import Optional
+
 from sktime.transformations.base import BaseTransformer
 from sktime.transformations.compose import CORE_MTYPES
+from sktime.transformations.series.summarize import WindowSummarizer
+
+from training_pipeline import feature_cache
 
 
 class AttachAreaConsumerType(BaseTransformer):
@@ -27,3 +32,96 @@ class AttachAreaConsumerType(BaseTransformer):
         X = X.drop(columns=["area_exog", "consumer_type_exog"])
 
         return X
+
+
+class CastColumns(BaseTransformer):
+    """Transformer used to cast all the columns of the input data to the given dtype."""
+
+    _tags = {
+        "univariate-only": False,
+        "X_inner_mtype": CORE_MTYPES,
+        "y_inner_mtype": "None",
+        "fit_is_empty": True,
+        "transform-returns-same-time-index": True,
+        "handles-missing-data": True,
+    }
+
+    def __init__(self, dtype: str = "float32"):
+        self.dtype = dtype
+
+        super().__init__()
+
+    def _transform(self, X, y=None):
+        return X.astype(self.dtype)
+
+
+class CachedWindowSummarizer(WindowSummarizer):
+    """
+    WindowSummarizer that memoizes its features in the process wide feature cache.
+
+    The lag & window features are computed once for the longest history and served as slices
+    to every CV fold and HPO trial that uses the same window config.
+    The short windows transformed step by step during the recursive predictions bypass the cache.
+    If dtype is set, the features are cast to it (e.g. "float32" to halve the size of the feature matrix).
+    """
+
+    def __init__(
+        self,
+        lag_feature=None,
+        n_jobs=-1,
+        target_cols=None,
+        truncate=None,
+        use_cache: bool = True,
+        dtype: Optional[str] = None,
+    ):
+        self.use_cache = use_cache
+        self.dtype = dtype
+
+        super().__init__(
+            lag_feature=lag_feature,
+            n_jobs=n_jobs,
+            target_cols=target_cols,
+            truncate=truncate,
+        )
+
+    def _transform(self, X, y=None):
+        if not self._is_cacheable(X):
+            return self._compute_features(X, y=y)
+
+        cache = feature_cache.get_feature_cache()
+        config = self.get_cache_config()
+        Xt = cache.get(X, config)
+        if Xt is None:
+            Xt = self._compute_features(X, y=y)
+            cache.put(X, config, Xt)
+
+        return Xt.copy()
+
+    def _compute_features(self, X, y=None):
+        Xt = super()._transform(X, y=y)
+        if self.dtype is not None:
+            Xt = Xt.astype(self.dtype)
+
+        return Xt
+
+    def get_cache_config(self) -> dict:
+        """Parameters that change the computed features. They are part of the cache key."""
+
+        return {
+            "lag_feature": self.lag_feature,
+            "target_cols": self.target_cols,
+            "truncate": self.truncate,
+            "dtype": self.dtype,
+        }
+
+    def _is_cacheable(self, X) -> bool:
+        # Backfilled features are not causal, therefore they can't be sliced from a longer history.
+        if self.use_cache is False or self.truncate == "bfill":
+            return False
+        # Transform X only together with the data it was fitted on.
+        if not self._X.index.equals(X.index):
+            return False
+
+        n_timepoints = X.index.get_level_values(-1).nunique()
+
+        return n_timepoints > self.truncate_start + 1
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+import pandas as pd
+
+from training_pipeline import feature_cache, utils
+from training_pipeline.settings import SETTINGS, OUTPUT_DIR, PRECISION
+
+
+logger = utils.get_logger(__name__)
+
+# Parameters that change how fast a trial runs, but not its results.
+RESOURCE_PARAMS = {
+    "forecaster__estimator__n_jobs",
+    "forecaster_transformers__window_summarizer__n_jobs",
+}
+
+
+class TrialCache:
+    """
+    Persistent SQLite store of the results of the hyperparameter optimization trials.
+
+    The trials are keyed by the normalized config, the content of the training data, the forecasting horizon
+    and the CV scheme. Thus, the same config evaluated on the same training dataset version is never refit.
+    Every call opens its own connection, so the cache can be shared by the processes of a parallel search.
+
+    Args:
+        path: Path of the SQLite database.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+
+        with self._connect() as connection:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS trials (
+                    key TEXT PRIMARY KEY,
+                    config TEXT NOT NULL,
+                    results TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT results FROM trials WHERE key = ?", (key,)
+            ).fetchone()
+
+        if row is None:
+            self.misses += 1
+
+            return None
+
+        self.hits += 1
+
+        return json.loads(row[0])
+
+    def put(self, key: str, config: dict, results: dict):
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO trials (key, config, results, created_at) VALUES (?, ?, ?, ?)",
+                (
+                    key,
+                    json.dumps(normalize_config(config), default=str),
+                    json.dumps(results, default=float),
+                    time.time(),
+                ),
+            )
+
+    def __len__(self) -> int:
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM trials").fetchone()[0]
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+
+def normalize_config(config: dict) -> dict:
+    """Drop the parameters that don't change the results of a trial and add the precision, which does."""
+
+    config = {k: v for k, v in config.items() if k not in RESOURCE_PARAMS}
+    config["precision"] = PRECISION
+
+    return config
+
+
+def build_key(
+    config: dict,
+    y: pd.DataFrame,
+    X: Optional[pd.DataFrame],
+    fh: int,
+    cv_scheme: dict,
+) -> str:
+    """Build the key of a trial from its config, the content of its training data, its horizon and its CV scheme."""
+
+    payload = {
+        "config": normalize_config(config),
+        "y": feature_cache.hash_dataframe(y),
+        "X": feature_cache.hash_dataframe(X) if X is not None else None,
+        "fh": fh,
+        "cv_scheme": cv_scheme,
+    }
+    serialized_payload = json.dumps(payload, sort_keys=True, default=str)
+
+    return hashlib.sha256(serialized_payload.encode()).hexdigest()
+
+
+_TRIAL_CACHE = None
+
+
+def get_trial_cache() -> Optional[TrialCache]:
+    """Get the trial cache shared by the whole process. It is configured through the settings.
+
+    Returns: The trial cache or None if it is disabled with TRIAL_CACHE_ENABLED=false.
+    """
+
+    global _TRIAL_CACHE
+
+    if str(SETTINGS.get("TRIAL_CACHE_ENABLED", "true")).lower() != "true":
+        return None
+
+    if _TRIAL_CACHE is None:
+        _TRIAL_CACHE = TrialCache(
+            path=SETTINGS.get("TRIAL_CACHE_PATH") or OUTPUT_DIR / "trial_cache.sqlite"
+        )
+
+    return _TRIAL_CACHE
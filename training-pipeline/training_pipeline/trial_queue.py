@@ -0,0 +1,290 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import pandas as pd
+
+from training_pipeline import utils
+from training_pipeline.settings import SETTINGS, OUTPUT_DIR
+
+
+logger = utils.get_logger(__name__)
+
+
+class TrialQueue:
+    """
+    Queue of hyperparameter optimization trials coordinated through a SQLite database.
+
+    Any number of worker processes, on one or many machines, can claim trials from the same queue. A claimed trial is
+    leased to its worker for lease_s seconds, and the worker keeps the lease alive with heartbeats. If a worker crashes,
+    its lease expires and the trial is claimed again by another worker, up to max_attempts times.
+    NOTE: To share the queue between machines, put the database on a shared filesystem that supports file locks.
+
+    Args:
+        path: Path of the SQLite database.
+        lease_s: Duration of a lease without heartbeat.
+        max_attempts: Maximum number of claims of a trial before it is marked as failed.
+    """
+
+    def __init__(
+        self, path: Union[str, Path], lease_s: float = 120, max_attempts: int = 3
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_s = lease_s
+        self.max_attempts = max_attempts
+
+        with self._transaction() as connection:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS queues (
+                    name TEXT PRIMARY KEY,
+                    metadata TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS trials (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    queue TEXT NOT NULL,
+                    config TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    worker TEXT,
+                    lease_expires_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    results TEXT,
+                    error TEXT,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS trials_queue_status ON trials (queue, status)"
+            )
+
+    def create(self, name: str, configs: List[dict], metadata: Optional[dict] = None):
+        """Create a queue with one pending trial per config. The metadata is shared with every worker."""
+
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO queues (name, metadata, created_at) VALUES (?, ?, ?)",
+                (name, json.dumps(metadata or {}, default=str), now),
+            )
+            connection.executemany(
+                "INSERT INTO trials (queue, config, status, updated_at) VALUES (?, ?, 'pending', ?)",
+                [(name, json.dumps(config), now) for config in configs],
+            )
+
+    def get_metadata(self, name: str) -> dict:
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT metadata FROM queues WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown trial queue {name}.")
+
+        return json.loads(row[0])
+
+    def get_last_name(self) -> Optional[str]:
+        """Name of the last created queue."""
+
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT name FROM queues ORDER BY created_at DESC LIMIT 1"
+            ).fetchone()
+
+        return row[0] if row is not None else None
+
+    def claim(self, name: str, worker: str) -> Optional[Tuple[int, dict]]:
+        """
+        Lease the next pending trial, or a running trial whose lease expired, to the worker.
+
+        Returns: The id and the config of the claimed trial or None if no trial can be claimed right now.
+        """
+
+        now = time.time()
+        with self._transaction() as connection:
+            # The trials of crashed workers that already used all their attempts are given up.
+            connection.execute(
+                """
+                UPDATE trials SET status = 'failed', error = 'Lease expired too many times.', updated_at = ?
+                WHERE queue = ? AND status = 'running' AND lease_expires_at < ? AND attempts >= ?
+                """,
+                (now, name, now, self.max_attempts),
+            )
+            row = connection.execute(
+                """
+                SELECT id, config FROM trials
+                WHERE queue = ? AND (status = 'pending' OR (status = 'running' AND lease_expires_at < ?))
+                ORDER BY id LIMIT 1
+                """,
+                (name, now),
+            ).fetchone()
+            if row is None:
+                return None
+
+            trial_id, config = row
+            connection.execute(
+                """
+                UPDATE trials SET status = 'running', worker = ?, lease_expires_at = ?,
+                    attempts = attempts + 1, updated_at = ?
+                WHERE id = ?
+                """,
+                (worker, now + self.lease_s, now, trial_id),
+            )
+
+        return trial_id, json.loads(config)
+
+    def heartbeat(self, trial_id: int, worker: str) -> bool:
+        """Extend the lease of the trial. Returns False if the worker lost the lease."""
+
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                """
+                UPDATE trials SET lease_expires_at = ?, updated_at = ?
+                WHERE id = ? AND worker = ? AND status = 'running'
+                """,
+                (now + self.lease_s, now, trial_id, worker),
+            )
+
+        return cursor.rowcount == 1
+
+    def complete(self, trial_id: int, worker: str, results: dict):
+        self._finish(trial_id, worker, status="finished", results=results)
+
+    def fail(self, trial_id: int, worker: str, error: str):
+        self._finish(trial_id, worker, status="failed", error=error)
+
+    def is_done(self, name: str) -> bool:
+        """Whether every trial of the queue is finished or failed."""
+
+        with self._transaction() as connection:
+            n_open = connection.execute(
+                "SELECT COUNT(*) FROM trials WHERE queue = ? AND status IN ('pending', 'running')",
+                (name,),
+            ).fetchone()[0]
+
+        return n_open == 0
+
+    def get_trials(self, name: str) -> pd.DataFrame:
+        """Aggregate the trials of the queue, with their config, status, worker & results, in submission order."""
+
+        with self._transaction() as connection:
+            trials = pd.read_sql_query(
+                """
+                SELECT id, config, status, worker, attempts, results, error FROM trials
+                WHERE queue = ? ORDER BY id
+                """,
+                connection,
+                params=(name,),
+            )
+        trials["config"] = trials["config"].map(json.loads)
+        trials["results"] = trials["results"].map(
+            lambda results: json.loads(results) if results is not None else None
+        )
+
+        return trials
+
+    def _finish(
+        self,
+        trial_id: int,
+        worker: str,
+        status: str,
+        results: Optional[dict] = None,
+        error: Optional[str] = None,
+    ):
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                """
+                UPDATE trials SET status = ?, results = ?, error = ?, lease_expires_at = NULL, updated_at = ?
+                WHERE id = ? AND worker = ? AND status = 'running'
+                """,
+                (
+                    status,
+                    json.dumps(results, default=float) if results is not None else None,
+                    error,
+                    time.time(),
+                    trial_id,
+                    worker,
+                ),
+            )
+        if cursor.rowcount == 0:
+            logger.warning(
+                f"Worker {worker} lost the lease of trial {trial_id}. Its result is dropped."
+            )
+
+    @contextmanager
+    def _transaction(self):
+        connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        try:
+            # Lock the database for writing at the start of the transaction, so two workers never claim the same trial.
+            connection.execute("BEGIN IMMEDIATE")
+            yield connection
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+
+class Heartbeat:
+    """Context manager that keeps the lease of a trial alive from a background thread."""
+
+    def __init__(self, queue: TrialQueue, trial_id: int, worker: str):
+        self.queue = queue
+        self.trial_id = trial_id
+        self.worker = worker
+
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+
+        return self
+
+    def __exit__(self, *args):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.queue.lease_s / 3):
+            try:
+                if not self.queue.heartbeat(self.trial_id, self.worker):
+                    logger.warning(
+                        f"Worker {self.worker} lost the lease of trial {self.trial_id}."
+                    )
+
+                    return
+            except sqlite3.Error as e:
+                logger.warning(
+                    f"Could not send the heartbeat of trial {self.trial_id}: {e}"
+                )
+
+
+def get_worker_id() -> str:
+    """Unique id of the current worker process across machines."""
+
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+def get_trial_queue() -> TrialQueue:
+    """Get the trial queue configured through the settings."""
+
+    return TrialQueue(
+        path=SETTINGS.get("HPO_QUEUE_PATH") or OUTPUT_DIR / "trial_queue.sqlite",
+        lease_s=float(SETTINGS.get("HPO_QUEUE_LEASE_S", 120)),
+        max_attempts=int(SETTINGS.get("HPO_QUEUE_MAX_ATTEMPTS", 3)),
+    )